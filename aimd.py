@@ -0,0 +1,94 @@
+import http
+import threading
+import time
+
+from exceptions import APIRequestsError
+from metrics import REGISTRY
+from retry import api_status
+
+LIMIT_METRIC = 'api_concurrency_limit'
+IN_FLIGHT_METRIC = 'api_in_flight'
+# Ответ медленнее этого порога считается признаком перегрузки API.
+LATENCY_TARGET = 2.0
+DECREASE_FACTOR = 0.5
+
+
+def is_overload(error):
+    """Проверяет, говорит ли ошибка о перегрузке API, а не о наших данных."""
+    if not isinstance(error, APIRequestsError):
+        return False
+    status = api_status(error)
+    if status is None:
+        # сетевая ошибка или таймаут
+        return True
+    return (
+        status == http.HTTPStatus.TOO_MANY_REQUESTS
+        or status >= http.HTTPStatus.INTERNAL_SERVER_ERROR
+    )
+
+
+class AIMDLimiter:
+    """Адаптивный предел числа одновременных запросов к API.
+
+    Каждый успешный быстрый ответ добавляет 1/limit к пределу, то есть
+    около единицы за «окно» из limit запросов. Медленный ответ или ошибка
+    перегрузки умножают предел на DECREASE_FACTOR, но не чаще одного раза
+    за время ответа, чтобы пачка одновременных ошибок не обрушила предел.
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=64,
+                 latency_target=LATENCY_TARGET, metrics=REGISTRY):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.metrics = metrics
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._publish()
+
+    def _publish(self):
+        self.metrics.set(LIMIT_METRIC, int(self.limit))
+        self.metrics.set(IN_FLIGHT_METRIC, self.in_flight)
+
+    def acquire(self):
+        """Ждёт, пока число запросов в работе станет меньше предела."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            self._publish()
+        return time.monotonic()
+
+    def release(self, started, overloaded=False):
+        """Учитывает завершённый запрос и пересчитывает предел."""
+        now = time.monotonic()
+        latency = now - started
+        with self._condition:
+            self.in_flight -= 1
+            if overloaded or latency > self.latency_target:
+                if now - self._last_decrease > latency:
+                    self.limit = max(
+                        self.min_limit, self.limit * DECREASE_FACTOR
+                    )
+                    self._last_decrease = now
+            else:
+                self.limit = min(
+                    self.max_limit, self.limit + 1 / self.limit
+                )
+            self._publish()
+            self._condition.notify_all()
+
+    def wrap(self, fetch):
+        """Оборачивает функцию опроса API ограничением параллельности."""
+        def limited_fetch(*args, **kwargs):
+            started = self.acquire()
+            try:
+                result = fetch(*args, **kwargs)
+            except Exception as error:
+                self.release(started, overloaded=is_overload(error))
+                raise
+            self.release(started)
+            return result
+        return limited_fetch
@@ -0,0 +1,192 @@
+import codecs
+import http
+import json
+import logging
+
+import requests
+
+import homework
+from exceptions import APIRequestsError, APIResponseError
+
+logger = logging.getLogger(__name__)
+
+CHUNK_BYTES = 64 * 1024
+BATCH_SIZE = 500
+# Таймауты соединения и чтения очередного куска ответа, секунд.
+TIMEOUT = (5, 30)
+WHITESPACE = ' \t\n\r'
+
+
+class HomeworkStreamParser:
+    """Инкрементально разбирает ответ API по мере поступления данных.
+
+    Ответ имеет вид {"homeworks": [...], "current_date": ...}. Элементы
+    списка homeworks отдаются по одному, как только объект пришёл целиком,
+    поэтому в памяти держится только текущий элемент, а не весь ответ.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.state = 'start'
+        self.key = None
+        self.fields = {}
+        self.decoder = json.JSONDecoder()
+
+    def _skip(self, pos):
+        while pos < len(self.buffer) and self.buffer[pos] in WHITESPACE:
+            pos += 1
+        return pos
+
+    def _decode(self, pos, final):
+        """Декодирует значение; None — если данных пока недостаточно."""
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise APIResponseError('Ошибка при разборе JSON')
+            return None
+        if end == len(self.buffer) and not final:
+            # число на границе куска могло прийти не полностью
+            return None
+        return value, end
+
+    def _expect(self, pos, symbols):
+        if self.buffer[pos] not in symbols:
+            raise APIResponseError(
+                f'Ошибка при разборе JSON: ожидался один из {symbols!r}'
+            )
+        return self.buffer[pos]
+
+    def _step(self, pos, final):
+        """Выполняет один шаг разбора; None — если нужно больше данных."""
+        if self.state == 'start':
+            self._expect(pos, '{')
+            self.state = 'key'
+            return pos + 1
+        if self.state == 'key':
+            if self.buffer[pos] == '}':
+                self.state = 'done'
+                return pos + 1
+            decoded = self._decode(pos, final)
+            if decoded is None:
+                return None
+            self.key, pos = decoded
+            self.state = 'colon'
+            return pos
+        if self.state == 'colon':
+            self._expect(pos, ':')
+            self.state = 'value'
+            return pos + 1
+        if self.state == 'value':
+            return self._value(pos, final)
+        if self.state == 'next_key':
+            if self._expect(pos, ',}') == '}':
+                self.state = 'done'
+            else:
+                self.state = 'key'
+            return pos + 1
+        raise APIResponseError(f'Ошибка при разборе JSON в {self.state}')
+
+    def _value(self, pos, final):
+        if self.key == 'homeworks':
+            self._expect(pos, '[')
+            self.state = 'item'
+            return pos + 1
+        decoded = self._decode(pos, final)
+        if decoded is None:
+            return None
+        self.fields[self.key], pos = decoded
+        self.state = 'next_key'
+        return pos
+
+    def _item(self, pos, final):
+        """Разбирает элемент списка; возвращает (позиция, работа или None)."""
+        symbol = self.buffer[pos]
+        if symbol == ']':
+            self.state = 'next_key'
+            return pos + 1, None
+        if symbol == ',':
+            return pos + 1, None
+        decoded = self._decode(pos, final)
+        if decoded is None:
+            return None, None
+        item, pos = decoded
+        return pos, item
+
+    def feed(self, text, final=False):
+        """Добавляет кусок текста и возвращает полностью пришедшие работы."""
+        self.buffer += text
+        items = []
+        pos = 0
+        while self.state != 'done':
+            pos = self._skip(pos)
+            if pos >= len(self.buffer):
+                break
+            if self.state == 'item':
+                next_pos, item = self._item(pos, final)
+                if item is not None:
+                    items.append(item)
+            else:
+                next_pos = self._step(pos, final)
+            if next_pos is None:
+                break
+            pos = next_pos
+        self.buffer = self.buffer[pos:]
+        if final and self.state != 'done':
+            raise APIResponseError('Ответ API оборвался')
+        return items
+
+
+def stream_homeworks(tenant, from_date=0, chunk_bytes=CHUNK_BYTES,
+                     timeout=TIMEOUT):
+    """По одной отдаёт работы тенанта из потокового ответа API.
+
+    Генератор возвращает (через StopIteration.value) current_date ответа.
+    """
+    try:
+        with requests.get(
+            homework.ENDPOINT,
+            headers={'Authorization': f'OAuth {tenant.practicum_token}'},
+            params={'from_date': from_date},
+            stream=True,
+            timeout=timeout,
+        ) as response:
+            if response.status_code != http.HTTPStatus.OK:
+                raise APIRequestsError(
+                    response.status_code, 'Ошибка при запросе к API'
+                )
+            parser = HomeworkStreamParser()
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            for chunk in response.iter_content(chunk_size=chunk_bytes):
+                yield from parser.feed(decoder.decode(chunk))
+            yield from parser.feed(decoder.decode(b'', final=True), True)
+    except requests.RequestException as error:
+        raise APIRequestsError(f'Ошибка при запросе к API: {error}')
+    return parser.fields.get('current_date')
+
+
+def backfill(tenant, handle_batch, from_date=0, batch_size=BATCH_SIZE,
+             stream=stream_homeworks):
+    """Загружает всю историю тенанта пачками по batch_size работ.
+
+    handle_batch вызывается для каждой пачки; в памяти одновременно
+    находится не больше одной пачки. Возвращает current_date ответа.
+    """
+    batch = []
+    total = 0
+    records = stream(tenant, from_date)
+    while True:
+        try:
+            batch.append(next(records))
+        except StopIteration as stop:
+            current_date = stop.value
+            break
+        if len(batch) >= batch_size:
+            handle_batch(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        handle_batch(batch)
+        total += len(batch)
+    logger.info(f'{tenant.name}: загружено {total} работ из истории')
+    return current_date
@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(root_dir)
+
+import homework  # noqa: E402
+from prepared import PreparedRequests  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from tenants import Tenant  # noqa: E402
+from worker import fetch_tenant  # noqa: E402
+
+
+def poll_loop(fetch, tenants, rounds):
+    """Опрашивает тенантов rounds раз, как горячий цикл обработчика."""
+    sent_messages = {'error': None}
+    for from_date in range(rounds):
+        for tenant in tenants:
+            homework.detect_status_change(
+                fetch(tenant, from_date), sent_messages
+            )
+
+
+def allocations(fetch, tenants, rounds):
+    """Возвращает средний пик памяти одного опроса и остаток после цикла."""
+    sent_messages = {'error': None}
+    peaks = []
+    tracemalloc.start()
+    for from_date in range(rounds):
+        for tenant in tenants:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            homework.detect_status_change(
+                fetch(tenant, from_date), sent_messages
+            )
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks), retained
+
+
+def measure(name, fetch, tenants, rounds):
+    """Печатает время и память одного опроса."""
+    poll_loop(fetch, tenants, 1)
+    started = time.perf_counter()
+    poll_loop(fetch, tenants, rounds)
+    elapsed = time.perf_counter() - started
+    peak, retained = allocations(fetch, tenants, rounds)
+    print(
+        f'{name:>16}: {elapsed * 1e6 / (len(tenants) * rounds):6.0f} '
+        f'мкс/опрос, пик {peak / 1024:6.1f} КиБ/опрос, '
+        f'осталось после цикла {retained / 1024:6.1f} КиБ'
+    )
+
+
+def main(argv=None):
+    """Сравнивает опрос через requests.get и через заготовки запросов."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args(argv)
+    tenants = [
+        Tenant(f't{index}', f'token{index}', str(index))
+        for index in range(args.tenants)
+    ]
+    with StubServer() as server:
+        homework.ENDPOINT = server.endpoint
+        measure('requests.get', fetch_tenant, tenants, args.rounds)
+        prepared = PreparedRequests()
+        measure('PreparedRequests', prepared.fetch, tenants, args.rounds)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,66 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(root_dir)
+
+from scheduler import HeapScheduler, TimingWheelScheduler  # noqa: E402
+
+START = 1600000000
+PERIOD = 600
+
+
+def make(kind):
+    """Создаёт планировщик указанного типа."""
+    if kind == 'heap':
+        return HeapScheduler()
+    return TimingWheelScheduler(START)
+
+
+def run(kind, entries):
+    """Заполняет планировщик и прогоняет один полный период опроса.
+
+    Каждую секунду извлекаются наступившие сроки и назначаются заново
+    через PERIOD, как это делает Worker.tick().
+    """
+    rng = random.Random(1)
+    dues = [START + rng.uniform(0, PERIOD) for _ in range(entries)]
+    queue = make(kind)
+    started = time.perf_counter()
+    for key, due in enumerate(dues):
+        queue.schedule(key, due)
+    inserted = time.perf_counter()
+    popped = 0
+    for second in range(1, PERIOD + 1):
+        now = START + second
+        keys = queue.pop_due(now)
+        popped += len(keys)
+        for key in keys:
+            queue.schedule(key, now + PERIOD)
+        queue.next_due()
+    finished = time.perf_counter()
+    return inserted - started, finished - inserted, popped
+
+
+def main(argv=None):
+    """Сравнивает кучу и колесо таймеров на 10k/100k/1M сроков."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    args = parser.parse_args(argv)
+    for entries in args.entries:
+        for kind in ('heap', 'wheel'):
+            insert, cycle, popped = run(kind, entries)
+            per_insert = insert * 1e9 / entries
+            print(
+                f'{kind:>5} {entries:>8}: '
+                f'вставка {per_insert:6.0f} нс/срок, период {cycle:6.2f} с '
+                f'({cycle * 1e9 / popped:6.0f} нс на извлечение+вставку)'
+            )
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
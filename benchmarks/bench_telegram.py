@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+import time
+
+import telegram
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(root_dir)
+
+from homework import send_to_chat  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from telegram_client import BotAPIClient  # noqa: E402
+
+TOKEN = '1234:stub'
+
+
+def measure(name, messages, send):
+    """Печатает пропускную способность отправки пачки сообщений."""
+    started = time.perf_counter()
+    send(messages)
+    elapsed = time.perf_counter() - started
+    print(
+        f'{name:>28}: {len(messages)} сообщений за {elapsed:.2f} с, '
+        f'{len(messages) / elapsed:.0f} сообщений/с'
+    )
+
+
+def send_each(bot):
+    """Отправляет сообщения по одному через send_to_chat."""
+    def send(messages):
+        for chat_id, text in messages:
+            send_to_chat(bot, chat_id, text)
+    return send
+
+
+def main(argv=None):
+    """Сравнивает telegram.Bot с BotAPIClient на локальной заглушке."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.01)
+    args = parser.parse_args(argv)
+    messages = [
+        (index % args.chats + 1, f'Сообщение {index}')
+        for index in range(args.messages)
+    ]
+    with StubServer(telegram_latency=args.latency) as server:
+        bot = telegram.Bot(token=TOKEN, base_url=server.telegram_base_url)
+        client = BotAPIClient(TOKEN, base_url=server.telegram_base_url)
+        measure('python-telegram-bot', messages, send_each(bot))
+        measure('BotAPIClient', messages, send_each(client))
+        measure('BotAPIClient.send_batch', messages, client.send_batch)
+        client.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
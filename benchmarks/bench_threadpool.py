@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+
+import telegram
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(root_dir)
+
+import homework  # noqa: E402
+import worker  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from tenants import Tenant, TenantChanges  # noqa: E402
+
+
+class StaticRegistry:
+    """Реестр с неизменным набором тенантов."""
+
+    def __init__(self, tenants):
+        self.changes = TenantChanges(list(tenants), [], [])
+
+    def reload_if_changed(self):
+        """Отдаёт набор тенантов один раз."""
+        changes, self.changes = self.changes, None
+        return changes
+
+
+def run(tenants, threads, server):
+    """Выполняет один проход опроса и возвращает его длительность."""
+    bot = telegram.Bot(token='1234:stub', base_url=server.telegram_base_url)
+    registry = StaticRegistry(
+        Tenant(f'tenant{index}', f'token{index}', str(index))
+        for index in range(tenants)
+    )
+    poller = worker.build_worker(registry, bot, threads=threads)
+    started = time.perf_counter()
+    poller.run_once()
+    elapsed = time.perf_counter() - started
+    if threads:
+        poller.close()
+    return elapsed
+
+
+def main(argv=None):
+    """Сравнивает однопоточный проход опроса с пулом потоков."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='задержка ответа API и Telegram, секунды')
+    parser.add_argument('--threads', type=int, nargs='+',
+                        default=[0, 4, 16, 32])
+    args = parser.parse_args(argv)
+    with StubServer(api_latency=args.latency,
+                    telegram_latency=args.latency) as server:
+        homework.ENDPOINT = server.endpoint
+        for threads in args.threads:
+            elapsed = run(args.tenants, threads, server)
+            mode = f'{threads} потоков' if threads else 'один поток'
+            print(
+                f'{mode:>12}: {args.tenants} тенантов за {elapsed:.2f} с, '
+                f'{args.tenants / elapsed:.0f} тенантов/с'
+            )
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
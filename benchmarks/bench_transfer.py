@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(root_dir)
+
+import homework  # noqa: E402
+from metrics import Metrics  # noqa: E402
+from prepared import PreparedRequests  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from tenants import Tenant  # noqa: E402
+from transfer import TransferMeter  # noqa: E402
+
+
+def measure(homeworks, level, rounds):
+    """Возвращает байты по сети, после распаковки и время CPU на ответ."""
+    tenant = Tenant('bench', 'token', '1')
+    with StubServer(homeworks=homeworks, compress=level) as server:
+        homework.ENDPOINT = server.endpoint
+        fetcher = PreparedRequests(meter=TransferMeter(Metrics()))
+        # прогрев: соединение и заготовка запроса создаются до замера
+        fetcher.fetch(tenant, 0)
+        meter = fetcher.meter = TransferMeter(Metrics())
+        started = time.thread_time()
+        for from_date in range(rounds):
+            fetcher.fetch(tenant, from_date)
+        cpu = time.thread_time() - started
+    _, wire, decoded = meter.totals(tenant.name)
+    return wire / rounds, decoded / rounds, cpu * 1e6 / rounds
+
+
+def main(argv=None):
+    """Сравнивает объём и стоимость разбора ответов со сжатием и без."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--homeworks', type=int, nargs='+',
+                        default=[1, 20, 200, 2000])
+    parser.add_argument('--level', type=int, default=6,
+                        help='уровень gzip на сервере')
+    args = parser.parse_args(argv)
+    print(f'{"работ":>6} {"сжатие":>7} {"по сети":>10} {"распаковано":>12} '
+          f'{"мкс CPU":>8}')
+    for homeworks in args.homeworks:
+        for level in (0, args.level):
+            wire, decoded, cpu = measure(homeworks, level, args.rounds)
+            print(f'{homeworks:>6} {"gzip" if level else "нет":>7} '
+                  f'{wire:>10.0f} {decoded:>12.0f} {cpu:>8.0f}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
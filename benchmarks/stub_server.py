@@ -0,0 +1,140 @@
+import gzip
+import json
+import random
+import socket
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PATH = '/api/user_api/homework_statuses/'
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Имитирует API Практикума и метод sendMessage Bot API."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # без этого заголовки и тело уходят разными сегментами и ответ
+        # задерживается алгоритмом Нейгла на десятки миллисекунд
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=HTTPStatus.OK):
+        """Отправляет JSON-ответ."""
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if self.server.compress and 'gzip' in self.headers.get(
+            'Accept-Encoding', ''
+        ):
+            body = gzip.compress(body, self.server.compress)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != API_PATH:
+            self.send_json({}, HTTPStatus.NOT_FOUND)
+            return
+        time.sleep(self.server.api_latency)
+        token = self.headers.get('Authorization', '').split()[-1]
+        from_date = int(parse_qs(url.query).get('from_date', ['0'])[0])
+        self.server.count('api')
+        homeworks = [
+            {
+                'id': index,
+                'homework_name': f'{token}_hw{index}.zip',
+                'status': random.choice(STATUSES),
+                'reviewer_comment': 'Всё хорошо',
+                'date_updated': '2020-02-13T14:40:57Z',
+                'lesson_name': 'Итоговый проект',
+            }
+            for index in range(self.server.homeworks)
+        ]
+        self.send_json({
+            'homeworks': homeworks,
+            'current_date': max(from_date, int(time.time())),
+        })
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if not self.path.endswith('/sendMessage'):
+            self.send_json({'ok': False}, HTTPStatus.NOT_FOUND)
+            return
+        time.sleep(self.server.telegram_latency)
+        self.server.count('telegram')
+        if self.headers.get('Content-Type', '').startswith(
+            'application/json'
+        ):
+            params = json.loads(body or b'{}')
+        else:
+            params = {
+                key: values[0] for key, values in
+                parse_qs(body.decode()).items()
+            }
+        self.send_json({
+            'ok': True,
+            'result': {
+                'message_id': self.server.requests['telegram'],
+                'date': int(time.time()),
+                'chat': {'id': int(params.get('chat_id', 0)),
+                         'type': 'private'},
+                'text': params.get('text', ''),
+            },
+        })
+
+
+class StubServer(ThreadingHTTPServer):
+    """Локальная замена внешних API для бенчмарков."""
+
+    daemon_threads = True
+
+    def __init__(self, api_latency=0.0, telegram_latency=0.0, homeworks=1,
+                 compress=0):
+        """compress — уровень gzip для ответов, 0 — без сжатия."""
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.compress = compress
+        self.api_latency = api_latency
+        self.telegram_latency = telegram_latency
+        self.homeworks = homeworks
+        self.requests = {'api': 0, 'telegram': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        """Базовый адрес сервера."""
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def endpoint(self):
+        """Адрес, подменяющий ENDPOINT API Практикума."""
+        return self.url + API_PATH
+
+    @property
+    def telegram_base_url(self):
+        """Базовый адрес Bot API в формате python-telegram-bot."""
+        return self.url + '/bot'
+
+    def count(self, kind):
+        """Учитывает обработанный запрос."""
+        with self._lock:
+            self.requests[kind] += 1
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
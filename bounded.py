@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from clock import Clock
+from metrics import REGISTRY
+
+# Сколько работ помнить на тенанта: за курс их заметно меньше.
+MAX_ENTRIES = 256
+# Через сколько секунд без обращений запись забывается.
+TTL = 30 * 24 * 3600
+EVICTED_METRIC = 'state_evicted'
+
+
+class BoundedDict(MutableMapping):
+    """Словарь с вытеснением давно не использованных записей (LRU/TTL).
+
+    Хранит не больше max_size записей: при переполнении выбрасывается та,
+    к которой дольше всего не обращались. Запись, к которой не обращались
+    ttl секунд, считается отсутствующей. Ключи из pinned не вытесняются и
+    в лимит не входят — так в sent_messages хранится последняя ошибка.
+
+    Для словаря отправленных статусов вытеснение безопасно: API отдаёт
+    только работы, изменённые после from_date, поэтому забытая работа
+    вернётся лишь с новым статусом.
+    """
+
+    def __init__(self, data=(), max_size=MAX_ENTRIES, ttl=TTL, clock=None,
+                 pinned=('error',), metrics=REGISTRY):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock or Clock()
+        self.pinned = {key: None for key in pinned}
+        self.metrics = metrics
+        self._data = OrderedDict()
+        self.update(data)
+
+    def _evict(self, count):
+        self.metrics.increment(EVICTED_METRIC, count)
+
+    def _expire(self, now):
+        if self.ttl is None:
+            return
+        expired = 0
+        while self._data:
+            key, (_, touched) = next(iter(self._data.items()))
+            if now - touched < self.ttl:
+                break
+            del self._data[key]
+            expired += 1
+        if expired:
+            self._evict(expired)
+
+    def __getitem__(self, key):
+        if key in self.pinned:
+            return self.pinned[key]
+        now = self.clock.time()
+        self._expire(now)
+        value, _ = self._data[key]
+        self._data[key] = (value, now)
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self.pinned:
+            self.pinned[key] = value
+            return
+        now = self.clock.time()
+        self._data[key] = (value, now)
+        self._data.move_to_end(key)
+        self._expire(now)
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self._evict(1)
+
+    def __delitem__(self, key):
+        if key in self.pinned:
+            self.pinned[key] = None
+            return
+        del self._data[key]
+
+    def __iter__(self):
+        yield from self.pinned
+        yield from list(self._data)
+
+    def __len__(self):
+        return len(self.pinned) + len(self._data)
+
+    def __contains__(self, key):
+        return key in self.pinned or key in self._data
+
+    def items(self):
+        """Возвращает пары ключ-значение, не продлевая жизнь записей."""
+        return list(self.pinned.items()) + [
+            (key, value) for key, (value, _) in self._data.items()
+        ]
+
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(self.items())!r})'
@@ -0,0 +1,28 @@
+import time
+
+
+class Clock:
+    """Системное время; точка подмены времени для планировщика."""
+
+    def time(self):
+        """Возвращает текущее время в секундах эпохи."""
+        return time.time()
+
+    def sleep(self, seconds):
+        """Приостанавливает выполнение."""
+        time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """Управляемое время для симуляции: sleep мгновенно сдвигает часы."""
+
+    def __init__(self, start=0.0):
+        self.now = float(start)
+
+    def time(self):
+        """Возвращает виртуальное время."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Сдвигает виртуальное время без реального ожидания."""
+        self.now += max(seconds, 0)
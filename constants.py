@@ -0,0 +1,3 @@
+# Период опроса API Практикума, секунд. Вынесен из homework, чтобы модули
+# обработчика тенантов не импортировали бота ради одной константы.
+RETRY_PERIOD = 600
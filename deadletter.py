@@ -0,0 +1,272 @@
+import logging
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+import telegram
+
+from clock import Clock
+from exceptions import TelegramError
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEAD_LETTER_DB_ENV = 'DEAD_LETTER_DB'
+PENDING_METRIC = 'dead_letters_pending'
+DROPPED_METRIC = 'dead_letters_dropped'
+# Пауза перед первым повтором при сетевых сбоях; дальше она удваивается.
+BACKOFF = 30
+MAX_BACKOFF = 3600
+MAX_ATTEMPTS = 10
+# Как часто фоновый поток проверяет очередь, если сроков повтора нет.
+IDLE = 60
+
+SEND_ERRORS = (telegram.error.TelegramError, TelegramError)
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS dead_letters ('
+    ' id INTEGER PRIMARY KEY, chat_id TEXT NOT NULL, text TEXT NOT NULL,'
+    ' attempts INTEGER NOT NULL, next_at REAL NOT NULL, error TEXT)',
+    'CREATE INDEX IF NOT EXISTS dead_letters_next_at'
+    ' ON dead_letters (next_at)',
+)
+
+Letter = namedtuple('Letter', ('id', 'chat_id', 'text', 'attempts'))
+# action: retry — повторить через delay секунд, drop — выбросить,
+# migrate — сразу повторить в new_chat_id.
+Decision = namedtuple('Decision', ('action', 'delay', 'new_chat_id'))
+
+
+def error_code(error):
+    """Возвращает HTTP-код ошибки Bot API, если он известен."""
+    return getattr(error, 'error_code', None)
+
+
+def original_error(error):
+    """Возвращает ошибку Telegram, обёрнутую homework.send_to_chat."""
+    if isinstance(error, TelegramError) and error.__cause__ is not None:
+        return error.__cause__
+    return error
+
+
+def decide(error, attempts):
+    """Выбирает, что делать с сообщением после attempts неудачных попыток.
+
+    Telegram сообщает паузу в retry_after — она соблюдается. Заблокировавший
+    бота или несуществующий чат повторы не исправят, такие сообщения
+    выбрасываются. Остальные ошибки повторяются с экспоненциальной паузой,
+    но не больше MAX_ATTEMPTS раз. Решение принимается по исходной ошибке
+    Telegram, даже если она обёрнута в TelegramError.
+    """
+    error = original_error(error)
+    if isinstance(error, telegram.error.ChatMigrated):
+        return Decision('migrate', 0, str(error.new_chat_id))
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after:
+        return Decision('retry', float(retry_after), None)
+    if isinstance(error, (telegram.error.Unauthorized,
+                          telegram.error.BadRequest)):
+        return Decision('drop', None, None)
+    if error_code(error) in (400, 401, 403, 404):
+        return Decision('drop', None, None)
+    if attempts >= MAX_ATTEMPTS:
+        return Decision('drop', None, None)
+    return Decision(
+        'retry', min(BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF), None
+    )
+
+
+class DeadLetterBot:
+    """Обёртка над ботом: неудачная отправка уходит в очередь повторов.
+
+    send_message не бросает исключение при ошибке Telegram, поэтому цикл
+    опроса не останавливается; ошибка логируется, а сообщение ждёт
+    повтора в очереди.
+    """
+
+    def __init__(self, bot, queue):
+        self._bot = bot
+        self._queue = queue
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Отправляет сообщение или откладывает его в очередь повторов."""
+        try:
+            return self._bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        except SEND_ERRORS as error:
+            logger.error(f'Сообщение в чат {chat_id} не доставлено: {error}')
+            self._queue.put(chat_id, text, error)
+            return None
+
+    def __getattr__(self, name):
+        return getattr(self._bot, name)
+
+
+class DeadLetterQueue:
+    """Хранимая в SQLite очередь недоставленных сообщений.
+
+    Сообщения повторяет фоновый поток, запущенный protect(), поэтому ни
+    паузы retry_after, ни медленный Telegram не задерживают опрос. Без
+    пути очередь живёт только в памяти.
+    """
+
+    def __init__(self, path=None, clock=None, metrics=REGISTRY):
+        self.path = path
+        self.clock = clock or Clock()
+        self.metrics = metrics
+        self.connection = sqlite3.connect(
+            path or ':memory:', check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        with self._lock, self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+        self._publish()
+
+    @classmethod
+    def from_env(cls):
+        """Создаёт очередь по пути из DEAD_LETTER_DB или None."""
+        path = os.getenv(DEAD_LETTER_DB_ENV)
+        if not path:
+            return None
+        return cls(path)
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute(
+                'SELECT COUNT(*) FROM dead_letters'
+            ).fetchone()[0]
+
+    def _publish(self):
+        self.metrics.set(PENDING_METRIC, len(self))
+
+    def _drop(self, chat_id, error):
+        logger.warning(f'Сообщение в чат {chat_id} выброшено: {error}')
+        self.metrics.increment(DROPPED_METRIC)
+
+    def put(self, chat_id, text, error):
+        """Ставит сообщение в очередь по политике для ошибки.
+
+        Возвращает False, если сообщение выброшено.
+        """
+        decision = decide(error, 1)
+        if decision.action == 'drop':
+            self._drop(chat_id, error)
+            return False
+        if decision.action == 'migrate':
+            chat_id = decision.new_chat_id
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO dead_letters '
+                '(chat_id, text, attempts, next_at, error) '
+                'VALUES (?, ?, 1, ?, ?)',
+                (str(chat_id), text, self.clock.time() + decision.delay,
+                 str(error)),
+            )
+        self._publish()
+        self._wake.set()
+        return True
+
+    def due(self, limit=100):
+        """Возвращает сообщения, срок повтора которых наступил."""
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT id, chat_id, text, attempts FROM dead_letters '
+                'WHERE next_at <= ? ORDER BY next_at LIMIT ?',
+                (self.clock.time(), limit),
+            ).fetchall()
+        return [Letter(*row) for row in rows]
+
+    def next_due(self):
+        """Возвращает ближайший срок повтора или None."""
+        with self._lock:
+            return self.connection.execute(
+                'SELECT MIN(next_at) FROM dead_letters'
+            ).fetchone()[0]
+
+    def delivered(self, letter):
+        """Удаляет доставленное сообщение."""
+        with self._lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM dead_letters WHERE id = ?', (letter.id,)
+            )
+        self._publish()
+
+    def failed(self, letter, error):
+        """Назначает следующий повтор или выбрасывает сообщение."""
+        attempts = letter.attempts + 1
+        decision = decide(error, attempts)
+        with self._lock, self.connection:
+            if decision.action == 'drop':
+                self.connection.execute(
+                    'DELETE FROM dead_letters WHERE id = ?', (letter.id,)
+                )
+            else:
+                self.connection.execute(
+                    'UPDATE dead_letters SET attempts = ?, next_at = ?, '
+                    'error = ?, chat_id = ? WHERE id = ?',
+                    (attempts, self.clock.time() + decision.delay,
+                     str(error), decision.new_chat_id or letter.chat_id,
+                     letter.id),
+                )
+        if decision.action == 'drop':
+            self._drop(letter.chat_id, error)
+        self._publish()
+
+    def retry_due(self, bot):
+        """Повторяет отправку наступивших сообщений через bot.
+
+        Возвращает число доставленных сообщений.
+        """
+        sent = 0
+        for letter in self.due():
+            try:
+                bot.send_message(chat_id=letter.chat_id, text=letter.text)
+            except SEND_ERRORS as error:
+                self.failed(letter, error)
+                continue
+            self.delivered(letter)
+            sent += 1
+        if sent:
+            logger.info(f'Повторно доставлено сообщений: {sent}')
+        return sent
+
+    def _retry_loop(self, bot):
+        while not self._stop.is_set():
+            try:
+                self.retry_due(bot)
+            except Exception as error:
+                logger.error(f'Сбой повтора недоставленных сообщений: {error}')
+            next_due = self.next_due()
+            pause = IDLE if next_due is None else next_due - self.clock.time()
+            self._wake.wait(min(max(pause, 0), IDLE))
+            self._wake.clear()
+
+    def protect(self, bot):
+        """Запускает фоновый повтор и возвращает защищённого бота."""
+        self._thread = threading.Thread(
+            target=self._retry_loop, args=(bot,), name='dead-letters',
+            daemon=True,
+        )
+        self._thread.start()
+        return DeadLetterBot(bot, self)
+
+    def close(self):
+        """Останавливает фоновый повтор и закрывает базу."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.connection.close()
+
+
+def protect_from_env(bot):
+    """Защищает бота очередью из DEAD_LETTER_DB, если она задана."""
+    queue = DeadLetterQueue.from_env()
+    if queue is None:
+        return bot
+    logger.info(f'Недоставленные сообщения копятся в {queue.path}')
+    return queue.protect(bot)
@@ -0,0 +1,122 @@
+import logging
+import time
+from collections import OrderedDict, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Предел длины сообщения Telegram.
+MESSAGE_LIMIT = 4096
+DIGEST_TENANT = 'digest'
+
+DigestPolicy = namedtuple(
+    'DigestPolicy', ('interval', 'quiet_start', 'quiet_end')
+)
+
+
+def parse_quiet_hours(value):
+    """Разбирает окно тишины вида «22-8» в пару часов UTC."""
+    start, end = (int(hour) for hour in value.split('-'))
+    if not (0 <= start < 24 and 0 <= end < 24):
+        raise ValueError(f'некорректные часы тишины {value!r}')
+    return start, end
+
+
+def parse_policy(row):
+    """Возвращает режим сводки из строки подписки или None.
+
+    digest — интервал сводки в минутах, quiet_hours — окно тишины по UTC,
+    например «22-8». Если ни одно поле не заполнено или они некорректны,
+    чат получает уведомления сразу.
+    """
+    digest = str(row.get('digest') or '').strip()
+    quiet_hours = str(row.get('quiet_hours') or '').strip()
+    if not digest and not quiet_hours:
+        return None
+    try:
+        interval = int(digest or 0) * 60
+        if interval < 0:
+            raise ValueError(f'отрицательный интервал {digest!r}')
+        quiet = parse_quiet_hours(quiet_hours) if quiet_hours else (0, 0)
+    except ValueError as error:
+        logger.error(f'Режим сводки для чата {row.get("chat_id")}: {error}')
+        return None
+    return DigestPolicy(interval, *quiet)
+
+
+def in_quiet_hours(policy, moment):
+    """Проверяет, попадает ли момент в окно тишины."""
+    start, end = policy.quiet_start, policy.quiet_end
+    hour = time.gmtime(moment).tm_hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def holds(policy, moment):
+    """Проверяет, копить ли событие вместо немедленной отправки."""
+    if policy is None:
+        return False
+    return policy.interval > 0 or in_quiet_hours(policy, moment)
+
+
+def render_digest(events, limit=MESSAGE_LIMIT):
+    """Собирает сводку по работам.
+
+    events — словарь (тенант, работа) -> (последнее сообщение, число
+    смен статуса). Возвращает список сообщений не длиннее limit.
+    """
+    total = sum(changes for _, changes in events.values())
+    header = f'Сводка: изменений статусов — {total}'
+    messages = []
+    current = header
+    for (tenant, _), (message, changes) in events.items():
+        suffix = f' (смен статуса: {changes})' if changes > 1 else ''
+        line = f'\n• {tenant}: {message}{suffix}'[:limit - len(header)]
+        if len(current) + len(line) > limit:
+            messages.append(current)
+            current = header
+        current += line
+    messages.append(current)
+    return messages
+
+
+class DigestBuffer:
+    """Копит уведомления для чатов в режиме сводки.
+
+    Для каждой работы в сводке остаётся последний статус и число его
+    смен. Событие ждёт не дольше интервала с момента первого накопленного
+    события чата; в окно тишины сводки не отправляются. Готовые сводки
+    попадают в журнал исходящих сообщений, а до этого хранятся только в
+    памяти.
+    """
+
+    def __init__(self):
+        self.pending = OrderedDict()
+
+    def __len__(self):
+        return sum(len(events) for _, events in list(self.pending.values()))
+
+    def add(self, chat_id, tenant, homework_name, message, now):
+        """Добавляет событие в сводку чата."""
+        events = self.pending.setdefault(chat_id, (now, OrderedDict()))[1]
+        _, changes = events.get((tenant, homework_name), (None, 0))
+        events[tenant, homework_name] = (message, changes + 1)
+
+    def pop_due(self, now, policy_for):
+        """Возвращает готовые сводки: список пар (чат, текст).
+
+        policy_for(chat_id) возвращает DigestPolicy чата; чаты, вышедшие
+        из режима сводки, получают накопленное сразу.
+        """
+        ready = []
+        for chat_id, (started, events) in list(self.pending.items()):
+            policy = policy_for(chat_id) or DigestPolicy(0, 0, 0)
+            if now - started < policy.interval:
+                continue
+            if in_quiet_hours(policy, now):
+                continue
+            del self.pending[chat_id]
+            ready.extend(
+                (chat_id, text) for text in render_digest(events)
+            )
+        return ready
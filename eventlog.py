@@ -0,0 +1,266 @@
+import argparse
+import bisect
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOG_DIR_ENV = 'EVENT_LOG_DIR'
+EVENT_LOG_RETAIN_ENV = 'EVENT_LOG_RETAIN'
+# Размер сегмента, после которого журнал начинает новый.
+SEGMENT_BYTES = 64 * 1024 * 1024
+# Сколько сегментов хранить (1 ГиБ при 64 МиБ на сегмент); None — не
+# удалять старые.
+RETAIN_SEGMENTS = 16
+LOG_SUFFIX = '.log'
+INDEX_SUFFIX = '.index'
+# Запись индекса — позиция события в файле сегмента.
+INDEX_ENTRY = struct.Struct('>Q')
+APPENDED_METRIC = 'event_log_appended'
+FOLLOW_INTERVAL = 0.5
+
+
+def segment_name(base_offset):
+    """Возвращает имя сегмента по смещению его первого события."""
+    return f'{base_offset:020d}'
+
+
+def list_segments(directory):
+    """Возвращает отсортированные смещения начала сегментов в каталоге."""
+    return sorted(
+        int(name[:-len(LOG_SUFFIX)]) for name in os.listdir(directory)
+        if name.endswith(LOG_SUFFIX) and name[:-len(LOG_SUFFIX)].isdigit()
+    )
+
+
+class Segment:
+    """Файл событий в формате JSONL и плотный индекс смещений к нему.
+
+    N-я запись индекса хранит позицию события base_offset + N в файле
+    сегмента, поэтому поиск по смещению — одно чтение индекса без
+    просмотра журнала.
+    """
+
+    def __init__(self, directory, base_offset):
+        self.base_offset = base_offset
+        path = os.path.join(directory, segment_name(base_offset))
+        self.log_path = path + LOG_SUFFIX
+        self.index_path = path + INDEX_SUFFIX
+
+    def position(self, offset):
+        """Возвращает позицию события в файле сегмента или None."""
+        with open(self.index_path, 'rb') as index:
+            index.seek((offset - self.base_offset) * INDEX_ENTRY.size)
+            entry = index.read(INDEX_ENTRY.size)
+        if len(entry) < INDEX_ENTRY.size:
+            return None
+        return INDEX_ENTRY.unpack(entry)[0]
+
+    def __len__(self):
+        try:
+            return os.path.getsize(self.index_path) // INDEX_ENTRY.size
+        except FileNotFoundError:
+            return 0
+
+    def read(self, offset, limit):
+        """Читает до limit событий начиная со смещения offset.
+
+        Возвращает список пар (смещение, событие). Недописанная последняя
+        строка не возвращается.
+        """
+        position = self.position(offset)
+        if position is None:
+            return []
+        events = []
+        with open(self.log_path, 'rb') as log:
+            log.seek(position)
+            while len(events) < limit:
+                line = log.readline()
+                if not line.endswith(b'\n'):
+                    break
+                events.append((offset, json.loads(line)))
+                offset += 1
+        return events
+
+
+class EventLog:
+    """Журнал смен статусов из сегментов для сторонних потребителей.
+
+    События дописываются в конец текущего сегмента строкой JSON, каждое
+    получает сквозное смещение. Когда сегмент дорастает до segment_bytes,
+    начинается новый; лишние старые сегменты удаляются по retain.
+    Потребители в других процессах читают каталог через read() или
+    follow() и продолжают с сохранённого смещения, не обращаясь к API
+    Практикума.
+    """
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES,
+                 retain=RETAIN_SEGMENTS, metrics=REGISTRY):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retain = retain
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        bases = list_segments(directory) or [0]
+        self.segment = Segment(directory, bases[-1])
+        self._recover()
+        self.next_offset = self.segment.base_offset + len(self.segment)
+        self._open()
+
+    @classmethod
+    def from_env(cls):
+        """Создаёт журнал в каталоге из EVENT_LOG_DIR или None.
+
+        Число хранимых сегментов берётся из EVENT_LOG_RETAIN; 0 — хранить
+        все.
+        """
+        directory = os.getenv(EVENT_LOG_DIR_ENV)
+        if not directory:
+            return None
+        retain = int(os.getenv(EVENT_LOG_RETAIN_ENV, RETAIN_SEGMENTS))
+        return cls(directory, retain=retain or None)
+
+    def _recover(self):
+        # Событие пишется раньше записи индекса: после сбоя отрезаются
+        # недописанная запись индекса и события без записи в индексе.
+        segment = self.segment
+        if not os.path.exists(segment.log_path):
+            open(segment.log_path, 'wb').close()
+        count = len(segment)
+        with open(segment.index_path, 'ab') as index:
+            index.truncate(count * INDEX_ENTRY.size)
+        end = 0
+        if count:
+            end = segment.position(segment.base_offset + count - 1)
+            with open(segment.log_path, 'rb') as log:
+                log.seek(end)
+                end += len(log.readline())
+        with open(segment.log_path, 'ab') as log:
+            log.truncate(end)
+
+    def _open(self):
+        self._log = open(self.segment.log_path, 'ab')
+        self._index = open(self.segment.index_path, 'ab')
+        self._size = self._log.tell()
+
+    def _close_files(self):
+        self._log.close()
+        self._index.close()
+
+    def _roll(self):
+        self._close_files()
+        self.segment = Segment(self.directory, self.next_offset)
+        self._open()
+        logger.info(f'Начат сегмент журнала событий {self.segment.log_path}')
+        if self.retain is None:
+            return
+        for base in list_segments(self.directory)[:-self.retain]:
+            old = Segment(self.directory, base)
+            os.remove(old.log_path)
+            os.remove(old.index_path)
+
+    def append(self, event):
+        """Дописывает событие и возвращает его смещение."""
+        line = json.dumps(event, ensure_ascii=False).encode() + b'\n'
+        with self._lock:
+            if self._size and self._size + len(line) > self.segment_bytes:
+                self._roll()
+            self._log.write(line)
+            self._log.flush()
+            self._index.write(INDEX_ENTRY.pack(self._size))
+            self._index.flush()
+            self._size += len(line)
+            offset = self.next_offset
+            self.next_offset += 1
+        self.metrics.increment(APPENDED_METRIC)
+        return offset
+
+    def sink(self, event):
+        """Этап конвейера Worker: записывает найденную смену статуса."""
+        homework = event.response['homeworks'][0]
+        self.append({
+            'tenant': event.tenant.name,
+            'homework_name': event.homework_name,
+            'status': homework['status'],
+            'message': event.message,
+            'happened_at': event.happened_at,
+        })
+
+    def read(self, offset=0, limit=100):
+        """Читает события начиная со смещения offset."""
+        return read(self.directory, offset, limit)
+
+    def close(self):
+        """Закрывает файлы текущего сегмента."""
+        with self._lock:
+            self._close_files()
+
+
+def read(directory, offset=0, limit=100):
+    """Читает до limit событий журнала начиная со смещения offset.
+
+    Возвращает список пар (смещение, событие). Смещение старше самого
+    старого сохранённого сегмента читается с начала журнала.
+    """
+    bases = list_segments(directory)
+    if not bases:
+        return []
+    offset = max(offset, bases[0])
+    events = []
+    number = bisect.bisect_right(bases, offset) - 1
+    for base in bases[number:]:
+        if len(events) >= limit:
+            break
+        segment = Segment(directory, base)
+        try:
+            events += segment.read(max(offset, base), limit - len(events))
+        except FileNotFoundError:
+            # сегмент удалён писателем по retain во время чтения
+            continue
+        if events:
+            offset = events[-1][0] + 1
+    return events
+
+
+def follow(directory, offset=0, limit=100, interval=FOLLOW_INTERVAL):
+    """Бесконечно выдаёт новые события журнала, начиная с offset."""
+    while True:
+        events = read(directory, offset, limit)
+        yield from events
+        if events:
+            offset = events[-1][0] + 1
+        else:
+            time.sleep(interval)
+
+
+def main(argv=None):
+    """Печатает события журнала в формате JSONL."""
+    parser = argparse.ArgumentParser(
+        description='Чтение журнала смен статусов из EVENT_LOG_DIR.'
+    )
+    parser.add_argument('directory', help='каталог журнала')
+    parser.add_argument('--offset', type=int, default=0,
+                        help='смещение первого события')
+    parser.add_argument('--follow', action='store_true',
+                        help='ждать новые события')
+    args = parser.parse_args(argv)
+    if args.follow:
+        events = follow(args.directory, args.offset)
+    else:
+        events = read(args.directory, args.offset, limit=sys.maxsize)
+    for offset, event in events:
+        print(json.dumps(
+            {'offset': offset, **event}, ensure_ascii=False
+        ), flush=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
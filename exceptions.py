@@ -26,3 +26,18 @@ class TelegramError(Exception):
 class APIResponseError(Exception):
     """Ошибка при разборе JSON."""
     pass
+
+
+class TenantSourceError(Exception):
+    """Ошибка при чтении источника списка тенантов."""
+    pass
+
+
+class TelegramAPIError(TelegramError):
+    """Ошибка Bot API с кодом ответа и паузой перед повтором."""
+
+    def __init__(self, description, error_code=None, retry_after=None):
+        super().__init__(description)
+        self.description = description
+        self.error_code = error_code
+        self.retry_after = retry_after
@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from clock import Clock
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PORT_ENV = 'HEALTH_PORT'
+# Цикл опроса считается зависшим, если проход не завершался дольше этого:
+# пауза между проходами не превышает минуты.
+STALE_AFTER = 300
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    """Отдаёт состояние обработчика: /health, /ready и POST /profile."""
+
+    def log_message(self, format, *args):
+        """Не пишет журнал запросов: их шлёт оркестратор раз в секунды."""
+
+    def send_json(self, payload, status=HTTPStatus.OK):
+        """Отправляет JSON-ответ."""
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        """Отвечает 200 или 503 с состоянием обработчика."""
+        if self.path == '/health':
+            alive, payload = self.server.liveness()
+        elif self.path == '/ready':
+            alive, payload = self.server.readiness()
+        else:
+            self.send_json({}, HTTPStatus.NOT_FOUND)
+            return
+        self.send_json(
+            payload,
+            HTTPStatus.OK if alive else HTTPStatus.SERVICE_UNAVAILABLE,
+        )
+
+    def do_POST(self):
+        """Переключает профилирование цикла опроса."""
+        if self.path != '/profile' or self.server.profiler is None:
+            self.send_json({}, HTTPStatus.NOT_FOUND)
+            return
+        self.server.profiler.toggle()
+        self.send_json({'profiling': self.server.profiler.requested})
+
+
+class HealthServer(ThreadingHTTPServer):
+    """HTTP-сервер проверки живости в собственном потоке.
+
+    status() вызывается из потока сервера и должна только читать
+    состояние обработчика, не блокируя цикл опроса. Обработчик жив, пока
+    очередной проход завершался не позже stale_after секунд назад (до
+    первого прохода отсчёт идёт от запуска сервера), и готов после первого
+    прохода.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, status, port=0, host='0.0.0.0',
+                 stale_after=STALE_AFTER, clock=None, profiler=None):
+        super().__init__((host, port), HealthHandler)
+        self.status = status
+        self.stale_after = stale_after
+        self.clock = clock or Clock()
+        self.profiler = profiler
+        self.started = self.clock.time()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, status, **kwargs):
+        """Создаёт сервер на порту HEALTH_PORT или None, если он не задан."""
+        port = os.getenv(HEALTH_PORT_ENV)
+        if not port:
+            return None
+        return cls(status, port=int(port), **kwargs)
+
+    @property
+    def url(self):
+        """Базовый адрес сервера."""
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def liveness(self):
+        """Возвращает признак живости и состояние обработчика."""
+        payload = self.status()
+        last_tick = payload.get('last_tick')
+        since = self.started if last_tick is None else last_tick
+        return self.clock.time() - since <= self.stale_after, payload
+
+    def readiness(self):
+        """Возвращает признак готовности и состояние обработчика."""
+        payload = self.status()
+        return payload.get('last_tick') is not None, payload
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name='health', daemon=True
+        )
+        self._thread.start()
+        logger.info(f'Проверка живости доступна на {self.url}/health')
+        return self
+
+    def close(self):
+        """Останавливает сервер."""
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
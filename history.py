@@ -0,0 +1,197 @@
+import argparse
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+
+from metrics import REGISTRY
+from tracing import percentile
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DB_ENV = 'HISTORY_DB'
+# Сколько событий ждёт записи; при переполнении новые события теряются,
+# а не тормозят цикл опроса.
+QUEUE_SIZE = 10000
+BATCH_SIZE = 500
+DROPPED_METRIC = 'history_dropped'
+VERDICTS = ('approved', 'rejected')
+
+SCHEMA = (
+    'PRAGMA journal_mode = WAL',
+    'CREATE TABLE IF NOT EXISTS status_history ('
+    ' tenant TEXT NOT NULL, homework_name TEXT NOT NULL,'
+    ' status TEXT NOT NULL, happened_at REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS status_history_homework'
+    ' ON status_history (tenant, homework_name, happened_at, status)',
+)
+# Время проверки — от взятия работы на ревью до ближайшего вердикта.
+TURNAROUND_QUERY = '''
+SELECT happened_at - previous_at FROM (
+    SELECT tenant, status, happened_at,
+        LAG(status) OVER homework AS previous_status,
+        LAG(happened_at) OVER homework AS previous_at
+    FROM status_history
+    {where}
+    WINDOW homework AS (
+        PARTITION BY tenant, homework_name ORDER BY happened_at
+    )
+)
+WHERE previous_status = 'reviewing' AND status IN ({verdicts})
+'''
+_STOP = object()
+
+
+def connect(path):
+    """Открывает базу истории статусов, создавая таблицу и индекс."""
+    connection = sqlite3.connect(path, timeout=30)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    return connection
+
+
+class StatusHistory:
+    """Журнал смен статусов домашних работ в SQLite.
+
+    record() только кладёт событие в очередь, а запись ведёт фоновый
+    поток пачками по BATCH_SIZE в одной транзакции, поэтому цикл опроса
+    не ждёт диска. Запросы открывают собственное соединение и благодаря
+    режиму WAL не блокируют запись.
+    """
+
+    def __init__(self, path, metrics=REGISTRY):
+        self.path = path
+        self.metrics = metrics
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        connect(path).close()
+        self._writer = threading.Thread(
+            target=self._write_loop, name='history', daemon=True
+        )
+        self._writer.start()
+
+    @classmethod
+    def from_env(cls):
+        """Создаёт журнал по пути из HISTORY_DB или None, если он не задан."""
+        path = os.getenv(HISTORY_DB_ENV)
+        if not path:
+            return None
+        return cls(path)
+
+    def record(self, tenant, homework_name, status, happened_at):
+        """Ставит смену статуса в очередь записи."""
+        try:
+            self.queue.put_nowait((tenant, homework_name, status, happened_at))
+        except queue.Full:
+            self.metrics.increment(DROPPED_METRIC)
+
+    def _write_loop(self):
+        connection = connect(self.path)
+        try:
+            while True:
+                batch = [self.queue.get()]
+                while len(batch) < BATCH_SIZE:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = _STOP in batch
+                self._write(connection, [
+                    event for event in batch if event is not _STOP
+                ])
+                for _ in batch:
+                    self.queue.task_done()
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+    def _write(self, connection, events):
+        try:
+            with connection:
+                connection.executemany(
+                    'INSERT INTO status_history VALUES (?, ?, ?, ?)', events
+                )
+        except sqlite3.Error as error:
+            logger.error(f'История статусов не записана: {error}')
+            self.metrics.increment(DROPPED_METRIC, len(events))
+
+    def flush(self):
+        """Дожидается записи всех событий из очереди."""
+        self.queue.join()
+
+    def close(self):
+        """Записывает оставшиеся события и останавливает поток."""
+        self.queue.put(_STOP)
+        self._writer.join()
+
+    def transitions(self, tenant, homework_name):
+        """Возвращает историю работы: список пар (статус, время)."""
+        connection = sqlite3.connect(self.path)
+        try:
+            return connection.execute(
+                'SELECT status, happened_at FROM status_history '
+                'WHERE tenant = ? AND homework_name = ? ORDER BY happened_at',
+                (tenant, homework_name),
+            ).fetchall()
+        finally:
+            connection.close()
+
+    def turnarounds(self, tenants=None):
+        """Возвращает времена проверки работ по когорте тенантов."""
+        return turnarounds(self.path, tenants)
+
+
+def turnarounds(path, tenants=None):
+    """Возвращает времена проверки работ в секундах.
+
+    Без tenants учитываются все тенанты.
+    """
+    where = ''
+    params = list(VERDICTS)
+    if tenants:
+        where = f'WHERE tenant IN ({", ".join("?" * len(tenants))})'
+        params = list(tenants) + params
+    query = TURNAROUND_QUERY.format(
+        where=where, verdicts=', '.join('?' * len(VERDICTS))
+    )
+    connection = sqlite3.connect(path)
+    try:
+        return [row[0] for row in connection.execute(query, params)]
+    finally:
+        connection.close()
+
+
+def turnaround_report(path, tenants=None, fractions=(0.5, 0.9, 0.95)):
+    """Считает перцентили времени проверки по когорте тенантов."""
+    values = turnarounds(path, tenants)
+    report = {'count': len(values)}
+    if values:
+        for fraction in fractions:
+            report[f'p{int(fraction * 100)}'] = percentile(values, fraction)
+    return report
+
+
+def main(argv=None):
+    """Печатает перцентили времени проверки работ."""
+    parser = argparse.ArgumentParser(
+        description='Время проверки домашних работ по истории статусов.'
+    )
+    parser.add_argument('path', help='база истории из HISTORY_DB')
+    parser.add_argument('tenants', nargs='*', help='тенанты когорты')
+    args = parser.parse_args(argv)
+    report = turnaround_report(args.path, args.tenants)
+    if not report['count']:
+        print('Проверенных работ нет')
+        return
+    print(
+        f'Проверено работ: {report["count"]}, '
+        f'p50={report["p50"] / 3600:.1f} ч, '
+        f'p90={report["p90"] / 3600:.1f} ч, '
+        f'p95={report["p95"] / 3600:.1f} ч'
+    )
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,3 +1,4 @@
+import atexit
 import http
 import json
 import logging
@@ -9,6 +10,9 @@ import requests
 import telegram
 from dotenv import load_dotenv
 
+from bounded import BoundedDict
+from constants import RETRY_PERIOD
+from deadletter import protect_from_env
 from exceptions import (
     APIRequestsError,
     APIResponseError,
@@ -17,6 +21,11 @@ from exceptions import (
     UnknownHomeworkStatusError,
     TelegramError,
 )
+from memwatch import MemoryWatchdog
+from pipeline import Event, Pipeline
+from profiling import Profiler
+from recorder import Recorder
+from transfer import METER
 
 load_dotenv()
 
@@ -32,10 +41,10 @@ TOKENS = {
     'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID,
 }
 
-RETRY_PERIOD = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
-PAYLOAD = {'from_date': int(time.time())}
+# Под этим именем учитывается трафик токена из PRACTICUM_TOKEN.
+DEFAULT_TENANT = 'default'
 
 HOMEWORK_VERDICTS = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -57,37 +66,66 @@ def check_tokens():
     return True
 
 
-def send_message(bot, message):
-    """Отправляет сообщение в Telegram чат."""
+def send_to_chat(bot, chat_id, message):
+    """Отправляет сообщение в указанный чат Telegram."""
     try:
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
+        bot.send_message(chat_id=chat_id, text=message)
         logger.debug('Сообщение успешно отправлено в Telegram')
     except telegram.error.TelegramError as error:
         logger.error(error)
-        raise TelegramError('Ошибка при отправке сообщения в Телеграм')
+        raise TelegramError(
+            'Ошибка при отправке сообщения в Телеграм'
+        ) from error
 
 
-def get_api_answer(timestamp):
-    """Делает запрос к единственному эндпоинту API-сервиса."""
+def send_message(bot, message):
+    """Отправляет сообщение в Telegram чат."""
+    send_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def check_status(response):
+    """Проверяет код ответа API."""
+    if response.status_code != http.HTTPStatus.OK:
+        logger.error('Ошибка при запросе к API')
+        raise APIRequestsError(
+            response.status_code,
+            'Ошибка при запросе к API',
+        )
+
+
+def read_homeworks(response):
+    """Проверяет код ответа API и разбирает JSON."""
+    check_status(response)
+    try:
+        return response.json()
+    except json.JSONDecodeError as json_error:
+        logger.error(f'Ошибка при разборе JSON: {json_error}')
+        raise APIResponseError('Ошибка при разборе JSON')
+
+
+def request_homeworks(headers, params, tenant=DEFAULT_TENANT):
+    """Запрашивает статусы домашних работ с заданными заголовками.
+
+    Размер ответа по сети и после распаковки учитывается в METER на
+    тенанта tenant.
+    """
     try:
         homework_statuses = requests.get(
             ENDPOINT,
-            headers=HEADERS,
-            params=PAYLOAD,
+            headers=headers,
+            params=params,
         )
-        if homework_statuses.status_code != http.HTTPStatus.OK:
-            logger.error('Ошибка при запросе к API')
-            raise APIRequestsError(
-                homework_statuses.status_code,
-                'Ошибка при запросе к API',
-            )
-        return homework_statuses.json()
     except requests.RequestException as request_error:
         logger.error(f'Ошибка при запросе к API: {request_error}')
         raise APIRequestsError(f'Ошибка при запросе к API: {request_error}')
-    except json.JSONDecodeError as json_error:
-        logger.error(f'Ошибка при разборе JSON: {json_error}')
-        raise APIResponseError('Ошибка при разборе JSON')
+    homeworks = read_homeworks(homework_statuses)
+    METER.record_response(tenant, homework_statuses)
+    return homeworks
+
+
+def get_api_answer(timestamp):
+    """Делает запрос к единственному эндпоинту API-сервиса."""
+    return request_homeworks(HEADERS, {'from_date': timestamp})
 
 
 def check_response(response):
@@ -102,7 +140,7 @@ def check_response(response):
     if not isinstance(response['homeworks'], list):
         logger.error('Полученная структура данных не список.')
         raise TypeError('Полученная структура данных не список.')
-    return response['homeworks'][0]
+    return response['homeworks']
 
 
 def parse_status(homework):
@@ -117,6 +155,100 @@ def parse_status(homework):
     return f'Изменился статус проверки работы "{homework_name}". {verdict}'
 
 
+def take_homework(event):
+    """Этап конвейера: проверяет ответ API и берёт последнюю работу."""
+    check_response(event.response)
+    if event.trace is not None:
+        event.trace.mark('check_response')
+    homeworks = event.response['homeworks']
+    if not homeworks:
+        logger.debug('Нет ДЗ для проверки')
+        return None
+    event.homework = homeworks[0]
+    return event
+
+
+def describe_status(event):
+    """Этап конвейера: готовит сообщение о статусе работы."""
+    event.message = parse_status(event.homework)
+    if event.trace is not None:
+        event.trace.mark('parse_status')
+    event.homework_name = event.homework['homework_name']
+    return event
+
+
+def is_new_status(event):
+    """Этап конвейера: пропускает только ещё не отправленный статус."""
+    if event.sent_messages.get(event.homework_name) == event.message:
+        logger.debug('Статус домашки не изменился.')
+        return False
+    return True
+
+
+def deliver_status(event):
+    """Этап конвейера: отправляет сообщение в Телеграм."""
+    send_message(event.bot, event.message)
+
+
+def remember_status(event):
+    """Этап конвейера: запоминает отправленный статус."""
+    event.sent_messages[event.homework_name] = event.message
+
+
+def status_pipeline(name):
+    """Собирает этапы от проверки ответа API до отбора нового статуса."""
+    return (
+        Pipeline(name)
+        .enrich(take_homework)
+        .enrich(describe_status)
+        .filter(is_new_status)
+    )
+
+
+def build_pipeline():
+    """Собирает конвейер обработки ответа API с отправкой сообщения.
+
+    Новые этапы добавляются через PIPELINE.use(), например перед
+    deliver_status: PIPELINE.filter(func, before='deliver_status').
+    """
+    return (
+        status_pipeline('homework')
+        .sink(deliver_status)
+        .sink(remember_status)
+    )
+
+
+STATUS_PIPELINE = status_pipeline('status')
+PIPELINE = build_pipeline()
+
+
+def detect_status_change(api_response, sent_messages, trace=None):
+    """Проверяет ответ API и ищет в нём новый статус домашней работы.
+
+    Возвращает пару (название работы, сообщение) или None,
+    если статус не изменился. Если передана трасса, в ней отмечаются
+    этапы check_response и parse_status.
+    """
+    event = STATUS_PIPELINE.run(Event(
+        response=api_response, sent_messages=sent_messages, trace=trace
+    ))
+    if event is None:
+        return None
+    return event.homework_name, event.message
+
+
+def process_response(bot, api_response, sent_messages):
+    """Проводит ответ API через PIPELINE.
+
+    Возвращает True, если событие прошло все этапы, то есть сообщение
+    было отправлено.
+    """
+    return PIPELINE.run(Event(
+        response=api_response, sent_messages=sent_messages, bot=bot,
+        trace=None,
+    )) is not None
+
+
 def main():
     """Основная логика работы бота."""
     logger.setLevel(logging.DEBUG)
@@ -134,27 +266,28 @@ def main():
             'Отсутствуют необходимые переменные окружения'
         )
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    bot = protect_from_env(bot)
+    fetch = get_api_answer
+    recorder = Recorder.from_env(TOKENS)
+    if recorder is not None:
+        bot = recorder.wrap_bot(bot)
+        fetch = recorder.wrap_fetch(get_api_answer)
+        atexit.register(recorder.close)
+    profiler = Profiler.from_env()
+    profiler.install()
+    MemoryWatchdog.from_env().start()
     timestamp = int(time.time())
     initial_timestamp = timestamp - 2000
-    errors_dict = {'error': None}
+    errors_dict = BoundedDict()
 
     while True:
+        profiler.checkpoint()
         try:
-            api_response = get_api_answer(initial_timestamp)
-            check_response(api_response)
-            homework = api_response['homeworks']
-            if not homework:
-                message = 'Нет ДЗ для проверки'
-                logger.debug(message)
-            else:
-                message = parse_status(homework[0])
-                if errors_dict.get(homework[0]['homework_name']) != message:
-                    send_message(bot, message)
-                    timestamp = api_response.get('current_date', timestamp)
-                    errors_dict[homework[0]['homework_name']] = message
-                else:
-                    message = 'Статус домашки не изменился.'
-                    logger.debug(message)
+            api_response = profiler.call(fetch, initial_timestamp)
+            if profiler.call(
+                process_response, bot, api_response, errors_dict
+            ):
+                timestamp = api_response.get('current_date', timestamp)
         except Exception as error:
             message = f'Сбой в работе программы: {error}'
             if errors_dict['error'] != message:
@@ -0,0 +1,210 @@
+import logging
+import math
+import os
+import socket
+import sqlite3
+
+from clock import Clock
+from tenants import diff_tenants
+
+logger = logging.getLogger(__name__)
+
+LEASE_DB_ENV = 'LEASE_DB'
+LEASE_OWNER_ENV = 'DYNO'
+# Аренда продлевается на каждом проходе, а проходы идут не реже раза в
+# минуту; после падения обработчика его тенантов подхватят через две минуты.
+LEASE_TTL = 120
+# Если базу не удаётся прочитать, тенанты отпускаются за столько секунд до
+# истечения аренды: до следующей проверки пройдёт не больше минуты
+# (worker.REFRESH_INTERVAL) и один проход опроса.
+RENEW_MARGIN = 90
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS workers ('
+    ' owner TEXT PRIMARY KEY, expires REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS leases ('
+    ' tenant TEXT PRIMARY KEY, owner TEXT NOT NULL,'
+    ' expires REAL NOT NULL, cursor INTEGER)',
+)
+
+
+def default_owner():
+    """Возвращает имя обработчика: DYNO на Heroku или хост и pid."""
+    return (
+        os.getenv(LEASE_OWNER_ENV) or f'{socket.gethostname()}:{os.getpid()}'
+    )
+
+
+class LeaseStore:
+    """Аренда тенантов обработчиками в общей базе SQLite.
+
+    Каждый обработчик отмечается в таблице workers и держит не больше
+    равной доли тенантов на число живых обработчиков: при появлении нового
+    обработчика остальные отпускают лишнее, при падении — его аренды
+    истекают через ttl и разбираются выжившими. Вместе с арендой хранится
+    from_date последнего прохода, чтобы новый владелец продолжил опрос с
+    того же места.
+    """
+
+    def __init__(self, path, owner=None, ttl=LEASE_TTL, clock=None):
+        self.path = path
+        self.owner = owner or default_owner()
+        self.ttl = ttl
+        self.clock = clock or Clock()
+        self.connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None
+        )
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Создаёт хранилище по пути из LEASE_DB или None, если он не задан."""
+        path = os.getenv(LEASE_DB_ENV)
+        if not path:
+            return None
+        return cls(path, **kwargs)
+
+    def _transaction(self, action, *args):
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = action(*args)
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+        return result
+
+    def claim(self, names):
+        """Продлевает и захватывает аренды из names.
+
+        Возвращает множество тенантов, которыми владеет этот обработчик.
+        """
+        return self._transaction(self._claim, set(names))
+
+    def _claim(self, names):
+        now = self.clock.time()
+        expires = now + self.ttl
+        execute = self.connection.execute
+        execute(
+            'INSERT OR REPLACE INTO workers (owner, expires) VALUES (?, ?)',
+            (self.owner, expires),
+        )
+        execute('DELETE FROM workers WHERE expires < ?', (now,))
+        live = execute('SELECT COUNT(*) FROM workers').fetchone()[0]
+        share = math.ceil(len(names) / live)
+        taken = {}
+        for tenant, owner in execute(
+            'SELECT tenant, owner FROM leases WHERE expires >= ?', (now,)
+        ):
+            taken[tenant] = owner
+        own = sorted(
+            name for name in names if taken.get(name) == self.owner
+        )
+        free = sorted(name for name in names if name not in taken)
+        owned = own[:share] + free[:max(share - len(own), 0)]
+        # отпущенные аренды истекают сразу, но сохраняют from_date для
+        # следующего владельца
+        execute(
+            'UPDATE leases SET expires = 0 WHERE owner = ?', (self.owner,)
+        )
+        self.connection.executemany(
+            'INSERT INTO leases (tenant, owner, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (tenant) DO UPDATE '
+            'SET owner = excluded.owner, expires = excluded.expires',
+            [(name, self.owner, expires) for name in owned],
+        )
+        return set(owned)
+
+    def cursor(self, name):
+        """Возвращает сохранённый from_date тенанта или None."""
+        row = self.connection.execute(
+            'SELECT cursor FROM leases WHERE tenant = ?', (name,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def save_cursors(self, cursors):
+        """Сохраняет from_date тенантов, которыми владеет обработчик."""
+        self._transaction(
+            self.connection.executemany,
+            'UPDATE leases SET cursor = ? WHERE tenant = ? AND owner = ?',
+            [
+                (from_date, name, self.owner)
+                for name, from_date in cursors.items()
+            ],
+        )
+
+    def release_all(self):
+        """Отпускает все аренды, чтобы их сразу подхватили другие."""
+        self._transaction(self._release_all)
+
+    def _release_all(self):
+        self.connection.execute(
+            'UPDATE leases SET expires = 0 WHERE owner = ?', (self.owner,)
+        )
+        self.connection.execute(
+            'DELETE FROM workers WHERE owner = ?', (self.owner,)
+        )
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        self.connection.close()
+
+
+class LeasedRegistry:
+    """Реестр, отдающий обработчику только арендованных им тенантов.
+
+    Оборачивает обычный реестр: каждое обращение продлевает аренды, и
+    изменения набора арендованных тенантов возвращаются как TenantChanges.
+    """
+
+    def __init__(self, registry, store, margin=RENEW_MARGIN):
+        self.registry = registry
+        self.store = store
+        self.margin = margin
+        self.available = {}
+        self.tenants = {}
+        self.renewed = None
+
+    def _apply(self, changes):
+        for tenant in changes.added + changes.changed:
+            self.available[tenant.name] = tenant
+        for tenant in changes.removed:
+            self.available.pop(tenant.name, None)
+
+    def reload_if_changed(self):
+        """Продлевает аренды и возвращает изменения своих тенантов.
+
+        Возвращает None, если набор арендованных тенантов не изменился.
+        Если база недоступна, прежние тенанты опрашиваются, пока до
+        истечения их аренды остаётся больше margin секунд, а затем
+        отпускаются все — раньше, чем их может захватить другой обработчик.
+        """
+        changes = self.registry.reload_if_changed()
+        if changes is not None:
+            self._apply(changes)
+        now = self.store.clock.time()
+        try:
+            owned = self.store.claim(self.available)
+        except sqlite3.Error as error:
+            logger.error(f'Аренды не продлены: {error}')
+            renewed = self.renewed
+            expires = self.store.ttl - self.margin
+            if renewed is not None and now - renewed < expires:
+                return None
+            owned = set()
+        else:
+            self.renewed = now
+        tenants = {
+            name: tenant for name, tenant in self.available.items()
+            if name in owned
+        }
+        changes = diff_tenants(self.tenants, tenants)
+        self.tenants = tenants
+        if not any(changes):
+            return None
+        logger.info(
+            f'Аренды {self.store.owner}: +{len(changes.added)} '
+            f'-{len(changes.removed)}, всего {len(tenants)}'
+        )
+        return changes
@@ -0,0 +1,128 @@
+import logging
+import os
+import resource
+import threading
+import tracemalloc
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MEMORY_BUDGET_ENV = 'MEMORY_BUDGET_MB'
+TRACEMALLOC_ENV = 'TRACEMALLOC_FRAMES'
+WATCHDOG_INTERVAL_ENV = 'MEMORY_WATCHDOG_INTERVAL'
+INTERVAL = 300
+TOP = 10
+RSS_METRIC = 'memory_rss_bytes'
+TRACED_METRIC = 'memory_traced_bytes'
+EXCEEDED_METRIC = 'memory_budget_exceeded'
+
+
+def rss():
+    """Возвращает текущий объём резидентной памяти процесса в байтах.
+
+    Без /proc (не Linux) возвращается пиковый объём из getrusage.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryWatchdog:
+    """Сторож памяти долгоживущего процесса опроса.
+
+    Раз в interval секунд фоновый поток публикует RSS в метриках и, если
+    задан frames, выводит в лог места, где с прошлой проверки выросло
+    больше всего памяти по tracemalloc. Превышение budget байт
+    логируется как ошибка. Без budget и frames сторож не запускается.
+    """
+
+    def __init__(self, budget=None, frames=0, interval=INTERVAL, top=TOP,
+                 metrics=REGISTRY, measure=rss):
+        self.budget = budget
+        self.frames = frames
+        self.interval = interval
+        self.top = top
+        self.metrics = metrics
+        self.measure = measure
+        self._previous = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        """Создаёт сторожа по MEMORY_BUDGET_MB и TRACEMALLOC_FRAMES."""
+        budget = os.getenv(MEMORY_BUDGET_ENV)
+        return cls(
+            budget=float(budget) * 1024 * 1024 if budget else None,
+            frames=int(os.getenv(TRACEMALLOC_ENV, 0)),
+            interval=float(os.getenv(WATCHDOG_INTERVAL_ENV, INTERVAL)),
+        )
+
+    @property
+    def enabled(self):
+        """Задан ли бюджет памяти или трассировка выделений."""
+        return self.budget is not None or self.frames > 0
+
+    def top_growth(self):
+        """Возвращает места с наибольшим ростом памяти с прошлого вызова.
+
+        Список строк tracemalloc.StatisticDiff; при первом вызове рост
+        считается от нуля.
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        if self._previous is None:
+            stats = snapshot.statistics('lineno')
+        else:
+            stats = snapshot.compare_to(self._previous, 'lineno')
+        self._previous = snapshot
+        return stats[:self.top]
+
+    def check(self):
+        """Проверяет память; возвращает True, если бюджет превышен."""
+        used = self.measure()
+        self.metrics.set(RSS_METRIC, used)
+        if tracemalloc.is_tracing():
+            self.metrics.set(TRACED_METRIC, tracemalloc.get_traced_memory()[0])
+            for stat in self.top_growth():
+                logger.info(f'Рост памяти: {stat}')
+        if self.budget is None or used <= self.budget:
+            return False
+        self.metrics.increment(EXCEEDED_METRIC)
+        logger.error(
+            f'Память процесса {used / 2 ** 20:.0f} МиБ превышает бюджет '
+            f'{self.budget / 2 ** 20:.0f} МиБ'
+        )
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as error:
+                logger.error(f'Сбой проверки памяти: {error}')
+
+    def start(self):
+        """Запускает фоновые проверки, если сторож включён."""
+        if not self.enabled:
+            return False
+        if self.frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._thread = threading.Thread(
+            target=self._run, name='memory-watchdog', daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def close(self):
+        """Останавливает проверки и трассировку выделений."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.frames > 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
@@ -0,0 +1,56 @@
+import threading
+import weakref
+
+
+class Metrics:
+    """Потокобезопасный реестр счётчиков и текущих значений.
+
+    Источники из add_source публикуют свои значения методом publish()
+    только при чтении метрик, а не при каждом изменении.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+        self._sources = weakref.WeakSet()
+
+    def add_source(self, source):
+        """Добавляет источник, публикуемый при чтении метрик.
+
+        Реестр не удерживает источник: удалённый объект перестаёт
+        публиковаться.
+        """
+        with self._lock:
+            self._sources.add(source)
+
+    def collect(self):
+        """Просит источники опубликовать текущие значения."""
+        with self._lock:
+            sources = list(self._sources)
+        for source in sources:
+            source.publish(self)
+
+    def set(self, name, value):
+        """Записывает текущее значение метрики."""
+        with self._lock:
+            self._values[name] = value
+
+    def increment(self, name, value=1):
+        """Увеличивает счётчик."""
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + value
+
+    def get(self, name, default=None):
+        """Возвращает значение метрики."""
+        self.collect()
+        with self._lock:
+            return self._values.get(name, default)
+
+    def snapshot(self):
+        """Возвращает копию всех метрик."""
+        self.collect()
+        with self._lock:
+            return dict(self._values)
+
+
+REGISTRY = Metrics()
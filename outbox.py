@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from clock import Clock
+from deadletter import decide
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_FILE_ENV = 'OUTBOX_FILE'
+# Журнал переписывается, когда в нём накопилось столько подтверждений.
+COMPACT_AFTER = 10000
+DROPPED_METRIC = 'outbox_dropped'
+
+Entry = namedtuple('Entry', ('id', 'tenant', 'chat_id', 'text'))
+
+
+class Outbox:
+    """Журнал исходящих сообщений с упреждающей записью.
+
+    Сообщение попадает в журнал до отправки и помечается подтверждённым
+    после успешного ответа Telegram. Записи копятся в буфере и сбрасываются
+    на диск одним fsync на пачку, поэтому стоимость fsync не растёт с числом
+    сообщений. После аварийного перезапуска неподтверждённые сообщения
+    отправляются заново; дубль возможен только для сообщения, отправленного
+    между последним fsync подтверждений и падением. Без пути журнал
+    работает только в памяти.
+
+    Неудачная отправка повторяется по политике deadletter.decide: с
+    экспоненциальной паузой, ограниченным числом попыток и без повторов
+    для заблокированных и несуществующих чатов — такие сообщения
+    выбрасываются. Счётчик попыток хранится только в памяти.
+    """
+
+    def __init__(self, path=None, clock=None, metrics=REGISTRY):
+        self.path = path
+        self.clock = clock or Clock()
+        self.metrics = metrics
+        self.pending = OrderedDict()
+        # id записи -> (число неудачных попыток, время следующей попытки)
+        self.retries = {}
+        self._next_id = 1
+        self._acked = 0
+        self._lock = threading.Lock()
+        self._file = None
+        if path:
+            self._recover()
+            self._file = open(path, 'a', encoding='utf-8')
+
+    @classmethod
+    def from_env(cls):
+        """Создаёт журнал по пути из переменной OUTBOX_FILE."""
+        return cls(os.getenv(OUTBOX_FILE_ENV))
+
+    def _recover(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    self._replay(json.loads(line))
+                except (json.JSONDecodeError, TypeError):
+                    logger.warning('Повреждённая запись журнала пропущена')
+        if self.pending:
+            logger.info(
+                f'В журнале {len(self.pending)} неотправленных сообщений'
+            )
+
+    def _replay(self, record):
+        if 'ack' in record:
+            self.pending.pop(record['ack'], None)
+            self._acked += 1
+            return
+        # повторная запись с тем же id — сообщение, перенаправленное в
+        # новый чат, — заменяет прежнюю
+        entry = Entry(**record)
+        next_id = entry.id + 1
+        self.pending[entry.id] = entry
+        self._next_id = max(self._next_id, next_id)
+
+    def _append(self, record):
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def put(self, tenant, chat_id, text):
+        """Ставит сообщение в журнал; на диск оно попадёт при flush()."""
+        with self._lock:
+            entry = Entry(self._next_id, tenant, chat_id, text)
+            self._next_id += 1
+            self.pending[entry.id] = entry
+            self._append(entry._asdict())
+        return entry
+
+    def ack(self, entry_id):
+        """Помечает сообщение доставленным."""
+        with self._lock:
+            self.retries.pop(entry_id, None)
+            if self.pending.pop(entry_id, None) is not None:
+                self._append({'ack': entry_id})
+                self._acked += 1
+
+    def drop(self, entry, error):
+        """Выбрасывает сообщение, которое повторы не доставят."""
+        logger.warning(
+            f'{entry.tenant}: сообщение {entry.id} выброшено: {error}'
+        )
+        self.metrics.increment(DROPPED_METRIC)
+        self.ack(entry.id)
+
+    def failed(self, entry, error):
+        """Назначает повтор сообщения после неудачи.
+
+        Возвращает False, если сообщение выброшено и следующие сообщения
+        чата можно отправлять.
+        """
+        attempts = self.retries.get(entry.id, (0, 0))[0] + 1
+        decision = decide(error, attempts)
+        if decision.action == 'drop':
+            self.drop(entry, error)
+            return False
+        now = self.clock.time()
+        with self._lock:
+            if decision.action == 'migrate':
+                migrated = entry._replace(chat_id=decision.new_chat_id)
+                self.pending[entry.id] = migrated
+                self._append(migrated._asdict())
+            self.retries[entry.id] = (attempts, now + decision.delay)
+        return True
+
+    def waiting(self, entry, now):
+        """Проверяет, не наступил ли ещё срок повтора сообщения."""
+        return self.retries.get(entry.id, (0, 0))[1] > now
+
+    def flush(self):
+        """Сбрасывает накопленные записи на диск одним fsync."""
+        if self._file is None:
+            return
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if self._acked >= COMPACT_AFTER:
+                self._compact()
+
+    def _compact(self):
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            for entry in self.pending.values():
+                file.write(json.dumps(entry._asdict(), ensure_ascii=False))
+                file.write('\n')
+            file.flush()
+            os.fsync(file.fileno())
+        self._file.close()
+        os.replace(temporary, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._acked = 0
+
+    def deliver(self, send, executor=None):
+        """Отправляет неподтверждённые сообщения.
+
+        Сообщения одного чата уходят в порядке постановки; после первой
+        неудачи остальные сообщения этого чата ждут, пока не наступит срок
+        повтора неудачного.
+        Если передан executor, разные чаты обслуживаются параллельно.
+        send(entry) должна бросить исключение при неудаче. Возвращает
+        список доставленных записей.
+        """
+        self.flush()
+        chats = OrderedDict()
+        for entry in list(self.pending.values()):
+            chats.setdefault(entry.chat_id, []).append(entry)
+        if executor is None:
+            results = [
+                self._deliver_chat(send, entries)
+                for entries in chats.values()
+            ]
+        else:
+            futures = [
+                executor.submit(self._deliver_chat, send, entries)
+                for entries in chats.values()
+            ]
+            results = [future.result() for future in futures]
+        self.flush()
+        return [entry for delivered in results for entry in delivered]
+
+    def _deliver_chat(self, send, entries):
+        delivered = []
+        now = self.clock.time()
+        for entry in entries:
+            if self.waiting(entry, now):
+                break
+            try:
+                send(entry)
+            except Exception as error:
+                logger.error(
+                    f'{entry.tenant}: сообщение {entry.id} не доставлено: '
+                    f'{error}'
+                )
+                if self.failed(entry, error):
+                    break
+                continue
+            self.ack(entry.id)
+            delivered.append(entry)
+        return delivered
+
+    def close(self):
+        """Сбрасывает журнал на диск и закрывает файл."""
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
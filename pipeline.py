@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from types import SimpleNamespace
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('filter', 'enrich', 'sink')
+MODES = ('sync', 'thread', 'async')
+THREADS = 4
+
+Stage = namedtuple('Stage', ('name', 'func', 'kind', 'mode'))
+
+
+class Event(SimpleNamespace):
+    """Событие конвейера: ответ API и поля, добавленные этапами."""
+
+
+class StageTiming:
+    """Число вызовов и время выполнения этапа."""
+
+    __slots__ = ('calls', 'total', 'max')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed):
+        """Учитывает один вызов."""
+        self.calls += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def merge(self, other):
+        """Добавляет вызовы, учтённые в другом StageTiming."""
+        self.calls += other.calls
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+
+class Pipeline:
+    """Цепочка этапов обработки события с замером времени каждого этапа.
+
+    Этапы бывают трёх видов: filter возвращает истину, чтобы пропустить
+    событие дальше; enrich возвращает событие (то же или новое), None
+    останавливает цепочку; sink выполняет действие, его результат не
+    важен. Каждый этап выполняется синхронно, в пуле потоков или как
+    корутина в фоновом цикле asyncio. Filter и enrich в любом режиме
+    дожидаются результата, а sink в режимах thread и async отсоединяется:
+    цепочка идёт дальше, не ожидая его завершения.
+
+    Время этапов копится без блокировок, отдельно в каждом потоке, и
+    сводится только в timings() и при чтении метрик: тогда оно
+    публикуется как pipeline_<имя>_<этап>_calls и
+    pipeline_<имя>_<этап>_seconds.
+    """
+
+    def __init__(self, name='pipeline', threads=THREADS, metrics=REGISTRY):
+        self.name = name
+        self.threads = threads
+        self.metrics = metrics
+        self.stages = []
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._executor = None
+        self._loop = None
+        self._detached = set()
+        metrics.add_source(self)
+
+    def use(self, func, name=None, kind='enrich', mode='sync', before=None):
+        """Добавляет этап в конец цепочки или перед этапом before.
+
+        Возвращает конвейер, чтобы вызовы можно было объединять в цепочку.
+        """
+        if kind not in KINDS:
+            raise ValueError(f'Неизвестный вид этапа {kind!r}')
+        if mode not in MODES:
+            raise ValueError(f'Неизвестный режим этапа {mode!r}')
+        stage = Stage(name or func.__name__, func, kind, mode)
+        if before is None:
+            self.stages.append(stage)
+            return self
+        names = [existing.name for existing in self.stages]
+        self.stages.insert(names.index(before), stage)
+        return self
+
+    def filter(self, func, **kwargs):
+        """Добавляет фильтр."""
+        return self.use(func, kind='filter', **kwargs)
+
+    def enrich(self, func, **kwargs):
+        """Добавляет этап, дополняющий событие."""
+        return self.use(func, kind='enrich', **kwargs)
+
+    def sink(self, func, **kwargs):
+        """Добавляет завершающее действие."""
+        return self.use(func, kind='sink', **kwargs)
+
+    def run(self, event):
+        """Проводит событие по цепочке.
+
+        Возвращает событие после последнего этапа или None, если его
+        остановил фильтр или enrich. Исключения синхронно выполняемых
+        этапов передаются вызывающему.
+        """
+        for stage in self.stages:
+            if stage.kind == 'sink' and stage.mode != 'sync':
+                self._detach(stage, event)
+                continue
+            result = self._call(stage, event)
+            if stage.kind == 'filter' and not result:
+                return None
+            if stage.kind == 'enrich':
+                if result is None:
+                    return None
+                event = result
+        return event
+
+    def _call(self, stage, event):
+        started = time.perf_counter()
+        try:
+            if stage.mode == 'sync':
+                return stage.func(event)
+            if stage.mode == 'thread':
+                return self.executor.submit(stage.func, event).result()
+            return asyncio.run_coroutine_threadsafe(
+                stage.func(event), self.loop
+            ).result()
+        finally:
+            self._record(stage.name, time.perf_counter() - started)
+
+    def _detach(self, stage, event):
+        started = time.perf_counter()
+        if stage.mode == 'thread':
+            future = self.executor.submit(stage.func, event)
+        else:
+            future = asyncio.run_coroutine_threadsafe(
+                stage.func(event), self.loop
+            )
+        with self._lock:
+            self._detached.add(future)
+
+        def done(future):
+            with self._lock:
+                self._detached.discard(future)
+            self._record(stage.name, time.perf_counter() - started)
+            if not future.cancelled() and future.exception() is not None:
+                logger.error(
+                    f'Этап {stage.name} завершился ошибкой: '
+                    f'{future.exception()}'
+                )
+
+        future.add_done_callback(done)
+
+    def _record(self, stage, elapsed):
+        # Каждый поток пишет только в свой словарь, поэтому блокировка
+        # нужна лишь при первом замере в потоке.
+        shard = getattr(self._local, 'timings', None)
+        if shard is None:
+            shard = self._local.timings = {}
+            with self._lock:
+                self._shards.append(shard)
+        timing = shard.get(stage)
+        if timing is None:
+            timing = shard[stage] = StageTiming()
+        timing.add(elapsed)
+
+    def _merged(self):
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for stage, timing in list(shard.items()):
+                merged.setdefault(stage, StageTiming()).merge(timing)
+        return merged
+
+    def timings(self):
+        """Возвращает словарь этап -> число вызовов, среднее и максимум."""
+        return {
+            stage: {
+                'calls': timing.calls,
+                'mean': timing.total / timing.calls,
+                'max': timing.max,
+            }
+            for stage, timing in self._merged().items()
+        }
+
+    def publish(self, metrics):
+        """Публикует число вызовов и суммарное время этапов в metrics."""
+        for stage, timing in self._merged().items():
+            prefix = f'pipeline_{self.name}_{stage}'
+            metrics.set(f'{prefix}_calls', timing.calls)
+            metrics.set(f'{prefix}_seconds', timing.total)
+
+    @property
+    def executor(self):
+        """Пул потоков для этапов в режиме thread, создаётся по требованию."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.threads,
+                    thread_name_prefix=f'pipeline-{self.name}',
+                )
+            return self._executor
+
+    @property
+    def loop(self):
+        """Фоновый цикл asyncio для этапов в режиме async."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name=f'pipeline-{self.name}-asyncio', daemon=True,
+                ).start()
+            return self._loop
+
+    def flush(self, timeout=None):
+        """Дожидается завершения отсоединённых этапов."""
+        with self._lock:
+            pending = list(self._detached)
+        wait(pending, timeout=timeout)
+
+    def close(self):
+        """Дожидается отсоединённых этапов и останавливает пул и цикл."""
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
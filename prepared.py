@@ -0,0 +1,98 @@
+import logging
+
+import requests
+from urllib3.exceptions import HTTPError
+
+import homework
+from exceptions import APIRequestsError
+from transfer import ACCEPT_ENCODING, METER, read_json
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = 30
+POOL_SIZE = 16
+
+
+class PreparedRequests:
+    """Заготовки запросов к API Практикума по тенантам.
+
+    Заголовки, URL с закодированными параметрами и объект запроса
+    собираются один раз на тенанта; на каждом опросе меняется только
+    хвост URL с from_date. Запросы идут через общую сессию с пулом
+    keep-alive соединений и просят ответ, сжатый gzip. Заготовка
+    пересобирается при смене токена тенанта или ENDPOINT. Один тенант не
+    опрашивается двумя потоками одновременно, поэтому заготовку можно
+    менять без блокировки.
+    """
+
+    def __init__(self, session=None, timeout=TIMEOUT, pool_size=POOL_SIZE,
+                 meter=METER):
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', requests.adapters.HTTPAdapter(
+                pool_connections=1, pool_maxsize=pool_size
+            ))
+        self.session = session
+        self.timeout = timeout
+        self.meter = meter
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._cache)
+
+    def prepare(self, tenant, from_date):
+        """Возвращает заготовку запроса тенанта с нужным from_date."""
+        cached = self._cache.get(tenant.name)
+        if cached is None or cached[0] != (
+            tenant.practicum_token, homework.ENDPOINT
+        ):
+            cached = self._build(tenant)
+        _, prefix, request = cached
+        request.url = prefix + str(from_date)
+        return request
+
+    def forget(self, name):
+        """Забывает заготовку запроса тенанта, удалённого из реестра."""
+        self._cache.pop(name, None)
+
+    def _build(self, tenant):
+        request = requests.Request(
+            'GET', homework.ENDPOINT,
+            headers={
+                'Authorization': f'OAuth {tenant.practicum_token}',
+                'Accept-Encoding': ACCEPT_ENCODING,
+            },
+        )
+        prepared = self.session.prepare_request(request)
+        separator = '&' if '?' in prepared.url else '?'
+        cached = (
+            (tenant.practicum_token, homework.ENDPOINT),
+            f'{prepared.url}{separator}from_date=',
+            prepared,
+        )
+        self._cache[tenant.name] = cached
+        return cached
+
+    def fetch(self, tenant, from_date):
+        """Запрашивает статусы домашних работ тенанта.
+
+        Тело ответа читается потоком и распаковывается по мере получения;
+        размер по сети и после распаковки учитывается в meter.
+        """
+        try:
+            response = self.session.send(
+                self.prepare(tenant, from_date), timeout=self.timeout,
+                stream=True,
+            )
+            with response:
+                homework.check_status(response)
+                data, (wire, decoded) = read_json(
+                    response.raw, response.headers.get('Content-Encoding')
+                )
+        except (requests.RequestException, HTTPError) as request_error:
+            logger.error(f'Ошибка при запросе к API: {request_error}')
+            raise APIRequestsError(
+                f'Ошибка при запросе к API: {request_error}'
+            )
+        self.meter.record(tenant.name, wire, decoded)
+        return data
@@ -0,0 +1,147 @@
+import cProfile
+import logging
+import os
+import pstats
+import signal
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FILE_ENV = 'PROFILE_FILE'
+DEFAULT_PROFILE_FILE = 'poll.prof'
+# Функции конвейера опроса, по которым в лог и отчёт выводится сводка.
+STAGES = (
+    'get_api_answer',
+    'request_homeworks',
+    'fetch_tenant',
+    'check_response',
+    'parse_status',
+    'send_message',
+    'send_to_chat',
+)
+
+
+def stage_summary(stats, stages=STAGES):
+    """Возвращает число вызовов и суммарное время функций конвейера.
+
+    Результат — словарь имя функции -> (вызовы, время с вложенными
+    вызовами); функции, которые не вызывались, в него не попадают.
+    """
+    summary = defaultdict(lambda: [0, 0.0])
+    for (_, _, name), (_, calls, _, cumulative, _) in stats.stats.items():
+        if name in stages:
+            summary[name][0] += calls
+            summary[name][1] += cumulative
+    return {name: tuple(values) for name, values in summary.items()}
+
+
+class Profiler:
+    """Профилировщик цикла опроса, включаемый сигналом на ходу.
+
+    Сигнал только запрашивает переключение, а включение и выгрузка
+    происходят в checkpoint() между проходами опроса, когда ни один вызов
+    не выполняется. Каждый поток пишет в свой cProfile.Profile, при
+    выгрузке профили объединяются. В выключенном состоянии call() стоит
+    одной проверки флага.
+    """
+
+    def __init__(self, path=DEFAULT_PROFILE_FILE):
+        self.path = path
+        self.enabled = False
+        self.requested = False
+        self._profiles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Создаёт профилировщик с файлом выгрузки из PROFILE_FILE."""
+        return cls(os.getenv(PROFILE_FILE_ENV, DEFAULT_PROFILE_FILE))
+
+    def install(self, signum=None):
+        """Переключает профилирование по сигналу, по умолчанию SIGUSR2.
+
+        Возвращает False, если сигнал недоступен на этой платформе или
+        вызов сделан не из главного потока.
+        """
+        signum = signum or getattr(signal, 'SIGUSR2', None)
+        if signum is None:
+            logger.warning('Сигнал для профилирования недоступен')
+            return False
+        try:
+            signal.signal(signum, lambda *args: self.toggle())
+        except ValueError as error:
+            logger.warning(f'Сигнал профилирования не установлен: {error}')
+            return False
+        return True
+
+    def toggle(self):
+        """Запрашивает включение или выключение профилирования."""
+        self.requested = not self.requested
+
+    def checkpoint(self):
+        """Применяет запрошенное переключение."""
+        if self.requested == self.enabled:
+            return
+        if self.requested:
+            self.start()
+        else:
+            self.stop()
+
+    def start(self):
+        """Начинает сбор профиля с чистого листа."""
+        with self._lock:
+            self._profiles = []
+            self._local = threading.local()
+        self.enabled = True
+        logger.info('Профилирование цикла опроса включено')
+
+    def stop(self):
+        """Останавливает сбор и выгружает профиль."""
+        self.enabled = False
+        self.dump()
+
+    def _profile(self):
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profile)
+        return profile
+
+    def call(self, func, *args, **kwargs):
+        """Вызывает func, профилируя вызов, если профилирование включено.
+
+        Вызовы call() не должны быть вложенными в пределах одного потока.
+        """
+        if not self.enabled:
+            return func(*args, **kwargs)
+        return self._profile().runcall(func, *args, **kwargs)
+
+    def dump(self):
+        """Выгружает собранный профиль.
+
+        В path пишется профиль в формате pstats (для snakeviz и
+        python -m pstats), рядом в path.txt — текстовый отчёт. Сводка по
+        функциям конвейера дублируется в лог. Возвращает объект
+        pstats.Stats или None, если данных нет.
+        """
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            logger.info('Профилирование выключено, данных нет')
+            return None
+        stats = pstats.Stats(*profiles)
+        stats.dump_stats(self.path)
+        with open(self.path + '.txt', 'w', encoding='utf-8') as report:
+            stats.stream = report
+            stats.sort_stats('cumulative')
+            stats.print_stats(rf'\b({"|".join(STAGES)})\b')
+            stats.print_stats(30)
+        for name, (calls, cumulative) in stage_summary(stats).items():
+            logger.info(
+                f'Профиль: {name} вызовов {calls}, всего {cumulative:.3f} с'
+            )
+        logger.info(f'Профиль выгружен в {self.path}')
+        return stats
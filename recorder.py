@@ -0,0 +1,132 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RECORD_FILE_ENV = 'RECORD_FILE'
+REDACTED = '***'
+FLUSH_EVERY = 50
+
+
+class RecordingBot:
+    """Обёртка над ботом, записывающая каждый вызов send_message."""
+
+    def __init__(self, bot, recorder):
+        self._bot = bot
+        self._recorder = recorder
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Отправляет сообщение и записывает факт отправки."""
+        result = self._bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        self._recorder.record_send(chat_id, text)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._bot, name)
+
+
+class Recorder:
+    """Пишет ответы API и отправленные сообщения в сжатый JSONL-файл.
+
+    Значения токенов вырезаются из полей записи до её сериализации:
+    строки теряют вхождения токена, а число, совпадающее с токеном
+    (например, chat_id), заменяется целиком. Числа, лишь содержащие
+    цифры токена, остаются как есть.
+    """
+
+    def __init__(self, path, secrets=()):
+        self.path = path
+        self._secrets = [secret for secret in secrets if secret]
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @classmethod
+    def from_env(cls, tokens):
+        """Создаёт рекордер, если задана переменная RECORD_FILE."""
+        path = os.getenv(RECORD_FILE_ENV)
+        if not path:
+            return None
+        logger.info(f'Запись трафика в файл {path}')
+        return cls(path, secrets=tokens.values())
+
+    def wrap_bot(self, bot):
+        """Возвращает бота, вызовы которого попадают в запись."""
+        return RecordingBot(bot, self)
+
+    def wrap_fetch(self, fetch):
+        """Возвращает функцию опроса API, ответы и ошибки которой пишутся."""
+        def recording_fetch(from_date):
+            try:
+                response = fetch(from_date)
+            except Exception as error:
+                self.record_error(error)
+                raise
+            self.record_response(from_date, response)
+            return response
+        return recording_fetch
+
+    def record_response(self, from_date, response):
+        """Записывает ответ API на запрос с указанным from_date."""
+        self._write({'kind': 'api', 'from_date': from_date,
+                     'response': response})
+
+    def record_error(self, error):
+        """Записывает ошибку, возникшую при опросе API."""
+        self._write({'kind': 'error', 'error': str(error)})
+
+    def record_send(self, chat_id, text):
+        """Записывает отправленное в Telegram сообщение."""
+        self._write({'kind': 'send', 'chat_id': chat_id, 'text': text})
+
+    def close(self):
+        """Сбрасывает буфер и закрывает файл записи."""
+        with self._lock:
+            self._file.close()
+
+    def _redact(self, value):
+        if isinstance(value, dict):
+            return {key: self._redact(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._redact(item) for item in value]
+        if isinstance(value, str):
+            for secret in self._secrets:
+                value = value.replace(secret, REDACTED)
+            return value
+        if isinstance(value, int) and not isinstance(value, bool):
+            if str(value) in self._secrets:
+                return REDACTED
+        return value
+
+    def _write(self, record):
+        record['t'] = time.time()
+        line = json.dumps(self._redact(record), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._pending += 1
+            if self._pending >= FLUSH_EVERY:
+                self._file.flush()
+                self._pending = 0
+
+
+def read_records(path):
+    """Построчно читает записи из файла рекордера.
+
+    Строки, которые не удалось разобрать, пропускаются; оборванный при
+    аварийной остановке хвост сжатого файла завершает чтение.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        try:
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f'{path}: строка {number} пропущена')
+        except EOFError:
+            logger.warning(f'Файл записи {path} обрезан, хвост пропущен')
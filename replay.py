@@ -0,0 +1,85 @@
+import argparse
+import logging
+import sys
+import time
+
+from exceptions import APIRequestsError
+from homework import process_response
+from recorder import read_records
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPEED = 60.0
+
+
+class ReplayBot:
+    """Бот-заглушка: копит сообщения вместо отправки в Telegram."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Запоминает сообщение, которое было бы отправлено."""
+        self.sent.append((chat_id, text))
+
+
+def replay(path, speed=DEFAULT_SPEED, bot=None, sleep=time.sleep):
+    """Прогоняет записанный трафик через конвейер обработки ответа API.
+
+    Паузы между записями сжимаются в speed раз; при speed=0 воспроизведение
+    идёт без пауз. Возвращает словарь со статистикой прогона.
+    """
+    bot = bot or ReplayBot()
+    sent_messages = {'error': None}
+    stats = {
+        'responses': 0,
+        'errors': 0,
+        'recorded_sends': 0,
+        'replayed_sends': 0,
+        'processing_time': 0.0,
+        'max_processing_time': 0.0,
+    }
+    previous_t = None
+    for record in read_records(path):
+        if previous_t is not None and speed:
+            sleep(max(record['t'] - previous_t, 0) / speed)
+        previous_t = record['t']
+        if record['kind'] == 'send':
+            stats['recorded_sends'] += 1
+            continue
+        started = time.perf_counter()
+        try:
+            if record['kind'] == 'error':
+                raise APIRequestsError(record['error'])
+            stats['responses'] += 1
+            if process_response(bot, record['response'], sent_messages):
+                stats['replayed_sends'] += 1
+        except Exception as error:
+            stats['errors'] += 1
+            logger.debug(f'Сбой при воспроизведении: {error}')
+        elapsed = time.perf_counter() - started
+        stats['processing_time'] += elapsed
+        stats['max_processing_time'] = max(
+            stats['max_processing_time'], elapsed
+        )
+    return stats
+
+
+def main(argv=None):
+    """Воспроизводит файл записи и печатает статистику."""
+    parser = argparse.ArgumentParser(
+        description='Воспроизведение записанного трафика бота.'
+    )
+    parser.add_argument('path', help='файл, записанный через RECORD_FILE')
+    parser.add_argument(
+        '--speed', type=float, default=DEFAULT_SPEED,
+        help='ускорение времени, 0 — без пауз',
+    )
+    args = parser.parse_args(argv)
+    stats = replay(args.path, speed=args.speed)
+    for key, value in stats.items():
+        print(f'{key}: {value}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
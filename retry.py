@@ -0,0 +1,81 @@
+import http
+import random
+from collections import namedtuple
+
+from constants import RETRY_PERIOD
+from exceptions import (
+    APIRequestsError,
+    APIResponseError,
+    MissingHomeworksKeyError,
+    UnknownHomeworkNameError,
+    UnknownHomeworkStatusError,
+)
+
+RETRIES_METRIC = 'api_retries'
+SUSPENDED_METRIC = 'tenants_suspended'
+
+# error — класс исключения; statuses — коды ответа API (None — любой,
+# () — ошибка без кода: сеть или таймаут); retries — сколько раз сразу
+# повторить запрос; backoff — первая пауза перед следующим опросом,
+# удваивается с каждым сбоем подряд (None — обычный период); suspend —
+# приостановить тенанта до смены токена.
+Rule = namedtuple(
+    'Rule', ('error', 'statuses', 'retries', 'backoff', 'suspend')
+)
+SERVER_ERRORS = tuple(range(500, 600))
+RULES = (
+    Rule(APIRequestsError, (http.HTTPStatus.UNAUTHORIZED,
+                            http.HTTPStatus.FORBIDDEN), 0, None, True),
+    Rule(APIRequestsError, (http.HTTPStatus.TOO_MANY_REQUESTS,),
+         0, 60, False),
+    Rule(APIRequestsError, SERVER_ERRORS, 1, 30, False),
+    Rule(APIRequestsError, (), 2, 15, False),
+    Rule(APIResponseError, None, 1, 60, False),
+    Rule(MissingHomeworksKeyError, None, 0, None, False),
+    Rule(UnknownHomeworkStatusError, None, 0, None, False),
+    Rule(UnknownHomeworkNameError, None, 0, None, False),
+)
+DEFAULT_RULE = Rule(Exception, None, 0, None, False)
+
+
+def api_status(error):
+    """Возвращает HTTP-код ответа API из APIRequestsError или None."""
+    status = error.args[0] if error.args else None
+    return status if isinstance(status, int) else None
+
+
+class RetryPolicy:
+    """Таблица повторов по классу исключения и коду ответа API.
+
+    Первое подходящее правило из rules решает, сколько раз сразу
+    повторить запрос, через сколько опросить тенанта снова и не пора ли
+    приостановить его. Пауза растёт вдвое с каждым сбоем подряд, не
+    превышает max_delay и случайно укорачивается до половины, чтобы
+    тенанты после общего сбоя не возвращались разом.
+    """
+
+    def __init__(self, rules=RULES, max_delay=RETRY_PERIOD, rng=None):
+        self.rules = rules
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def rule_for(self, error):
+        """Возвращает правило для исключения."""
+        for rule in self.rules:
+            if not isinstance(error, rule.error):
+                continue
+            if rule.statuses is None:
+                return rule
+            status = api_status(error)
+            if status is None and rule.statuses == ():
+                return rule
+            if status in rule.statuses:
+                return rule
+        return DEFAULT_RULE
+
+    def delay(self, rule, failures):
+        """Возвращает паузу до следующего опроса после failures сбоев."""
+        if rule.backoff is None:
+            return self.max_delay
+        delay = min(rule.backoff * 2 ** (failures - 1), self.max_delay)
+        return delay / 2 + self.rng.random() * delay / 2
@@ -0,0 +1,236 @@
+import heapq
+import itertools
+
+# Ближайший срок колеса неизвестен и должен быть найден заново.
+UNKNOWN = object()
+
+
+class HeapScheduler:
+    """Очередь сроков следующего опроса на двоичной куче.
+
+    Повторное планирование ключа не ищет старую запись в куче: она
+    помечается устаревшей и отбрасывается при извлечении.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._due)
+
+    def schedule(self, key, due):
+        """Назначает ключу срок, заменяя прежний."""
+        self._due[key] = due
+        heapq.heappush(self._heap, (due, next(self._counter), key))
+
+    def remove(self, key):
+        """Снимает ключ с расписания."""
+        self._due.pop(key, None)
+
+    def _discard_stale(self):
+        while self._heap:
+            due, _, key = self._heap[0]
+            if self._due.get(key) == due:
+                return
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """Возвращает ближайший срок или None, если расписание пусто."""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Извлекает все ключи со сроком не позже now."""
+        keys = []
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return keys
+            _, _, key = heapq.heappop(self._heap)
+            del self._due[key]
+            keys.append(key)
+
+
+class TimingWheelScheduler:
+    """Иерархическое колесо таймеров: вставка и снятие за O(1).
+
+    Время делится на тики длиной resolution секунд. Колесо уровня L
+    состоит из SLOTS ячеек по SLOTS**L тиков; ключ кладётся на самый
+    нижний уровень, в пределах которого его срок совпадает с текущим
+    временем по старшим разрядам. Когда текущий тик доходит до начала
+    ячейки верхнего уровня, её ключи перераскладываются ниже. Срок,
+    выходящий за верхний уровень, ждёт в отдельном словаре. Ключ может
+    сработать раньше срока не более чем на resolution; сроки раньше start
+    срабатывают при первом же pop_due. Непустые ячейки каждого уровня
+    отмечены битами в _occupied, так что следующая ячейка находится
+    битовыми операциями, а не перебором. Ближайший срок запоминается и
+    ищется заново, только когда снят или извлечён ключ с этим сроком.
+    """
+
+    BITS = 6
+    SLOTS = 1 << BITS
+    MASK = SLOTS - 1
+    LEVELS = 4
+    OVERFLOW = LEVELS
+
+    def __init__(self, start, resolution=1.0):
+        self.resolution = resolution
+        self.current = self._tick(start)
+        self._wheels = [
+            [{} for _ in range(self.SLOTS)] for _ in range(self.LEVELS)
+        ]
+        self._occupied = [0] * self.LEVELS
+        self._ready = {}
+        self._overflow = {}
+        self._where = {}
+        self._earliest = None
+
+    def __len__(self):
+        return len(self._where)
+
+    def _tick(self, moment):
+        return int(moment // self.resolution)
+
+    def _place(self, key, due):
+        tick = int(due // self.resolution)
+        current = self.current
+        if tick <= current:
+            bucket = self._ready
+        else:
+            # номер уровня — по старшему разряду, в котором срок расходится
+            # с текущим тиком
+            level = ((tick ^ current).bit_length() - 1) // self.BITS
+            if level < self.LEVELS:
+                slot = (tick >> (self.BITS * level)) & self.MASK
+                bucket = self._wheels[level][slot]
+                self._occupied[level] |= 1 << slot
+            else:
+                bucket = self._overflow
+        bucket[key] = due
+        self._where[key] = bucket
+
+    def _forget(self, due):
+        if due == self._earliest:
+            self._earliest = UNKNOWN
+
+    def schedule(self, key, due):
+        """Назначает ключу срок, заменяя прежний."""
+        bucket = self._where.get(key)
+        if bucket is not None:
+            self._forget(bucket.pop(key))
+        self._place(key, due)
+        earliest = self._earliest
+        if earliest is not UNKNOWN and (earliest is None or due < earliest):
+            self._earliest = due
+
+    def remove(self, key):
+        """Снимает ключ с расписания."""
+        bucket = self._where.pop(key, None)
+        if bucket is not None:
+            self._forget(bucket.pop(key))
+
+    def _cascade(self, level, slot):
+        if level == self.OVERFLOW:
+            entries, self._overflow = self._overflow, {}
+        else:
+            entries = self._wheels[level][slot]
+            self._wheels[level][slot] = {}
+            self._occupied[level] &= ~(1 << slot)
+        for key, due in entries.items():
+            self._place(key, due)
+
+    def _advance(self):
+        self.current += 1
+        if self.current & ((1 << (self.BITS * self.LEVELS)) - 1) == 0:
+            self._cascade(self.OVERFLOW, 0)
+        for level in range(self.LEVELS - 1, 0, -1):
+            if self.current & ((1 << (self.BITS * level)) - 1) == 0:
+                self._cascade(
+                    level, (self.current >> (self.BITS * level)) & self.MASK
+                )
+        slot = self.current & self.MASK
+        entries = self._wheels[0][slot]
+        if entries:
+            # все ключи этой ячейки наступают ровно на текущем тике
+            self._wheels[0][slot] = {}
+            self._occupied[0] &= ~(1 << slot)
+            self._ready.update(entries)
+            for key in entries:
+                self._where[key] = self._ready
+
+    def _first_slot(self, level, start):
+        """Возвращает первую непустую ячейку уровня не раньше start.
+
+        Бит ячейки, опустевшей после remove, снимается здесь же.
+        """
+        wheel = self._wheels[level]
+        occupied = self._occupied[level] >> start << start
+        while occupied:
+            slot = (occupied & -occupied).bit_length() - 1
+            if wheel[slot]:
+                return slot
+            occupied &= occupied - 1
+            self._occupied[level] &= ~(1 << slot)
+        return None
+
+    def _next_event(self):
+        """Возвращает ближайший тик, на котором непуста ячейка колеса.
+
+        Между текущим тиком и найденным все пройденные ячейки пусты, поэтому
+        их можно пропустить без перебора. Ячейки нижнего уровня наступают
+        раньше ячеек верхних, поэтому хватает первой найденной.
+        """
+        for level in range(self.LEVELS):
+            shift = self.BITS * level
+            position = (self.current >> shift) & self.MASK
+            slot = self._first_slot(level, position + 1)
+            if slot is not None:
+                block = self.current >> (shift + self.BITS)
+                return ((block << self.BITS) + slot) << shift
+        if self._overflow:
+            span = self.BITS * self.LEVELS
+            return ((self.current >> span) + 1) << span
+        return None
+
+    def pop_due(self, now):
+        """Извлекает все ключи, чей тик не позже тика now."""
+        target = self._tick(now)
+        if not self._where:
+            self.current = max(self.current, target)
+            return []
+        while self.current < target:
+            event = self._next_event()
+            if event is None or event > target:
+                self.current = target
+                break
+            self.current = event - 1
+            self._advance()
+        keys = list(self._ready)
+        for key in keys:
+            del self._where[key]
+        if keys:
+            self._earliest = UNKNOWN
+        self._ready.clear()
+        return keys
+
+    def next_due(self):
+        """Возвращает ближайший срок или None, если расписание пусто."""
+        if self._earliest is UNKNOWN:
+            self._earliest = self._find_earliest()
+        return self._earliest
+
+    def _find_earliest(self):
+        # Ключи нижнего уровня всегда раньше ключей верхних, поэтому
+        # достаточно первой непустой ячейки на самом нижнем уровне.
+        if self._ready:
+            return min(self._ready.values())
+        for level in range(self.LEVELS):
+            position = (self.current >> (self.BITS * level)) & self.MASK
+            slot = self._first_slot(level, position)
+            if slot is not None:
+                return min(self._wheels[level][slot].values())
+        if self._overflow:
+            return min(self._overflow.values())
+        return None
@@ -0,0 +1,262 @@
+import logging
+import math
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+from homework import HOMEWORK_VERDICTS, parse_status
+
+logger = logging.getLogger(__name__)
+
+STATE_SNAPSHOT_ENV = 'STATE_SNAPSHOT'
+# Как часто сохранять снимок, секунд.
+SNAPSHOT_INTERVAL = 300
+MAGIC = b'HWSNAP01'
+# Заголовок: сигнатура, число тенантов, работ в дедупликации и строк.
+HEADER = struct.Struct('<8sIII')
+# Тенант: номер имени, from_date, срок опроса (NaN — не назначен),
+# первая запись дедупликации и их число.
+TENANT = struct.Struct('<Iqdii')
+# Дедупликация: номер названия работы и код последнего статуса.
+DEDUP = struct.Struct('<IB3x')
+# Строка: начало в области строк и длина в байтах.
+STRING = struct.Struct('<II')
+STATUSES = tuple(HOMEWORK_VERDICTS)
+VERDICT_CODES = {
+    verdict: code for code, verdict in enumerate(HOMEWORK_VERDICTS.values())
+}
+
+TenantRecord = namedtuple('TenantRecord', ('from_date', 'due', 'restore'))
+
+
+def status_code(message):
+    """Возвращает код статуса по тексту сообщения parse_status или None."""
+    return VERDICT_CODES.get(message.rpartition('". ')[2])
+
+
+class Snapshot:
+    """Снимок состояния, отображённый в память.
+
+    Записи тенантов и дедупликации фиксированной ширины, названия работ
+    хранятся один раз в общей таблице строк. Файл не разбирается при
+    открытии: ОС подгружает страницы по мере обращения, а сообщения о
+    статусах восстанавливаются только при первом опросе тенанта.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.tenants, dedups, strings = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f'{path} не является снимком состояния')
+        self._dedup_start = HEADER.size + self.tenants * TENANT.size
+        self._strings_start = self._dedup_start + dedups * DEDUP.size
+        self._blob_start = self._strings_start + strings * STRING.size
+        self._names = None
+        if len(self._map) != self._expected_size(strings):
+            size = len(self._map)
+            self._map.close()
+            raise ValueError(
+                f'{path}: размер {size} не сходится с заголовком снимка'
+            )
+
+    def _expected_size(self, strings):
+        # Строки пишутся подряд, так что область строк кончается там же,
+        # где последняя из них.
+        if strings == 0 or len(self._map) < self._blob_start:
+            return self._blob_start
+        start, length = STRING.unpack_from(
+            self._map, self._blob_start - STRING.size
+        )
+        return self._blob_start + start + length
+
+    def __len__(self):
+        return self.tenants
+
+    def string(self, number):
+        """Возвращает строку из таблицы строк."""
+        start, length = STRING.unpack_from(
+            self._map, self._strings_start + number * STRING.size
+        )
+        start += self._blob_start
+        return self._map[start:start + length].decode()
+
+    def _index(self):
+        # Читаются только записи тенантов и их имена; дедупликация и
+        # названия работ остаются на диске до первого опроса.
+        if self._names is None:
+            string = self.string
+            records = memoryview(self._map)[HEADER.size:self._dedup_start]
+            self._names = {
+                string(record[0]): number
+                for number, record in enumerate(TENANT.iter_unpack(records))
+            }
+            records.release()
+        return self._names
+
+    def get(self, name):
+        """Возвращает TenantRecord тенанта или None, если его нет в снимке."""
+        number = self._index().get(name)
+        if number is None:
+            return None
+        _, from_date, due, first, count = TENANT.unpack_from(
+            self._map, HEADER.size + number * TENANT.size
+        )
+        return TenantRecord(
+            from_date, None if math.isnan(due) else due,
+            Restore(self, first, count),
+        )
+
+    def dedups(self, first, count):
+        """Отдаёт пары (название работы, код статуса) тенанта."""
+        for number in range(first, first + count):
+            name_number, code = DEDUP.unpack_from(
+                self._map, self._dedup_start + number * DEDUP.size
+            )
+            yield self.string(name_number), code
+
+    def sent_messages(self, first, count):
+        """Восстанавливает отправленные сообщения тенанта."""
+        return {
+            homework_name: parse_status({
+                'homework_name': homework_name, 'status': STATUSES[code]
+            })
+            for homework_name, code in self.dedups(first, count)
+        }
+
+
+class Restore:
+    """Отложенное восстановление отправленных сообщений тенанта.
+
+    Вызов возвращает сообщения; dedups() отдаёт записи снимка как есть,
+    чтобы переписать их в новый снимок, не восстанавливая состояние.
+    """
+
+    __slots__ = ('snapshot', 'first', 'count')
+
+    def __init__(self, snapshot, first, count):
+        self.snapshot = snapshot
+        self.first = first
+        self.count = count
+
+    def __call__(self):
+        """Восстанавливает отправленные сообщения тенанта."""
+        return self.snapshot.sent_messages(self.first, self.count)
+
+    def dedups(self):
+        """Отдаёт пары (название работы, код статуса) из снимка."""
+        return self.snapshot.dedups(self.first, self.count)
+
+
+def state_dedups(state):
+    """Отдаёт пары (название работы, код статуса) состояния тенанта.
+
+    У тенанта, ещё не восстановленного из снимка, записи берутся прямо из
+    прежнего снимка: сообщения не разбираются и не попадают в память.
+    """
+    restore = state.pending_restore
+    if isinstance(restore, Restore):
+        yield from restore.dedups()
+        return
+    for homework_name, message in state.sent_messages.items():
+        if homework_name == 'error' or message is None:
+            continue
+        code = status_code(message)
+        if code is not None:
+            yield homework_name, code
+
+
+def encode(states):
+    """Собирает снимок состояний тенантов в bytes."""
+    strings = {}
+    tenants = bytearray()
+    dedups = bytearray()
+    count = 0
+
+    def intern(text):
+        return strings.setdefault(text, len(strings))
+
+    for state in states:
+        first = count
+        for homework_name, code in state_dedups(state):
+            dedups += DEDUP.pack(intern(homework_name), code)
+            count += 1
+        due = math.nan if state.due is None else state.due
+        tenants += TENANT.pack(
+            intern(state.tenant.name), int(state.from_date), due,
+            first, count - first,
+        )
+    table = bytearray()
+    blob = bytearray()
+    for text in strings:
+        data = text.encode()
+        table += STRING.pack(len(blob), len(data))
+        blob += data
+    header = HEADER.pack(
+        MAGIC, len(tenants) // TENANT.size, count, len(strings)
+    )
+    return b''.join((header, tenants, dedups, table, blob))
+
+
+class SnapshotStore:
+    """Периодически сохраняет снимок состояния опроса и открывает его.
+
+    Снимок пишется во временный файл, сбрасывается на диск и атомарно
+    подменяет прежний, так что отображённый в память старый снимок
+    остаётся целым, а после сбоя питания не окажется пустым. Снимок,
+    размер которого не сходится с заголовком, считается отсутствующим.
+    """
+
+    def __init__(self, path, interval=SNAPSHOT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.saved_at = None
+
+    @classmethod
+    def from_env(cls):
+        """Создаёт хранилище по пути из STATE_SNAPSHOT или None."""
+        path = os.getenv(STATE_SNAPSHOT_ENV)
+        if not path:
+            return None
+        return cls(path)
+
+    def load(self):
+        """Открывает сохранённый снимок или возвращает None."""
+        try:
+            snapshot = Snapshot(self.path)
+        except (OSError, ValueError, struct.error) as error:
+            if os.path.exists(self.path):
+                logger.error(f'Снимок состояния не прочитан: {error}')
+            return None
+        logger.info(
+            f'Открыт снимок состояния {self.path}: тенантов {len(snapshot)}'
+        )
+        return snapshot
+
+    def save(self, states, now):
+        """Сохраняет снимок состояний тенантов."""
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(encode(states))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+        self.saved_at = now
+
+    def maybe_save(self, states, now):
+        """Сохраняет снимок, если с прошлого прошло не меньше interval.
+
+        Первый снимок пишется через interval после запуска, чтобы не
+        подгружать восстановленное состояние всех тенантов сразу.
+        """
+        if self.saved_at is None:
+            self.saved_at = now
+        if now - self.saved_at < self.interval:
+            return False
+        try:
+            self.save(states, now)
+        except OSError as error:
+            logger.error(f'Снимок состояния не сохранён: {error}')
+            return False
+        return True
@@ -0,0 +1,104 @@
+import logging
+import os
+
+from digest import parse_policy
+from exceptions import TenantSourceError
+from tenants import read_rows, stat_signature
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTIONS_FILE_ENV = 'SUBSCRIPTIONS_FILE'
+SUBSCRIPTION_FIELDS = ('tenant', 'chat_id')
+DIGEST_FIELDS = ('digest', 'quiet_hours')
+
+
+def build_index(rows):
+    """Строит словарь тенант -> кортеж чатов подписчиков.
+
+    Некорректные строки и повторы пропускаются.
+    """
+    index = {}
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            logger.error(f'Подписка пропущена, строка {number}')
+            continue
+        tenant = str(row.get('tenant') or '').strip()
+        chat_id = str(row.get('chat_id') or '').strip()
+        if not tenant or not chat_id.lstrip('-').isdigit():
+            logger.error(f'Подписка пропущена, строка {number}: {row}')
+            continue
+        chats = index.setdefault(tenant, [])
+        if chat_id not in chats:
+            chats.append(chat_id)
+    return {tenant: tuple(chats) for tenant, chats in index.items()}
+
+
+def build_policies(rows):
+    """Строит словарь чат -> режим сводки.
+
+    Режим задаётся в любой строке подписки чата; если строк с режимом
+    несколько, действует первая.
+    """
+    policies = {}
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        chat_id = str(row.get('chat_id') or '').strip()
+        if chat_id in policies:
+            continue
+        policy = parse_policy(row)
+        if policy is not None:
+            policies[chat_id] = policy
+    return policies
+
+
+class SubscriptionIndex:
+    """Дополнительные чаты, получающие уведомления тенанта.
+
+    Событие тенанта формируется один раз и ставится в очередь отправки
+    для его собственного чата и всех подписчиков. Файл-источник (CSV, JSON
+    или таблица subscriptions в SQLite с полями tenant, chat_id и
+    необязательными digest, quiet_hours) перечитывается при изменении.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.index = {}
+        self.policies = {}
+        self._signature = None
+
+    @classmethod
+    def from_env(cls):
+        """Создаёт индекс по пути из переменной SUBSCRIPTIONS_FILE."""
+        return cls(os.getenv(SUBSCRIPTIONS_FILE_ENV))
+
+    def reload_if_changed(self):
+        """Перечитывает источник подписок, если он изменился."""
+        if not self.path:
+            return False
+        try:
+            signature = stat_signature(self.path)
+            if signature == self._signature:
+                return False
+            rows = read_rows(
+                self.path, table='subscriptions',
+                fields=SUBSCRIPTION_FIELDS + DIGEST_FIELDS,
+            )
+        except (OSError, TenantSourceError) as error:
+            logger.error(f'Подписки не обновлены: {error}')
+            return False
+        self._signature = signature
+        self.index = build_index(rows)
+        self.policies = build_policies(rows)
+        return True
+
+    def policy_for(self, chat_id):
+        """Возвращает режим сводки чата или None."""
+        return self.policies.get(chat_id)
+
+    def chats_for(self, tenant):
+        """Возвращает чат тенанта и чаты его подписчиков без повторов."""
+        extra = self.index.get(tenant.name, ())
+        return (tenant.chat_id,) + tuple(
+            chat_id for chat_id in extra if chat_id != tenant.chat_id
+        )
@@ -0,0 +1,95 @@
+import json
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import urllib3
+
+from exceptions import TelegramAPIError
+
+logger = logging.getLogger(__name__)
+
+API_URL = 'https://api.telegram.org/bot'
+POOL_SIZE = 16
+TIMEOUT = 10
+
+
+class BotAPIClient:
+    """Лёгкий клиент Bot API поверх общего пула keep-alive соединений.
+
+    Повторяет интерфейс send_message у telegram.Bot, поэтому подходит для
+    send_to_chat, но при ошибке бросает TelegramAPIError (наследник
+    TelegramError) с кодом ответа и retry_after.
+    """
+
+    def __init__(self, token, base_url=API_URL, pool_size=POOL_SIZE,
+                 timeout=TIMEOUT):
+        self.url = f'{base_url}{token}/'
+        # urllib3 напрямую: обёртка requests удваивает накладные расходы
+        # на запрос, а здесь нужен только POST с JSON
+        self.pool = urllib3.PoolManager(
+            num_pools=1, maxsize=pool_size, block=True,
+            timeout=urllib3.Timeout(total=timeout), retries=False,
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix='telegram'
+        )
+
+    def _call(self, method, payload):
+        try:
+            response = self.pool.request(
+                'POST', self.url + method,
+                body=json.dumps(payload).encode(),
+                headers={'Content-Type': 'application/json'},
+            )
+            data = json.loads(response.data)
+        except (urllib3.exceptions.HTTPError, ValueError) as error:
+            logger.error(f'Ошибка сети при вызове {method}: {error}')
+            raise TelegramAPIError(f'Ошибка сети при вызове {method}: {error}')
+        if not data.get('ok'):
+            parameters = data.get('parameters') or {}
+            logger.error(f'Bot API отклонил {method}: {data}')
+            raise TelegramAPIError(
+                data.get('description', 'Неизвестная ошибка Bot API'),
+                error_code=data.get('error_code', response.status),
+                retry_after=parameters.get('retry_after'),
+            )
+        return data['result']
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Отправляет сообщение методом sendMessage."""
+        return self._call(
+            'sendMessage', {'chat_id': chat_id, 'text': text, **kwargs}
+        )
+
+    def send_batch(self, messages):
+        """Отправляет пачку пар (chat_id, text) параллельно.
+
+        Сообщения одного чата уходят по порядку, разные чаты — одновременно
+        по соединениям пула. Возвращает список результатов в исходном
+        порядке; на месте неудачных отправок стоит исключение.
+        """
+        chats = OrderedDict()
+        for index, (chat_id, text) in enumerate(messages):
+            chats.setdefault(chat_id, []).append((index, text))
+        results = [None] * len(messages)
+
+        def send_chat(chat_id, items):
+            for index, text in items:
+                try:
+                    results[index] = self.send_message(chat_id, text)
+                except TelegramAPIError as error:
+                    results[index] = error
+
+        futures = [
+            self.executor.submit(send_chat, chat_id, items)
+            for chat_id, items in chats.items()
+        ]
+        for future in futures:
+            future.result()
+        return results
+
+    def close(self):
+        """Закрывает соединения и пул потоков."""
+        self.executor.shutdown(wait=True)
+        self.pool.clear()
@@ -0,0 +1,159 @@
+import csv
+import json
+import logging
+import os
+import sqlite3
+from collections import namedtuple
+
+from exceptions import TenantSourceError
+
+logger = logging.getLogger(__name__)
+
+TENANTS_FILE_ENV = 'TENANTS_FILE'
+TENANT_FIELDS = ('name', 'practicum_token', 'chat_id')
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+Tenant = namedtuple('Tenant', TENANT_FIELDS)
+TenantChanges = namedtuple('TenantChanges', ('added', 'removed', 'changed'))
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+
+def _read_json(path):
+    with open(path, encoding='utf-8') as file:
+        rows = json.load(file)
+    if not isinstance(rows, list):
+        raise TenantSourceError(f'{path}: ожидался список записей')
+    return rows
+
+
+def _read_sqlite(path, table, fields):
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    connection.row_factory = sqlite3.Row
+    try:
+        # необязательных столбцов в таблице может не быть; отсутствие
+        # обязательных выявит валидация строк
+        columns = {
+            column['name'] for column in
+            connection.execute(f'PRAGMA table_info({table})')
+        }
+        if not columns:
+            raise sqlite3.OperationalError(f'нет таблицы {table}')
+        rows = connection.execute(
+            f'SELECT {", ".join(f for f in fields if f in columns)} '
+            f'FROM {table}'
+        ).fetchall()
+    finally:
+        connection.close()
+    return [dict(row) for row in rows]
+
+
+def read_rows(path, table='tenants', fields=TENANT_FIELDS):
+    """Читает сырые строки из CSV, JSON или таблицы table в SQLite."""
+    suffix = os.path.splitext(path)[1].lower()
+    try:
+        if suffix == '.csv':
+            return _read_csv(path)
+        if suffix == '.json':
+            return _read_json(path)
+        if suffix in SQLITE_SUFFIXES:
+            return _read_sqlite(path, table, fields)
+    except (OSError, ValueError, sqlite3.Error, csv.Error) as error:
+        raise TenantSourceError(f'Не удалось прочитать {path}: {error}')
+    raise TenantSourceError(f'Неизвестный формат источника тенантов: {path}')
+
+
+def validate_row(row):
+    """Проверяет одну строку и возвращает тенанта или текст ошибки."""
+    if not isinstance(row, dict):
+        return None, 'строка не является словарём'
+    values = {
+        field: str(row.get(field) or '').strip() for field in TENANT_FIELDS
+    }
+    missing = [field for field, value in values.items() if not value]
+    if missing:
+        return None, f'не заполнены поля {", ".join(missing)}'
+    if not values['chat_id'].lstrip('-').isdigit():
+        return None, f'некорректный chat_id {values["chat_id"]!r}'
+    return Tenant(**values), None
+
+
+def validate_rows(rows):
+    """Валидирует все строки разом.
+
+    Возвращает словарь корректных тенантов по имени и список ошибок;
+    повторяющиеся имена считаются ошибкой, остаётся первая запись.
+    """
+    tenants = {}
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        tenant, error = validate_row(row)
+        if tenant is not None and tenant.name in tenants:
+            error = f'повторяется имя {tenant.name!r}'
+        if error:
+            errors.append(f'строка {number}: {error}')
+            continue
+        tenants[tenant.name] = tenant
+    return tenants, errors
+
+
+def load_tenants(path):
+    """Загружает и валидирует тенантов, некорректные строки пропускаются."""
+    tenants, errors = validate_rows(read_rows(path))
+    for error in errors:
+        logger.error(f'Тенант пропущен, {path}, {error}')
+    return tenants
+
+
+def diff_tenants(old, new):
+    """Сравнивает два набора тенантов по имени."""
+    return TenantChanges(
+        added=[new[name] for name in new.keys() - old.keys()],
+        removed=[old[name] for name in old.keys() - new.keys()],
+        changed=[
+            new[name] for name in new.keys() & old.keys()
+            if new[name] != old[name]
+        ],
+    )
+
+
+def stat_signature(path):
+    """Возвращает признак изменения файла: время изменения и размер."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class TenantRegistry:
+    """Список тенантов, перечитываемый при изменении файла-источника."""
+
+    def __init__(self, path):
+        self.path = path
+        self.tenants = {}
+        self._signature = None
+
+    def reload_if_changed(self):
+        """Перечитывает источник, если он изменился.
+
+        Возвращает TenantChanges или None, если изменений нет. При ошибке
+        чтения остаётся предыдущий список тенантов.
+        """
+        try:
+            signature = stat_signature(self.path)
+            if signature == self._signature:
+                return None
+            tenants = load_tenants(self.path)
+        except (OSError, TenantSourceError) as error:
+            logger.error(f'Список тенантов не обновлён: {error}')
+            return None
+        self._signature = signature
+        changes = diff_tenants(self.tenants, tenants)
+        self.tenants = tenants
+        if any(changes):
+            logger.info(
+                f'Тенанты обновлены: +{len(changes.added)} '
+                f'-{len(changes.removed)} ~{len(changes.changed)}'
+            )
+        return changes
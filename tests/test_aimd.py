@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+import aimd
+from exceptions import APIRequestsError, APIResponseError
+from metrics import Metrics
+
+
+class TestAIMDLimiter:
+
+    def test_additive_increase_and_multiplicative_decrease(self):
+        metrics = Metrics()
+        limiter = aimd.AIMDLimiter(initial=4, max_limit=8, metrics=metrics)
+        for _ in range(8):
+            limiter.release(limiter.acquire())
+        assert limiter.limit > 5
+        assert metrics.get(aimd.LIMIT_METRIC) == 5
+
+        limiter.release(limiter.acquire(), overloaded=True)
+        assert limiter.limit < 3
+        assert metrics.get(aimd.LIMIT_METRIC) == int(limiter.limit)
+
+    def test_single_decrease_per_burst(self):
+        limiter = aimd.AIMDLimiter(initial=8)
+        started = [limiter.acquire() for _ in range(4)]
+        for start in started:
+            limiter.release(start, overloaded=True)
+        assert limiter.limit == 4
+
+    def test_slow_response_decreases_limit(self):
+        limiter = aimd.AIMDLimiter(initial=4, latency_target=0.001)
+        fetch = limiter.wrap(lambda: time.sleep(0.01))
+        fetch()
+        assert limiter.limit == 2
+
+    @pytest.mark.parametrize('error, overload', [
+        (APIRequestsError(500, 'Ошибка'), True),
+        (APIRequestsError(429, 'Ошибка'), True),
+        (APIRequestsError('Ошибка при запросе к API: timeout'), True),
+        (APIRequestsError(401, 'Ошибка'), False),
+        (APIResponseError('Ошибка при разборе JSON'), False),
+    ])
+    def test_is_overload(self, error, overload):
+        assert aimd.is_overload(error) is overload
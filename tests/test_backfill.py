@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import backfill
+from exceptions import APIResponseError
+from tenants import Tenant
+
+
+def make_body(count):
+    return json.dumps({
+        'homeworks': [
+            {'homework_name': f'hw{index}', 'status': 'approved',
+             'date_updated': '2020-02-13T14:40:57Z'}
+            for index in range(count)
+        ],
+        'current_date': 1234567890,
+    }, ensure_ascii=False)
+
+
+class TestBackfill:
+
+    @pytest.mark.parametrize('chunk', [1, 7, 4096])
+    def test_parser_matches_json_loads(self, chunk):
+        body = make_body(20)
+        parser = backfill.HomeworkStreamParser()
+        items = []
+        for start in range(0, len(body), chunk):
+            items.extend(parser.feed(body[start:start + chunk]))
+        items.extend(parser.feed('', final=True))
+        assert items == json.loads(body)['homeworks']
+        assert parser.fields['current_date'] == 1234567890
+        assert len(parser.buffer) < 200
+
+    def test_truncated_body_raises(self):
+        parser = backfill.HomeworkStreamParser()
+        parser.feed(make_body(3)[:-20])
+        with pytest.raises(APIResponseError):
+            parser.feed('', final=True)
+
+    def test_backfill_hands_out_batches(self):
+        def stream(tenant, from_date):
+            parser = backfill.HomeworkStreamParser()
+            yield from parser.feed(make_body(1050), final=True)
+            return parser.fields['current_date']
+
+        sizes = []
+        current_date = backfill.backfill(
+            Tenant('alice', 'token', '1'),
+            lambda batch: sizes.append(len(batch)),
+            stream=stream,
+        )
+        assert sizes == [500, 500, 50]
+        assert current_date == 1234567890
@@ -0,0 +1,65 @@
+import worker
+from bounded import EVICTED_METRIC, TTL, BoundedDict
+from clock import VirtualClock
+from metrics import Metrics
+from tenants import Tenant
+
+
+def bounded(**kwargs):
+    kwargs.setdefault('clock', VirtualClock(0))
+    return BoundedDict(metrics=Metrics(), **kwargs)
+
+
+class TestBoundedDict:
+
+    def test_behaves_like_sent_messages(self):
+        messages = bounded()
+        assert messages['error'] is None
+        messages['hw.zip'] = 'принята'
+        assert messages.get('hw.zip') == 'принята'
+        assert messages.get('other.zip') is None
+        assert dict(messages.items()) == {'error': None, 'hw.zip': 'принята'}
+
+    def test_least_recently_used_is_evicted(self):
+        messages = bounded(max_size=2)
+        messages['a'] = 1
+        messages['b'] = 2
+        messages.get('a')
+        messages['c'] = 3
+        assert 'b' not in messages
+        assert messages.get('a') == 1
+        assert messages.metrics.get(EVICTED_METRIC) == 1
+
+    def test_idle_entries_expire(self):
+        messages = bounded(ttl=100)
+        messages['a'] = 1
+        messages.clock.sleep(60)
+        messages['b'] = 2
+        messages.clock.sleep(60)
+        assert messages.get('a') is None
+        assert messages.get('b') == 2
+
+    def test_error_is_pinned(self):
+        messages = bounded(max_size=1, ttl=10)
+        messages['error'] = 'Сбой'
+        for name in 'abc':
+            messages[name] = name
+        messages.clock.sleep(100)
+        messages['d'] = 'd'
+        assert messages['error'] == 'Сбой'
+        assert len(messages) == 2
+
+    def test_items_do_not_refresh_entries(self):
+        messages = bounded(ttl=100)
+        messages['a'] = 1
+        messages.clock.sleep(60)
+        messages.items()
+        messages.clock.sleep(60)
+        assert messages.get('a') is None
+
+    def test_sent_messages_follow_worker_clock(self):
+        clock = VirtualClock(0)
+        state = worker.TenantState(Tenant('t', 'token', '1'), 0, clock=clock)
+        state.sent_messages['hw'] = 'Изменился статус'
+        clock.sleep(TTL + 1)
+        assert state.sent_messages.get('hw') is None
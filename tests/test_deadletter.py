@@ -0,0 +1,132 @@
+import time
+
+import pytest
+import telegram
+
+import deadletter
+import utils
+import worker
+from clock import VirtualClock
+from exceptions import TelegramAPIError
+from metrics import Metrics
+from tenants import Tenant
+
+
+class FlakyBot:
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text))
+
+
+@pytest.fixture
+def queue():
+    dead_letters = deadletter.DeadLetterQueue(
+        clock=VirtualClock(1000), metrics=Metrics()
+    )
+    yield dead_letters
+    dead_letters.close()
+
+
+class TestDecide:
+
+    @pytest.mark.parametrize('error, attempts, decision', [
+        (telegram.error.RetryAfter(5), 1, ('retry', 5.0, None)),
+        (TelegramAPIError('Too Many Requests', 429, retry_after=7), 1,
+         ('retry', 7.0, None)),
+        (telegram.error.Unauthorized('bot was blocked by the user'), 1,
+         ('drop', None, None)),
+        (telegram.error.BadRequest('Chat not found'), 1,
+         ('drop', None, None)),
+        (TelegramAPIError('Forbidden', 403), 1, ('drop', None, None)),
+        (telegram.error.ChatMigrated(-100123), 1,
+         ('migrate', 0, '-100123')),
+        (telegram.error.NetworkError('timeout'), 1, ('retry', 30, None)),
+        (telegram.error.NetworkError('timeout'), 3, ('retry', 120, None)),
+        (telegram.error.NetworkError('timeout'), deadletter.MAX_ATTEMPTS,
+         ('drop', None, None)),
+    ])
+    def test_policy(self, error, attempts, decision):
+        assert deadletter.decide(error, attempts) == decision
+
+
+class TestDeadLetterQueue:
+
+    def test_failed_send_is_queued_and_retried_after_pause(self, queue):
+        bot = FlakyBot([telegram.error.RetryAfter(5)])
+        protected = deadletter.DeadLetterBot(bot, queue)
+        assert protected.send_message(chat_id='1', text='привет') is None
+        assert len(queue) == 1
+        assert queue.metrics.get(deadletter.PENDING_METRIC) == 1
+
+        assert queue.retry_due(bot) == 0
+        queue.clock.sleep(5)
+        assert queue.retry_due(bot) == 1
+        assert bot.sent == [('1', 'привет')]
+        assert len(queue) == 0
+
+    def test_blocked_chat_is_dropped(self, queue):
+        bot = FlakyBot([telegram.error.Unauthorized('blocked')])
+        deadletter.DeadLetterBot(bot, queue).send_message(
+            chat_id='1', text='привет'
+        )
+        assert len(queue) == 0
+        assert queue.metrics.get(deadletter.DROPPED_METRIC) == 1
+
+    def test_backoff_grows_until_dropped(self, queue):
+        failures = [telegram.error.NetworkError('timeout')] * (
+            deadletter.MAX_ATTEMPTS
+        )
+        bot = FlakyBot(failures)
+        deadletter.DeadLetterBot(bot, queue).send_message(
+            chat_id='1', text='привет'
+        )
+        for _ in range(deadletter.MAX_ATTEMPTS):
+            queue.clock.sleep(deadletter.MAX_BACKOFF)
+            queue.retry_due(bot)
+        assert len(queue) == 0
+        assert queue.metrics.get(deadletter.DROPPED_METRIC) == 1
+
+    def test_queue_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'dead.db')
+        first = deadletter.DeadLetterQueue(path, metrics=Metrics())
+        first.put('1', 'привет', telegram.error.NetworkError('timeout'))
+        first.close()
+        second = deadletter.DeadLetterQueue(path, metrics=Metrics())
+        assert len(second) == 1
+        second.close()
+
+    def test_background_retrier(self):
+        queue = deadletter.DeadLetterQueue(metrics=Metrics())
+        bot = FlakyBot([telegram.error.RetryAfter(0.05)])
+        queue.protect(bot).send_message(chat_id='1', text='привет')
+        deadline = time.monotonic() + 1
+        while bot.sent == [] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        queue.close()
+        assert bot.sent == [('1', 'привет')]
+
+    def test_worker_keeps_polling_when_telegram_fails(self, queue):
+        bot = FlakyBot([telegram.error.RetryAfter(30)] * 3)
+        poller = worker.Worker(
+            utils.StaticRegistry([
+                Tenant(f't{index}', 'token', str(index)) for index in range(3)
+            ]),
+            deadletter.DeadLetterBot(bot, queue),
+            fetch=lambda tenant, from_date: {
+                'homeworks': [{
+                    'homework_name': 'hw.zip', 'status': 'approved'
+                }],
+                'current_date': from_date,
+            },
+            clock=queue.clock,
+        )
+        poller.run_once()
+        assert not poller.outbox.pending
+        assert len(queue) == 3
+        queue.clock.sleep(30)
+        assert queue.retry_due(bot) == 3
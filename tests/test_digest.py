@@ -0,0 +1,106 @@
+import json
+from collections import Counter
+
+import digest
+import subscriptions
+import utils
+import worker
+from clock import VirtualClock
+from tenants import Tenant
+
+HOUR = 3600
+# 2020-02-13 12:00 UTC
+NOON = 1581595200
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+def flipping_fetch():
+    polls = Counter()
+
+    def fetch(tenant, from_date):
+        polls[tenant.name] += 1
+        return {
+            'homeworks': [{
+                'homework_name': f'{tenant.name}.zip',
+                'status': ('reviewing', 'approved')[polls[tenant.name] % 2],
+            }],
+            'current_date': from_date,
+        }
+
+    return fetch
+
+
+def make_worker(tmp_path, rows, tenants, clock):
+    path = tmp_path / 'subscriptions.json'
+    path.write_text(json.dumps(rows), encoding='utf-8')
+    bot = RecordingBot()
+    poller = worker.Worker(
+        utils.StaticRegistry(tenants), bot, fetch=flipping_fetch(),
+        clock=clock,
+        subscriptions=subscriptions.SubscriptionIndex(str(path)),
+    )
+    return poller, bot
+
+
+class TestDigest:
+
+    def test_parse_policy(self):
+        assert digest.parse_policy({'chat_id': '1'}) is None
+        assert digest.parse_policy(
+            {'digest': '60', 'quiet_hours': '22-8'}
+        ) == digest.DigestPolicy(HOUR, 22, 8)
+        assert digest.parse_policy({'digest': 'часто'}) is None
+        assert digest.parse_policy({'quiet_hours': '25-8'}) is None
+
+    def test_quiet_hours_wrap_midnight(self):
+        policy = digest.DigestPolicy(0, 22, 8)
+        assert digest.in_quiet_hours(policy, NOON - 13 * HOUR)
+        assert digest.in_quiet_hours(policy, NOON - 5 * HOUR)
+        assert not digest.in_quiet_hours(policy, NOON)
+
+    def test_render_splits_long_digest(self):
+        events = {
+            ('tenant', f'hw{index}'): ('ж' * 100, 1) for index in range(100)
+        }
+        messages = digest.render_digest(events, limit=1000)
+        assert all(len(message) <= 1000 for message in messages)
+        assert sum(message.count('•') for message in messages) == 100
+
+    def test_mentor_gets_one_message_per_interval(self, tmp_path):
+        tenants = [Tenant(f't{index}', 'token', str(index))
+                   for index in range(50)]
+        rows = [
+            {'tenant': tenant.name, 'chat_id': '-100', 'digest': '60'}
+            for tenant in tenants
+        ]
+        clock = VirtualClock(NOON)
+        poller, bot = make_worker(tmp_path, rows, tenants, clock)
+        poller.run_until(NOON + 3 * HOUR)
+
+        mentor = [text for chat_id, text in bot.sent if chat_id == '-100']
+        own = [text for chat_id, text in bot.sent if chat_id != '-100']
+        assert len(own) >= 50 * 17
+        assert len(mentor) * 100 <= len(own)
+        assert all(text.startswith('Сводка') for text in mentor)
+        assert 'смен статуса: 6' in mentor[0]
+
+    def test_quiet_hours_hold_until_window_ends(self, tmp_path):
+        tenant = Tenant('t1', 'token', '1')
+        rows = [{'tenant': 't1', 'chat_id': '-100', 'quiet_hours': '0-8'}]
+        clock = VirtualClock(NOON - 6 * HOUR)
+        poller, bot = make_worker(tmp_path, rows, [tenant], clock)
+        poller.run_until(NOON - 4 * HOUR - 1)
+        assert not [chat for chat, _ in bot.sent if chat == '-100']
+
+        poller.run_until(NOON - 3 * HOUR)
+        mentor = [text for chat_id, text in bot.sent if chat_id == '-100']
+        assert mentor[0].startswith('Сводка: изменений статусов — 12')
+        assert mentor[0].count('•') == 1
+        assert all('•' not in text for text in mentor[1:])
@@ -0,0 +1,145 @@
+import os
+import threading
+
+import pytest
+
+import eventlog
+import utils
+import worker
+from clock import VirtualClock
+from metrics import Metrics
+from tenants import Tenant
+
+
+def open_log(tmp_path, **kwargs):
+    return eventlog.EventLog(str(tmp_path), metrics=Metrics(), **kwargs)
+
+
+class TestEventLog:
+
+    def test_append_and_read_by_offset(self, tmp_path):
+        log = open_log(tmp_path)
+        offsets = [log.append({'number': number}) for number in range(5)]
+        assert offsets == [0, 1, 2, 3, 4]
+        assert log.read(3) == [(3, {'number': 3}), (4, {'number': 4})]
+        assert log.read(1, limit=2) == [(1, {'number': 1}), (2, {'number': 2})]
+        assert log.read(5) == []
+        assert log.metrics.get(eventlog.APPENDED_METRIC) == 5
+        log.close()
+
+    def test_segments_roll_and_reads_cross_them(self, tmp_path):
+        log = open_log(tmp_path, segment_bytes=64)
+        for number in range(20):
+            log.append({'number': number})
+        log.close()
+        bases = eventlog.list_segments(str(tmp_path))
+        assert len(bases) > 2
+        assert bases[0] == 0
+        events = eventlog.read(str(tmp_path), 0, limit=100)
+        assert [offset for offset, _ in events] == list(range(20))
+        assert eventlog.read(str(tmp_path), bases[1])[0] == (
+            bases[1], {'number': bases[1]}
+        )
+
+    def test_retention_removes_old_segments(self, tmp_path):
+        log = open_log(tmp_path, segment_bytes=64, retain=2)
+        for number in range(20):
+            log.append({'number': number})
+        log.close()
+        bases = eventlog.list_segments(str(tmp_path))
+        assert len(bases) == 2
+        events = eventlog.read(str(tmp_path), 0)
+        assert events[0][0] == bases[0]
+        assert events[-1] == (19, {'number': 19})
+
+    @pytest.mark.parametrize('value, retain', [
+        (None, eventlog.RETAIN_SEGMENTS), ('3', 3), ('0', None),
+    ])
+    def test_retention_from_env(self, tmp_path, monkeypatch, value, retain):
+        monkeypatch.setenv(eventlog.EVENT_LOG_DIR_ENV, str(tmp_path))
+        monkeypatch.delenv(eventlog.EVENT_LOG_RETAIN_ENV, raising=False)
+        if value is not None:
+            monkeypatch.setenv(eventlog.EVENT_LOG_RETAIN_ENV, value)
+        log = eventlog.EventLog.from_env()
+        log.close()
+        assert log.retain == retain
+
+    def test_reopen_continues_offsets(self, tmp_path):
+        log = open_log(tmp_path, segment_bytes=64)
+        for number in range(7):
+            log.append({'number': number})
+        log.close()
+        log = open_log(tmp_path, segment_bytes=64)
+        assert log.append({'number': 7}) == 7
+        log.close()
+        assert len(eventlog.read(str(tmp_path))) == 8
+
+    def test_torn_write_is_truncated_on_open(self, tmp_path):
+        log = open_log(tmp_path)
+        log.append({'number': 0})
+        log.append({'number': 1})
+        log.close()
+        segment = eventlog.Segment(str(tmp_path), 0)
+        with open(segment.log_path, 'ab') as file:
+            file.write(b'{"number": 2}\n{"numb')
+        with open(segment.index_path, 'ab') as file:
+            file.write(b'\x00\x00')
+        log = open_log(tmp_path)
+        assert log.append({'number': 2}) == 2
+        log.close()
+        assert [event for _, event in eventlog.read(str(tmp_path))] == [
+            {'number': 0}, {'number': 1}, {'number': 2}
+        ]
+        assert os.path.getsize(segment.index_path) == (
+            3 * eventlog.INDEX_ENTRY.size
+        )
+
+    def test_concurrent_appends_get_unique_offsets(self, tmp_path):
+        log = open_log(tmp_path, segment_bytes=256)
+
+        def append_many():
+            for number in range(50):
+                log.append({'number': number})
+
+        threads = [threading.Thread(target=append_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        log.close()
+        events = eventlog.read(str(tmp_path), 0, limit=1000)
+        assert [offset for offset, _ in events] == list(range(200))
+
+    def test_follow_yields_new_events(self, tmp_path):
+        log = open_log(tmp_path)
+        log.append({'number': 0})
+        stream = eventlog.follow(str(tmp_path), 0, interval=0.01)
+        assert next(stream) == (0, {'number': 0})
+        log.append({'number': 1})
+        assert next(stream) == (1, {'number': 1})
+        log.close()
+
+    def test_worker_sink_records_status_changes(self, tmp_path):
+        log = open_log(tmp_path)
+        poller = worker.Worker(
+            utils.StaticRegistry([Tenant('t', 'token', '1')]),
+            utils.MockTelegramBot(),
+            fetch=lambda tenant, from_date: {
+                'homeworks': [{
+                    'homework_name': 'hw.zip', 'status': 'approved',
+                    'date_updated': '2024-01-01T00:00:00Z',
+                }],
+                'current_date': from_date,
+            },
+            clock=VirtualClock(1000),
+        )
+        poller.pipeline.sink(log.sink, name='event_log')
+        poller.run_once()
+        poller.run_once()
+        log.close()
+        [(offset, event)] = eventlog.read(str(tmp_path))
+        assert offset == 0
+        assert event['tenant'] == 't'
+        assert event['homework_name'] == 'hw.zip'
+        assert event['status'] == 'approved'
+        assert event['happened_at'] is not None
@@ -0,0 +1,80 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import health
+import utils
+import worker
+from clock import VirtualClock
+from profiling import Profiler
+from tenants import Tenant
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+@pytest.fixture
+def poller():
+    def fetch(tenant, from_date):
+        return {'homeworks': [], 'current_date': from_date}
+
+    return worker.Worker(
+        utils.StaticRegistry([Tenant('t1', 'token', '1')]),
+        utils.MockTelegramBot(),
+        fetch=fetch,
+        clock=VirtualClock(1000),
+    )
+
+
+class TestHealthServer:
+
+    def test_ready_after_first_pass_and_stale_when_stuck(self, poller):
+        server = health.HealthServer(
+            poller.status, host='127.0.0.1', stale_after=300,
+            clock=poller.clock,
+        ).start()
+        try:
+            status, payload = get(server.url + '/ready')
+            assert status == 503
+            assert get(server.url + '/health')[0] == 200
+
+            poller.run_once()
+            status, payload = get(server.url + '/ready')
+            assert status == 200
+            assert payload['tenants'] == 1
+            assert payload['outbox_pending'] == 0
+            assert payload['last_successful_poll'] == 1000
+
+            poller.clock.sleep(301)
+            assert get(server.url + '/health')[0] == 503
+            poller.tick()
+            assert get(server.url + '/health')[0] == 200
+        finally:
+            server.close()
+
+    def test_profile_toggle_endpoint(self, poller):
+        profiler = Profiler()
+        server = health.HealthServer(
+            poller.status, host='127.0.0.1', profiler=profiler
+        ).start()
+        try:
+            request = urllib.request.Request(
+                server.url + '/profile', method='POST'
+            )
+            with urllib.request.urlopen(request, timeout=1) as response:
+                assert json.loads(response.read()) == {'profiling': True}
+            assert profiler.requested
+            assert not profiler.enabled
+        finally:
+            server.close()
+
+    def test_disabled_without_port(self, monkeypatch, poller):
+        monkeypatch.delenv(health.HEALTH_PORT_ENV, raising=False)
+        assert health.HealthServer.from_env(poller.status) is None
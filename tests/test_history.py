@@ -0,0 +1,87 @@
+import pytest
+
+import history
+import utils
+import worker
+from clock import VirtualClock
+from metrics import Metrics
+from tenants import Tenant
+
+HOUR = 3600
+
+
+@pytest.fixture
+def status_history(tmp_path):
+    journal = history.StatusHistory(
+        str(tmp_path / 'history.db'), metrics=Metrics()
+    )
+    yield journal
+    journal.close()
+
+
+class TestStatusHistory:
+
+    def test_turnaround_percentiles_by_cohort(self, status_history):
+        for index in range(10):
+            name = f'hw{index}.zip'
+            status_history.record('a', name, 'reviewing', 0)
+            status_history.record('a', name, 'approved', (index + 1) * HOUR)
+        status_history.record('b', 'hw.zip', 'reviewing', 0)
+        status_history.record('b', 'hw.zip', 'rejected', 100 * HOUR)
+        status_history.record('b', 'hw.zip', 'reviewing', 101 * HOUR)
+        status_history.record('b', 'hw.zip', 'approved', 103 * HOUR)
+        status_history.flush()
+
+        assert status_history.transitions('b', 'hw.zip') == [
+            ('reviewing', 0),
+            ('rejected', 100 * HOUR),
+            ('reviewing', 101 * HOUR),
+            ('approved', 103 * HOUR),
+        ]
+        assert sorted(status_history.turnarounds(['b'])) == [
+            2 * HOUR, 100 * HOUR
+        ]
+        report = history.turnaround_report(status_history.path, ['a'])
+        assert report == {
+            'count': 10, 'p50': 6 * HOUR, 'p90': 10 * HOUR, 'p95': 10 * HOUR,
+        }
+        assert history.turnaround_report(status_history.path)['count'] == 12
+
+    def test_full_queue_drops_instead_of_blocking(self, status_history,
+                                                  monkeypatch):
+        def put_nowait(event):
+            raise history.queue.Full
+
+        monkeypatch.setattr(status_history.queue, 'put_nowait', put_nowait)
+        status_history.record('a', 'hw.zip', 'reviewing', 0)
+        assert status_history.metrics.get(history.DROPPED_METRIC) == 1
+
+    def test_worker_records_detected_changes(self, status_history):
+        updates = iter([
+            ('reviewing', '2020-02-13T14:40:57Z'),
+            ('reviewing', '2020-02-13T14:40:57Z'),
+            ('approved', '2020-02-14T09:00:00Z'),
+        ])
+
+        def fetch(tenant, from_date):
+            status, date_updated = next(updates)
+            return {
+                'homeworks': [{
+                    'homework_name': 'hw.zip',
+                    'status': status,
+                    'date_updated': date_updated,
+                }],
+                'current_date': from_date,
+            }
+
+        poller = worker.Worker(
+            utils.StaticRegistry([Tenant('a', 'token', '1')]),
+            utils.MockTelegramBot(), fetch=fetch, clock=VirtualClock(),
+            history=status_history,
+        )
+        for _ in range(3):
+            poller.run_once()
+        status_history.flush()
+        assert [
+            status for status, _ in status_history.transitions('a', 'hw.zip')
+        ] == ['reviewing', 'approved']
@@ -0,0 +1,118 @@
+import sqlite3
+from collections import Counter
+
+import pytest
+
+import leases
+import utils
+import worker
+from clock import VirtualClock
+from tenants import Tenant
+
+TENANTS = [Tenant(f't{index}', 'token', str(index)) for index in range(10)]
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock(1000)
+
+
+@pytest.fixture
+def polls():
+    return Counter()
+
+
+@pytest.fixture
+def make_worker(tmp_path, clock, polls):
+    def fetch(tenant, from_date):
+        polls[tenant.name] += 1
+        return {'homeworks': [], 'current_date': int(clock.time())}
+
+    def make(owner):
+        store = leases.LeaseStore(
+            str(tmp_path / 'leases.db'), owner=owner, clock=clock
+        )
+        return worker.Worker(
+            utils.StaticRegistry(TENANTS), utils.MockTelegramBot(),
+            fetch=fetch, clock=clock, leases=store,
+        )
+
+    return make
+
+
+class TestLeases:
+
+    def test_workers_split_tenants_without_overlap(self, make_worker):
+        first = make_worker('a')
+        second = make_worker('b')
+        first.refresh()
+        second.refresh()
+        assert len(first.states) == 10
+        assert len(second.states) == 0
+
+        first.refresh()
+        second.refresh()
+        assert len(first.states) == 5
+        assert len(second.states) == 5
+        assert not first.states.keys() & second.states.keys()
+
+    def test_takeover_resumes_from_saved_cursor(self, make_worker, clock):
+        first = make_worker('a')
+        first.run_once()
+        cursor = int(clock.time())
+
+        clock.sleep(leases.LEASE_TTL - 1)
+        second = make_worker('b')
+        second.refresh()
+        assert len(second.states) == 0
+
+        clock.sleep(2)
+        second.refresh()
+        assert len(second.states) == 10
+        assert all(
+            state.from_date == cursor for state in second.states.values()
+        )
+
+    def test_release_hands_over_immediately(self, make_worker):
+        first = make_worker('a')
+        first.refresh()
+        first.leases.release_all()
+        second = make_worker('b')
+        second.refresh()
+        assert len(second.states) == 10
+
+    def test_no_duplicate_polls_over_an_hour(self, make_worker, clock,
+                                             polls):
+        workers = [make_worker('a'), make_worker('b')]
+        deadline = clock.time() + 3600
+        while clock.time() < deadline:
+            for poller in workers:
+                poller.tick()
+            clock.sleep(min(
+                poller.seconds_to_next_poll() for poller in workers
+            ))
+        assert set(polls) == {tenant.name for tenant in TENANTS}
+        assert max(polls.values()) <= 3600 // worker.RETRY_PERIOD + 1
+
+    def test_tenants_released_before_lease_expires_on_db_error(
+        self, make_worker, clock
+    ):
+        first = make_worker('a')
+        first.refresh()
+        assert len(first.states) == len(TENANTS)
+
+        def broken(names):
+            raise sqlite3.OperationalError('database is locked')
+
+        first.registry.store.claim = broken
+        clock.sleep(leases.LEASE_TTL - leases.RENEW_MARGIN - 1)
+        first.refresh()
+        assert len(first.states) == len(TENANTS)
+        clock.sleep(worker.REFRESH_INTERVAL)
+        first.refresh()
+        assert first.states == {}
+
+        clock.sleep(leases.LEASE_TTL)
+        second = make_worker('b')
+        second.refresh()
+        assert len(second.states) == len(TENANTS)
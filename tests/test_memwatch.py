@@ -0,0 +1,63 @@
+import logging
+import tracemalloc
+
+import memwatch
+from metrics import Metrics
+
+
+class TestMemoryWatchdog:
+
+    def test_disabled_without_budget_and_tracing(self, monkeypatch):
+        monkeypatch.delenv(memwatch.MEMORY_BUDGET_ENV, raising=False)
+        monkeypatch.delenv(memwatch.TRACEMALLOC_ENV, raising=False)
+        watchdog = memwatch.MemoryWatchdog.from_env()
+        assert not watchdog.enabled
+        assert not watchdog.start()
+
+    def test_budget_from_env(self, monkeypatch):
+        monkeypatch.setenv(memwatch.MEMORY_BUDGET_ENV, '512')
+        watchdog = memwatch.MemoryWatchdog.from_env()
+        assert watchdog.budget == 512 * 1024 * 1024
+
+    def test_rss_is_measured(self):
+        assert memwatch.rss() > 0
+
+    def test_alert_over_budget(self, caplog):
+        watchdog = memwatch.MemoryWatchdog(
+            budget=100, metrics=Metrics(), measure=lambda: 200
+        )
+        with caplog.at_level(logging.ERROR):
+            assert watchdog.check()
+        assert 'превышает бюджет' in caplog.text
+        assert watchdog.metrics.get(memwatch.RSS_METRIC) == 200
+        assert watchdog.metrics.get(memwatch.EXCEEDED_METRIC) == 1
+        watchdog.budget = 300
+        assert not watchdog.check()
+
+    def test_reports_growing_allocation_site(self, caplog):
+        watchdog = memwatch.MemoryWatchdog(frames=1, metrics=Metrics(), top=3)
+        tracemalloc.start(1)
+        try:
+            watchdog.top_growth()
+            leak = [bytearray(1024) for _ in range(1000)]
+            with caplog.at_level(logging.INFO):
+                watchdog.check()
+        finally:
+            tracemalloc.stop()
+        assert 'test_memwatch.py' in caplog.text
+        assert watchdog.metrics.get(memwatch.TRACED_METRIC) > 1024 * 1000
+        assert len(leak) == 1000
+
+    def test_background_checks(self):
+        watchdog = memwatch.MemoryWatchdog(
+            budget=100, interval=0.01, metrics=Metrics(), measure=lambda: 200
+        )
+        assert watchdog.start()
+        try:
+            for _ in range(100):
+                if watchdog.metrics.get(memwatch.EXCEEDED_METRIC):
+                    break
+                watchdog._stop.wait(0.01)
+        finally:
+            watchdog.close()
+        assert watchdog.metrics.get(memwatch.EXCEEDED_METRIC) >= 1
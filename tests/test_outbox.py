@@ -0,0 +1,175 @@
+import telegram
+
+import deadletter
+import outbox
+import utils
+import worker
+from clock import VirtualClock
+from metrics import Metrics
+from tenants import Tenant
+
+
+class FlakyBot(utils.MockTelegramBot):
+    def __init__(self, failures=0, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise telegram.error.TelegramError('Something wrong')
+        self.sent.append((chat_id, text))
+
+
+class TestOutbox:
+
+    def test_unacked_entries_replayed_after_restart(self, tmp_path):
+        path = str(tmp_path / 'outbox.jsonl')
+        journal = outbox.Outbox(path)
+        first = journal.put('alice', '1', 'first')
+        journal.put('alice', '1', 'second')
+        journal.flush()
+        journal.ack(first.id)
+        journal.flush()
+        # имитируем падение процесса без close()
+
+        recovered = outbox.Outbox(path)
+        assert [entry.text for entry in recovered.pending.values()] == [
+            'second'
+        ]
+        assert recovered.put('bob', '2', 'third').id == 3
+
+    def test_compaction_keeps_only_pending(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(outbox, 'COMPACT_AFTER', 2)
+        path = str(tmp_path / 'outbox.jsonl')
+        journal = outbox.Outbox(path)
+        entries = [journal.put('alice', '1', str(index)) for index in range(3)]
+        journal.ack(entries[0].id)
+        journal.ack(entries[1].id)
+        journal.flush()
+        with open(path, encoding='utf-8') as file:
+            assert len(file.readlines()) == 1
+        assert list(outbox.Outbox(path).pending) == [entries[2].id]
+
+    def test_failed_send_is_retried_once(self, tmp_path,
+                                         data_with_new_hw_status):
+        bot = FlakyBot(failures=1)
+        clock = VirtualClock(1000)
+        poller = worker.Worker(
+            utils.StaticRegistry([Tenant('alice', 'token', '1')]), bot,
+            fetch=lambda tenant, from_date: data_with_new_hw_status,
+            outbox=outbox.Outbox(str(tmp_path / 'outbox.jsonl'), clock),
+            clock=clock,
+        )
+        poller.run_once()
+        assert bot.sent == []
+        poller.run_once()
+        assert bot.sent == []
+        clock.sleep(deadletter.BACKOFF)
+        poller.run_once()
+        poller.run_once()
+        assert len(bot.sent) == 1
+        assert not poller.outbox.pending
+        assert not poller.outbox.retries
+
+    def test_backoff_grows_and_entry_is_dropped(self):
+        clock = VirtualClock(1000)
+        journal = outbox.Outbox(clock=clock, metrics=Metrics())
+        journal.put('alice', '1', 'first')
+        attempts = []
+
+        def send(entry):
+            attempts.append(clock.time())
+            raise telegram.error.NetworkError('timeout')
+
+        for _ in range(5000):
+            journal.deliver(send)
+            clock.sleep(10)
+        assert len(attempts) == deadletter.MAX_ATTEMPTS
+        assert attempts[2] - attempts[1] > attempts[1] - attempts[0]
+        assert not journal.pending
+        assert journal.metrics.get(outbox.DROPPED_METRIC) == 1
+
+    def test_blocked_chat_is_dropped_without_blocking_others(self):
+        journal = outbox.Outbox(clock=VirtualClock(1000), metrics=Metrics())
+        journal.put('alice', 'blocked', 'first')
+        journal.put('alice', 'blocked', 'second')
+        journal.put('bob', 'open', 'third')
+        sent = []
+
+        def send(entry):
+            if entry.chat_id == 'blocked':
+                raise telegram.error.Unauthorized('bot was blocked')
+            sent.append(entry.text)
+
+        journal.deliver(send)
+        assert sent == ['third']
+        assert not journal.pending
+        assert journal.metrics.get(outbox.DROPPED_METRIC) == 2
+
+    def test_failed_entry_delays_later_messages_of_chat(self):
+        clock = VirtualClock(1000)
+        journal = outbox.Outbox(clock=clock, metrics=Metrics())
+        journal.put('alice', '1', 'first')
+        journal.put('alice', '1', 'second')
+        failures = [telegram.error.RetryAfter(10)]
+        sent = []
+
+        def send(entry):
+            if failures:
+                raise failures.pop()
+            sent.append(entry.text)
+
+        journal.deliver(send)
+        journal.deliver(send)
+        assert sent == []
+        clock.sleep(10)
+        journal.deliver(send)
+        assert sent == ['first', 'second']
+
+    def test_worker_send_keeps_telegram_error_for_policy(self):
+        clock = VirtualClock(1000)
+
+        class BlockedBot(utils.MockTelegramBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                if chat_id == 'limited':
+                    raise telegram.error.RetryAfter(120)
+                raise telegram.error.Unauthorized('bot was blocked')
+
+        poller = worker.Worker(
+            utils.StaticRegistry([]), BlockedBot(),
+            outbox=outbox.Outbox(clock=clock, metrics=Metrics()), clock=clock,
+        )
+        blocked = poller.outbox.put('alice', 'blocked', 'first')
+        limited = poller.outbox.put('alice', 'limited', 'second')
+        poller.deliver()
+        assert blocked.id not in poller.outbox.pending
+        assert poller.outbox.metrics.get(outbox.DROPPED_METRIC) == 1
+        assert poller.outbox.retries[limited.id] == (1, 1120)
+
+    def test_migrated_chat_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'outbox.jsonl')
+        journal = outbox.Outbox(path, VirtualClock(1000), metrics=Metrics())
+        journal.put('alice', '1', 'first')
+
+        def send(entry):
+            raise telegram.error.ChatMigrated(-100)
+
+        journal.deliver(send)
+        journal.flush()
+        recovered = outbox.Outbox(path)
+        assert [entry.chat_id for entry in recovered.pending.values()] == [
+            '-100'
+        ]
+
+    def test_record_with_missing_fields_is_skipped(self, tmp_path):
+        path = tmp_path / 'outbox.jsonl'
+        path.write_text(
+            '{"id": 1, "tenant": "alice"}\n'
+            '5\n'
+            '{"id": 2, "tenant": "alice", "chat_id": "1", "text": "b"}\n',
+            encoding='utf-8',
+        )
+        recovered = outbox.Outbox(str(path))
+        assert list(recovered.pending) == [2]
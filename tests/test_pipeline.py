@@ -0,0 +1,215 @@
+import asyncio
+import threading
+
+import pytest
+
+import homework
+import utils
+import worker
+from clock import VirtualClock
+from metrics import Metrics
+from pipeline import Event, Pipeline
+from tenants import Tenant
+
+
+def api_response(status='approved', name='hw.zip'):
+    return {
+        'homeworks': [{'homework_name': name, 'status': status}],
+        'current_date': 100,
+    }
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append(text)
+
+
+class TestPipeline:
+
+    def test_stages_run_in_order(self):
+        calls = []
+        pipeline = (
+            Pipeline(metrics=Metrics())
+            .filter(lambda event: calls.append('filter') or True,
+                    name='filter')
+            .enrich(lambda event: calls.append('enrich') or event,
+                    name='enrich')
+            .sink(lambda event: calls.append('sink'), name='sink')
+        )
+        event = Event(value=1)
+        assert pipeline.run(event) is event
+        assert calls == ['filter', 'enrich', 'sink']
+
+    def test_filter_and_enrich_stop_the_chain(self):
+        sunk = []
+        pipeline = (
+            Pipeline(metrics=Metrics())
+            .filter(lambda event: event.value > 0, name='positive')
+            .enrich(lambda event: event if event.value < 10 else None,
+                    name='small')
+            .sink(sunk.append, name='sink')
+        )
+        assert pipeline.run(Event(value=-1)) is None
+        assert pipeline.run(Event(value=20)) is None
+        assert pipeline.run(Event(value=5)) is not None
+        assert [event.value for event in sunk] == [5]
+
+    def test_stage_inserted_before_existing(self):
+        calls = []
+        pipeline = (
+            Pipeline(metrics=Metrics())
+            .sink(lambda event: calls.append('send'), name='send')
+            .filter(lambda event: calls.append('dedup') or True,
+                    name='dedup', before='send')
+        )
+        pipeline.run(Event())
+        assert calls == ['dedup', 'send']
+
+    def test_unknown_kind_and_mode_rejected(self):
+        pipeline = Pipeline(metrics=Metrics())
+        with pytest.raises(ValueError):
+            pipeline.use(print, kind='map')
+        with pytest.raises(ValueError):
+            pipeline.use(print, mode='process')
+
+    def test_timings_and_metrics(self):
+        metrics = Metrics()
+        pipeline = Pipeline('test', metrics=metrics).enrich(
+            lambda event: event, name='noop'
+        )
+        for _ in range(3):
+            pipeline.run(Event())
+        timings = pipeline.timings()
+        assert timings['noop']['calls'] == 3
+        assert timings['noop']['max'] >= timings['noop']['mean'] >= 0
+        assert metrics.get('pipeline_test_noop_calls') == 3
+        assert metrics.get('pipeline_test_noop_seconds') >= 0
+
+    def test_metrics_published_on_read_and_merged_across_threads(self):
+        metrics = Metrics()
+        pipeline = Pipeline('test', metrics=metrics).enrich(
+            lambda event: event, name='noop'
+        )
+        pipeline.run(Event())
+        assert metrics._values == {}
+
+        def run_many():
+            for _ in range(50):
+                pipeline.run(Event())
+
+        threads = [threading.Thread(target=run_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert metrics.snapshot()['pipeline_test_noop_calls'] == 201
+
+    def test_sync_stage_error_propagates(self):
+        def broken(event):
+            raise RuntimeError('сбой')
+
+        pipeline = Pipeline(metrics=Metrics()).enrich(broken)
+        with pytest.raises(RuntimeError):
+            pipeline.run(Event())
+        assert pipeline.timings()['broken']['calls'] == 1
+
+    def test_thread_and_async_enrichers_are_awaited(self):
+        async def double(event):
+            await asyncio.sleep(0)
+            event.value *= 2
+            return event
+
+        def increment(event):
+            event.value += 1
+            return event
+
+        pipeline = (
+            Pipeline(metrics=Metrics())
+            .enrich(increment, mode='thread')
+            .enrich(double, mode='async')
+        )
+        try:
+            assert pipeline.run(Event(value=1)).value == 4
+        finally:
+            pipeline.close()
+
+    def test_detached_sinks_do_not_block(self):
+        release = threading.Event()
+        sunk = []
+
+        def slow(event):
+            release.wait(1)
+            sunk.append(event.value)
+
+        async def failing(event):
+            raise RuntimeError('сбой')
+
+        pipeline = (
+            Pipeline(metrics=Metrics())
+            .sink(slow, mode='thread')
+            .sink(failing, mode='async')
+        )
+        try:
+            assert pipeline.run(Event(value=1)) is not None
+            assert sunk == []
+            release.set()
+            pipeline.flush(timeout=1)
+            assert sunk == [1]
+            assert pipeline.timings()['failing']['calls'] == 1
+        finally:
+            pipeline.close()
+
+
+class TestHomeworkPipeline:
+
+    def test_process_response_sends_new_status_once(self):
+        bot = RecordingBot()
+        sent_messages = {'error': None}
+        assert homework.process_response(bot, api_response(), sent_messages)
+        assert not homework.process_response(
+            bot, api_response(), sent_messages
+        )
+        assert len(bot.sent) == 1
+
+    def test_stage_added_before_delivery(self, monkeypatch):
+        pipeline = homework.build_pipeline()
+        pipeline.filter(
+            lambda event: event.homework['status'] != 'reviewing',
+            name='skip_reviewing', before='deliver_status',
+        )
+        monkeypatch.setattr(homework, 'PIPELINE', pipeline)
+        bot = RecordingBot()
+        sent_messages = {'error': None}
+        assert not homework.process_response(
+            bot, api_response('reviewing'), sent_messages
+        )
+        assert homework.process_response(
+            bot, api_response('approved'), sent_messages
+        )
+        assert len(bot.sent) == 1
+
+
+class TestWorkerPipeline:
+
+    def test_custom_stage_sees_every_change(self):
+        clock = VirtualClock(1000)
+        poller = worker.Worker(
+            utils.StaticRegistry([Tenant('t', 'token', '1')]),
+            utils.MockTelegramBot(),
+            fetch=lambda tenant, from_date: api_response(),
+            clock=clock,
+        )
+        seen = []
+        poller.pipeline.sink(
+            lambda event: seen.append((event.tenant.name, event.message)),
+            name='audit',
+        )
+        poller.run_once()
+        poller.run_once()
+        assert seen == [('t', homework.parse_status(
+            api_response()['homeworks'][0]
+        ))]
+        assert poller.pipeline.timings()['detect']['calls'] == 2
@@ -0,0 +1,150 @@
+import gzip
+import io
+import json
+from functools import partial
+
+import pytest
+import requests
+import urllib3
+
+import homework
+import prepared
+import utils
+import worker
+from exceptions import APIRequestsError, APIResponseError
+from metrics import Metrics
+from tenants import Tenant, TenantChanges
+from transfer import TransferMeter
+
+
+def api_response(data, encoding=None, status=200, body=None):
+    if body is None:
+        body = json.dumps(data).encode()
+        if encoding == 'gzip':
+            body = gzip.compress(body)
+    headers = {'Content-Encoding': encoding} if encoding else {}
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers)
+    response.raw = urllib3.HTTPResponse(
+        body=io.BytesIO(body), headers=headers, status=status,
+        preload_content=False, decode_content=False,
+    )
+    return response
+
+
+class FakeSession(requests.Session):
+    def __init__(self, response=None, error=None):
+        super().__init__()
+        self.response = response
+        self.error = error
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request.url)
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+class TestPreparedRequests:
+
+    def test_request_built_once_per_tenant(self):
+        cache = prepared.PreparedRequests(session=FakeSession())
+        tenant = Tenant('alice', 'token', '1')
+        first = cache.prepare(tenant, 100)
+        headers = first.headers
+        second = cache.prepare(tenant, 200)
+
+        assert second is first
+        assert second.headers is headers
+        assert second.headers['Authorization'] == 'OAuth token'
+        assert second.url == f'{homework.ENDPOINT}?from_date=200'
+
+    def test_rebuilt_on_token_or_endpoint_change(self, monkeypatch):
+        cache = prepared.PreparedRequests(session=FakeSession())
+        first = cache.prepare(Tenant('alice', 'token', '1'), 100)
+        second = cache.prepare(Tenant('alice', 'new', '1'), 100)
+        assert second is not first
+        assert second.headers['Authorization'] == 'OAuth new'
+
+        monkeypatch.setattr(homework, 'ENDPOINT', 'http://stub/api/?x=1')
+        third = cache.prepare(Tenant('alice', 'new', '1'), 100)
+        assert third.url == 'http://stub/api/?x=1&from_date=100'
+        assert len(cache) == 1
+
+    def test_removed_tenant_is_forgotten_by_worker(self):
+        response = api_response({'homeworks': []})
+        cache = prepared.PreparedRequests(
+            session=FakeSession(response), meter=TransferMeter(Metrics())
+        )
+        alice = Tenant('alice', 'token', '1')
+        poller = worker.Worker(
+            utils.StaticRegistry([alice, Tenant('bob', 'token', '2')]),
+            utils.MockTelegramBot(), fetch=cache.fetch,
+        )
+        poller.refresh()
+        poller.poll_many(list(poller.states.values()))
+        assert len(cache) == 2
+        poller.apply_changes(TenantChanges([], [alice], []))
+        assert list(cache._cache) == ['bob']
+
+    def test_fetch_reads_response_and_wraps_errors(self):
+        response = api_response({'homeworks': []})
+        cache = prepared.PreparedRequests(session=FakeSession(response))
+        tenant = Tenant('alice', 'token', '1')
+        assert cache.fetch(tenant, 0) == {'homeworks': []}
+
+        cache.session.error = requests.ConnectionError('нет сети')
+        with pytest.raises(APIRequestsError):
+            cache.fetch(tenant, 0)
+
+    def test_gzip_response_is_decoded_and_metered(self):
+        data = {'homeworks': [
+            {'homework_name': f'hw{index}.zip', 'status': 'approved'}
+            for index in range(200)
+        ]}
+        meter = TransferMeter(Metrics())
+        cache = prepared.PreparedRequests(
+            session=FakeSession(api_response(data, 'gzip')), meter=meter
+        )
+        tenant = Tenant('alice', 'token', '1')
+        assert cache.prepare(tenant, 0).headers['Accept-Encoding'] == (
+            'gzip, deflate'
+        )
+        assert cache.fetch(tenant, 0) == data
+        responses, wire, decoded = meter.totals('alice')
+        assert responses == 1
+        assert decoded == len(json.dumps(data))
+        assert wire < decoded / 5
+        assert meter.top()[0]['tenant'] == 'alice'
+
+    def test_error_status_and_broken_payloads(self):
+        tenant = Tenant('alice', 'token', '1')
+        cache = prepared.PreparedRequests(
+            session=FakeSession(api_response({}, status=401)),
+            meter=TransferMeter(Metrics()),
+        )
+        with pytest.raises(APIRequestsError) as error:
+            cache.fetch(tenant, 0)
+        assert error.value.args[0] == 401
+        for response in (
+            api_response(None, 'gzip', body=b'not gzip'),
+            api_response(None, body=b'{broken'),
+            api_response(None, 'br', body=b'...'),
+        ):
+            cache.session.response = response
+            with pytest.raises(APIResponseError):
+                cache.fetch(tenant, 0)
+
+    def test_decoded_size_is_limited(self, monkeypatch):
+        monkeypatch.setattr(prepared, 'read_json', partial(
+            prepared.read_json, limit=1000
+        ))
+        data = {'homeworks': [], 'padding': ' ' * 100000}
+        cache = prepared.PreparedRequests(
+            session=FakeSession(api_response(data, 'gzip')),
+            meter=TransferMeter(Metrics()),
+        )
+        with pytest.raises(APIResponseError):
+            cache.fetch(Tenant('alice', 'token', '1'), 0)
@@ -0,0 +1,88 @@
+import os
+import pstats
+import signal
+
+import pytest
+
+import homework
+import profiling
+import utils
+import worker
+from tenants import Tenant
+
+
+class TestProfiler:
+
+    def test_disabled_profiler_calls_through(self, tmp_path):
+        profiler = profiling.Profiler(str(tmp_path / 'poll.prof'))
+        assert profiler.call(lambda value: value * 2, 21) == 42
+        profiler.checkpoint()
+        assert profiler.dump() is None
+        assert not (tmp_path / 'poll.prof').exists()
+
+    def test_toggle_applies_at_checkpoint_and_dumps(self, tmp_path):
+        path = tmp_path / 'poll.prof'
+        profiler = profiling.Profiler(str(path))
+        homework_item = {'homework_name': 'hw.zip', 'status': 'approved'}
+
+        profiler.toggle()
+        assert not profiler.enabled
+        profiler.checkpoint()
+        for _ in range(3):
+            profiler.call(homework.parse_status, homework_item)
+        profiler.toggle()
+        profiler.checkpoint()
+
+        assert not profiler.enabled
+        assert path.exists()
+        report = (tmp_path / 'poll.prof.txt').read_text(encoding='utf-8')
+        assert 'parse_status' in report
+
+    @pytest.mark.skipif(
+        not hasattr(signal, 'SIGUSR2'), reason='нет сигнала SIGUSR2'
+    )
+    def test_signal_requests_toggle(self, tmp_path):
+        previous = signal.getsignal(signal.SIGUSR2)
+        profiler = profiling.Profiler(str(tmp_path / 'poll.prof'))
+        try:
+            assert profiler.install()
+            os.kill(os.getpid(), signal.SIGUSR2)
+            assert profiler.requested
+        finally:
+            signal.signal(signal.SIGUSR2, previous)
+
+    @pytest.mark.parametrize('threads', [0, 4])
+    def test_worker_profile_covers_pipeline(self, tmp_path, threads):
+        def fetch(tenant, from_date):
+            return {
+                'homeworks': [{
+                    'homework_name': f'{tenant.name}.zip',
+                    'status': 'approved',
+                }],
+                'current_date': from_date,
+            }
+
+        profiler = profiling.Profiler(str(tmp_path / 'poll.prof'))
+        poller = worker.build_worker(
+            utils.StaticRegistry(
+                Tenant(f't{index}', 'token', str(index))
+                for index in range(8)
+            ),
+            utils.MockTelegramBot(),
+            threads=threads,
+            fetch=fetch,
+            profiler=profiler,
+        )
+        profiler.toggle()
+        poller.run_once()
+        profiler.toggle()
+        profiler.checkpoint()
+        if threads:
+            poller.close()
+
+        summary = profiling.stage_summary(
+            pstats.Stats(str(tmp_path / 'poll.prof'))
+        )
+        assert summary['check_response'][0] == 8
+        assert summary['parse_status'][0] == 8
+        assert summary['send_to_chat'][0] == 8
@@ -0,0 +1,61 @@
+import gzip
+
+import recorder
+import replay
+import utils
+
+
+class TestRecorder:
+
+    def test_tokens_are_redacted(self, tmp_path):
+        path = tmp_path / 'record.jsonl.gz'
+        rec = recorder.Recorder(str(path), secrets=['sometoken', '12345'])
+        bot = rec.wrap_bot(utils.MockTelegramBot())
+        bot.send_message(chat_id='12345', text='token sometoken')
+        rec.close()
+
+        records = list(recorder.read_records(str(path)))
+        assert len(records) == 1
+        assert records[0]['chat_id'] == recorder.REDACTED
+        assert 'sometoken' not in records[0]['text']
+
+    def test_numbers_containing_secret_are_kept(self, tmp_path):
+        path = tmp_path / 'record.jsonl.gz'
+        rec = recorder.Recorder(str(path), secrets=['12345'])
+        rec.record_response(1612345678, {
+            'homeworks': [], 'current_date': 1612345678, 'chat': 12345,
+        })
+        rec.close()
+
+        [record] = recorder.read_records(str(path))
+        assert record['from_date'] == 1612345678
+        assert record['response']['current_date'] == 1612345678
+        assert record['response']['chat'] == recorder.REDACTED
+
+    def test_broken_line_is_skipped(self, tmp_path):
+        path = tmp_path / 'record.jsonl.gz'
+        with gzip.open(path, 'wt', encoding='utf-8') as file:
+            file.write('{"kind": "send", "text": "a"}\n')
+            file.write('{"kind": "se\n')
+            file.write('{"kind": "send", "text": "b"}\n')
+        texts = [record['text'] for record in recorder.read_records(path)]
+        assert texts == ['a', 'b']
+
+    def test_replay_feeds_pipeline(self, tmp_path, data_with_new_hw_status):
+        path = tmp_path / 'record.jsonl.gz'
+        rec = recorder.Recorder(str(path))
+        fetch = rec.wrap_fetch(lambda from_date: data_with_new_hw_status)
+        fetch(0)
+        fetch(0)
+        rec.record_send('1', 'text')
+        rec.close()
+
+        sleeps = []
+        bot = replay.ReplayBot()
+        stats = replay.replay(str(path), speed=10, bot=bot,
+                              sleep=sleeps.append)
+        assert stats['responses'] == 2
+        assert stats['replayed_sends'] == 1
+        assert stats['recorded_sends'] == 1
+        assert len(bot.sent) == 1
+        assert len(sleeps) == 2
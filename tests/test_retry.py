@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+import utils
+import worker
+from clock import VirtualClock
+from constants import RETRY_PERIOD
+from exceptions import (
+    APIRequestsError,
+    APIResponseError,
+    UnknownHomeworkStatusError,
+)
+from retry import DEFAULT_RULE, RetryPolicy
+from tenants import Tenant, TenantChanges
+
+
+def response(from_date):
+    return {'homeworks': [], 'current_date': from_date}
+
+
+class FailingFetch:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self, tenant, from_date):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return response(from_date)
+
+
+def build_worker(fetch, tenants=None):
+    return worker.Worker(
+        utils.StaticRegistry(tenants or [Tenant('t', 'token', '1')]),
+        utils.MockTelegramBot(), fetch=fetch, clock=VirtualClock(1000),
+        retry_policy=RetryPolicy(rng=random.Random(1)),
+    )
+
+
+class TestRetryPolicy:
+
+    @pytest.mark.parametrize('error, retries, backoff, suspend', [
+        (APIRequestsError(401, 'Ошибка'), 0, None, True),
+        (APIRequestsError(429, 'Ошибка'), 0, 60, False),
+        (APIRequestsError(502, 'Ошибка'), 1, 30, False),
+        (APIRequestsError('Ошибка при запросе к API: timeout'), 2, 15, False),
+        (APIRequestsError(404, 'Ошибка'), 0, None, False),
+        (APIResponseError('Ошибка при разборе JSON'), 1, 60, False),
+        (UnknownHomeworkStatusError('unknown'), 0, None, False),
+        (KeyError('homeworks'), 0, None, False),
+    ])
+    def test_rule_table(self, error, retries, backoff, suspend):
+        rule = RetryPolicy().rule_for(error)
+        assert (rule.retries, rule.backoff, rule.suspend) == (
+            retries, backoff, suspend
+        )
+
+    def test_unmatched_error_waits_full_period(self):
+        policy = RetryPolicy()
+        assert policy.rule_for(ValueError()) is DEFAULT_RULE
+        assert policy.delay(DEFAULT_RULE, 5) == RETRY_PERIOD
+
+    def test_backoff_grows_with_jitter_and_cap(self):
+        policy = RetryPolicy(rng=random.Random(1))
+        rule = policy.rule_for(APIRequestsError(502, 'Ошибка'))
+        for failures, full in [(1, 30), (2, 60), (3, 120), (10, 600)]:
+            delays = [policy.delay(rule, failures) for _ in range(50)]
+            assert all(full / 2 <= delay <= full for delay in delays)
+            assert len(set(delays)) > 1
+
+
+class TestWorkerRetries:
+
+    def test_transient_error_is_retried_immediately(self):
+        fetch = FailingFetch([APIRequestsError('timeout')] * 2)
+        poller = build_worker(fetch)
+        poller.run_once()
+        state = poller.states['t']
+        assert fetch.calls == 3
+        assert state.failures == 0
+        assert state.due == 1000 + RETRY_PERIOD
+
+    def test_server_error_reschedules_with_backoff(self):
+        fetch = FailingFetch([APIRequestsError(502, 'Ошибка')] * 2)
+        poller = build_worker(fetch)
+        poller.run_once()
+        state = poller.states['t']
+        assert fetch.calls == 2
+        assert state.failures == 1
+        assert 1015 <= state.due <= 1030
+        poller.clock.sleep(state.due - poller.clock.time())
+        poller.tick()
+        assert fetch.calls == 3
+        assert state.failures == 0
+
+    def test_bad_token_suspends_until_token_changes(self):
+        fetch = FailingFetch([APIRequestsError(401, 'Ошибка')])
+        poller = build_worker(fetch)
+        poller.run_once()
+        state = poller.states['t']
+        assert state.suspended == 'token'
+        assert len(poller.scheduler) == 0
+        poller.run_once()
+        assert fetch.calls == 1
+
+        poller.apply_changes(TenantChanges(
+            [], [], [Tenant('t', 'new-token', '1')]
+        ))
+        assert state.suspended is None
+        poller.tick()
+        assert fetch.calls == 2
+        assert len(poller.scheduler) == 1
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+import scheduler
+
+START = 1600000000
+
+
+def make(kind):
+    if kind == 'heap':
+        return scheduler.HeapScheduler()
+    return scheduler.TimingWheelScheduler(START)
+
+
+@pytest.fixture(params=['heap', 'wheel'])
+def kind(request):
+    return request.param
+
+
+class TestSchedulers:
+
+    def test_pop_due_in_order_with_reschedule_and_remove(self, kind):
+        queue = make(kind)
+        queue.schedule('a', START + 10)
+        queue.schedule('b', START + 5)
+        queue.schedule('c', START + 100000)
+        queue.schedule('a', START + 3)
+        queue.remove('b')
+        assert len(queue) == 2
+        assert queue.next_due() == START + 3
+        assert queue.pop_due(START + 2) == []
+        assert queue.pop_due(START + 50) == ['a']
+        assert queue.next_due() == START + 100000
+        assert queue.pop_due(START + 100000) == ['c']
+        assert queue.next_due() is None
+        assert len(queue) == 0
+
+    def test_far_future_deadline_crosses_all_levels(self, kind):
+        queue = make(kind)
+        far = START + 64 ** 4 * 2 + 17
+        queue.schedule('far', far)
+        queue.schedule('near', START + 1)
+        assert queue.pop_due(START + 1) == ['near']
+        assert queue.pop_due(far - 1) == []
+        assert queue.pop_due(far) == ['far']
+
+
+class TestTimingWheelMatchesHeap:
+
+    def test_random_workload(self):
+        rng = random.Random(7)
+        heap = make('heap')
+        wheel = make('wheel')
+        now = START
+        for step in range(3000):
+            key = rng.randrange(500)
+            due = now + rng.choice([0, 1, 30, 600, 5000, 300000]) + rng.random()
+            heap.schedule(key, int(due))
+            wheel.schedule(key, int(due))
+            if step % 7 == 0:
+                heap.remove(key + 1)
+                wheel.remove(key + 1)
+            assert heap.next_due() == wheel.next_due()
+            if step % 3 == 0:
+                now += rng.choice([1, 5, 60, 700])
+                assert sorted(heap.pop_due(now)) == sorted(wheel.pop_due(now))
+                assert heap.next_due() == wheel.next_due()
+        assert len(heap) == len(wheel)
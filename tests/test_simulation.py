@@ -0,0 +1,103 @@
+import logging
+import random
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime, timezone
+
+import pytest
+
+import utils
+import worker
+from clock import VirtualClock
+from tenants import Tenant
+
+DAY = 24 * 60 * 60
+START = 1600000000
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+def isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ'
+    )
+
+
+class SimulatedAPI:
+    """API stand-in: every tenant's homework changes status at fixed times."""
+
+    def __init__(self, clock, tenants, days, changes_per_day):
+        self.clock = clock
+        self.requests = Counter()
+        rng = random.Random(42)
+        self.events = {
+            tenant.name: sorted(
+                START + rng.uniform(0, days * DAY)
+                for _ in range(days * changes_per_day)
+            )
+            for tenant in tenants
+        }
+
+    def fetch(self, tenant, from_date):
+        self.requests[tenant.name] += 1
+        now = self.clock.time()
+        events = self.events[tenant.name]
+        index = bisect_right(events, now)
+        if index == 0 or events[index - 1] < from_date:
+            return {'homeworks': [], 'current_date': int(now)}
+        return {
+            'homeworks': [{
+                'homework_name': 'hw',
+                'status': STATUSES[index % len(STATUSES)],
+                'date_updated': isoformat(events[index - 1]),
+            }],
+            'current_date': int(now),
+        }
+
+
+class CountingBot(utils.MockTelegramBot):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = Counter()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent[chat_id] += 1
+
+
+class TestSimulation:
+
+    @pytest.mark.parametrize('tenants_count, days, scheduler', [
+        (100, 1, 'heap'),
+        (20, 3, 'wheel'),
+    ])
+    def test_polling_schedule(self, tenants_count, days, scheduler, caplog):
+        # main() из test_bot включает DEBUG-вывод для homework
+        caplog.set_level(logging.INFO, logger='homework')
+        clock = VirtualClock(START)
+        tenants = [
+            Tenant(f'tenant{index}', 'token', str(index))
+            for index in range(tenants_count)
+        ]
+        api = SimulatedAPI(clock, tenants, days, changes_per_day=3)
+        bot = CountingBot()
+        poller = worker.Worker(
+            utils.StaticRegistry(tenants), bot, fetch=api.fetch, clock=clock,
+            scheduler=scheduler,
+        )
+
+        poller.run_until(START + days * DAY)
+
+        polls_per_tenant = days * DAY // worker.RETRY_PERIOD
+        assert set(api.requests) == {tenant.name for tenant in tenants}
+        for count in api.requests.values():
+            assert polls_per_tenant <= count <= polls_per_tenant + 1
+
+        # первые опросы разнесены по периоду, а не собраны в одну секунду
+        first_polls = Counter(
+            poller.initial_offset(tenant) for tenant in tenants
+        )
+        assert max(first_polls.values()) < tenants_count / 10
+
+        assert sum(bot.sent.values()) > tenants_count * days
+        assert not poller.outbox.pending
+        report = poller.tracer.worst_tenants(limit=1)
+        assert report[0]['max'] <= worker.RETRY_PERIOD + 1
@@ -0,0 +1,165 @@
+import pytest
+
+import snapshot
+import utils
+import worker
+from clock import VirtualClock
+from homework import parse_status
+from tenants import Tenant
+
+
+def approved(name='hw.zip'):
+    return {'homework_name': name, 'status': 'approved'}
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append(text)
+
+
+def build_worker(store, tenants, fetch, clock, **kwargs):
+    return worker.Worker(
+        utils.StaticRegistry(tenants), RecordingBot(),
+        fetch=fetch, clock=clock, snapshots=store, **kwargs
+    )
+
+
+class TestSnapshot:
+
+    def test_round_trip(self, tmp_path):
+        store = snapshot.SnapshotStore(str(tmp_path / 'state.snap'))
+        first = worker.TenantState(Tenant('t1', 'token', '1'), 100)
+        first.due = 1600.5
+        first.sent_messages['hw.zip'] = parse_status(approved())
+        first.sent_messages['old.zip'] = parse_status(
+            {'homework_name': 'old.zip', 'status': 'rejected'}
+        )
+        first.sent_messages['error'] = 'Сбой в работе программы: 500'
+        second = worker.TenantState(Tenant('t2', 'token', '2'), 200)
+        second.sent_messages['hw.zip'] = parse_status(approved())
+        store.save([first, second], 1000)
+
+        restored = store.load()
+        assert len(restored) == 2
+        record = restored.get('t1')
+        assert record.from_date == 100
+        assert record.due == 1600.5
+        assert record.restore() == {
+            'hw.zip': first.sent_messages['hw.zip'],
+            'old.zip': first.sent_messages['old.zip'],
+        }
+        assert restored.get('t2').due is None
+        assert restored.get('t3') is None
+
+    def test_homework_names_are_interned(self, tmp_path):
+        states = []
+        for index in range(100):
+            state = worker.TenantState(Tenant(f't{index}', 'token', ''), 0)
+            state.sent_messages['long_homework_name.zip'] = parse_status(
+                approved('long_homework_name.zip')
+            )
+            states.append(state)
+        data = snapshot.encode(states)
+        assert data.count(b'long_homework_name.zip') == 1
+
+    def test_missing_or_broken_snapshot(self, tmp_path):
+        path = tmp_path / 'state.snap'
+        store = snapshot.SnapshotStore(str(path))
+        assert store.load() is None
+        path.write_bytes(b'garbage')
+        assert store.load() is None
+
+    @pytest.mark.parametrize('cut', [1, 10, 200])
+    def test_truncated_snapshot_is_ignored(self, tmp_path, cut):
+        path = tmp_path / 'state.snap'
+        store = snapshot.SnapshotStore(str(path))
+        state = worker.TenantState(Tenant('t1', 'token', '1'), 100)
+        state.sent_messages['hw.zip'] = parse_status(approved())
+        store.save([state] * 5, 1000)
+        data = path.read_bytes()
+        path.write_bytes(data[:len(data) - cut])
+        assert store.load() is None
+        path.write_bytes(data + b'\0')
+        assert store.load() is None
+
+    def test_saved_every_interval(self, tmp_path):
+        store = snapshot.SnapshotStore(str(tmp_path / 'state.snap'), 300)
+        assert not store.maybe_save([], 1000)
+        assert not store.maybe_save([], 1200)
+        assert store.maybe_save([], 1300)
+        assert not store.maybe_save([], 1400)
+
+
+class TestWarmStart:
+
+    def test_worker_resumes_from_snapshot(self, tmp_path):
+        store = snapshot.SnapshotStore(str(tmp_path / 'state.snap'), 0)
+        clock = VirtualClock(1000)
+        tenants = [Tenant('t', 'token', '1')]
+        requested = []
+
+        def fetch(tenant, from_date):
+            requested.append(from_date)
+            return {'homeworks': [approved()], 'current_date': 1500}
+
+        poller = build_worker(store, tenants, fetch, clock)
+        poller.run_once()
+        poller.run_once()
+        assert len(poller.bot.sent) == 1
+        due = poller.states['t'].due
+
+        restarted = build_worker(store, tenants, fetch, clock)
+        restarted.refresh()
+        state = restarted.states['t']
+        assert state.from_date == 1500
+        assert state.due == due
+        assert state._sent_messages is None
+        restarted.run_once()
+        assert requested[-1] == 1500
+        assert restarted.bot.sent == []
+
+    def test_save_leaves_unpolled_tenants_unrestored(self, tmp_path):
+        store = snapshot.SnapshotStore(str(tmp_path / 'state.snap'))
+        states = []
+        for index in range(3):
+            state = worker.TenantState(Tenant(f't{index}', 'token', ''), 0)
+            state.sent_messages['hw.zip'] = parse_status(approved())
+            states.append(state)
+        store.save(states, 1000)
+
+        restarted = build_worker(
+            store, [state.tenant for state in states], None,
+            VirtualClock(1000),
+        )
+        restarted.refresh()
+        restarted.states['t0'].sent_messages['new.zip'] = parse_status(
+            approved('new.zip')
+        )
+        store.save(restarted.states.values(), 1300)
+        assert restarted.states['t1']._sent_messages is None
+        assert restarted.states['t2']._sent_messages is None
+        saved = store.load()
+        assert saved.get('t1').restore() == {
+            'hw.zip': parse_status(approved())
+        }
+        assert set(saved.get('t0').restore()) == {'hw.zip', 'new.zip'}
+
+    def test_snapshot_skips_backfill(self, tmp_path, monkeypatch):
+        store = snapshot.SnapshotStore(str(tmp_path / 'state.snap'))
+        state = worker.TenantState(Tenant('t', 'token', '1'), 1500)
+        store.save([state], 1000)
+
+        def backfill(*args):
+            raise AssertionError('история не должна загружаться')
+
+        monkeypatch.setattr(worker, 'backfill', backfill)
+        poller = build_worker(
+            store, [Tenant('t', 'token', '1')], None, VirtualClock(1000),
+            backfill_on_add=True,
+        )
+        poller.refresh()
+        assert poller.states['t'].from_date == 1500
+        assert not poller.states['t'].needs_history
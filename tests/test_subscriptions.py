@@ -0,0 +1,70 @@
+import json
+import sqlite3
+
+import subscriptions
+import utils
+import worker
+from tenants import Tenant
+
+
+class RecordingBot(utils.MockTelegramBot):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class TestSubscriptions:
+
+    def test_index_skips_bad_rows_and_duplicates(self):
+        index = subscriptions.build_index([
+            {'tenant': 'alice', 'chat_id': '10'},
+            {'tenant': 'alice', 'chat_id': '10'},
+            {'tenant': 'alice', 'chat_id': '-20'},
+            {'tenant': '', 'chat_id': '30'},
+            {'tenant': 'bob', 'chat_id': 'mentor'},
+        ])
+        assert index == {'alice': ('10', '-20')}
+
+    def test_event_rendered_once_and_fanned_out(
+            self, tmp_path, monkeypatch, data_with_new_hw_status):
+        path = tmp_path / 'subscriptions.json'
+        path.write_text(json.dumps([
+            {'tenant': 'alice', 'chat_id': '10'},
+            {'tenant': 'alice', 'chat_id': '1'},
+            {'tenant': 'alice', 'chat_id': '-20'},
+        ]), encoding='utf-8')
+        parsed = []
+        parse_status = worker.detect_status_change
+
+        def counting_detect(*args, **kwargs):
+            change = parse_status(*args, **kwargs)
+            parsed.append(change)
+            return change
+
+        monkeypatch.setattr(worker, 'detect_status_change', counting_detect)
+        bot = RecordingBot()
+        poller = worker.Worker(
+            utils.StaticRegistry([Tenant('alice', 'token', '1')]), bot,
+            fetch=lambda tenant, from_date: data_with_new_hw_status,
+            subscriptions=subscriptions.SubscriptionIndex(str(path)),
+        )
+        poller.run_once()
+
+        assert len(parsed) == 1
+        assert sorted(chat_id for chat_id, _ in bot.sent) == ['-20', '1', '10']
+        assert len({text for _, text in bot.sent}) == 1
+
+    def test_sqlite_without_digest_columns(self, tmp_path):
+        path = tmp_path / 'subscriptions.db'
+        connection = sqlite3.connect(path)
+        connection.execute('CREATE TABLE subscriptions (tenant, chat_id)')
+        connection.execute("INSERT INTO subscriptions VALUES ('alice', 10)")
+        connection.commit()
+        connection.close()
+        index = subscriptions.SubscriptionIndex(str(path))
+        assert index.reload_if_changed()
+        assert index.index == {'alice': ('10',)}
+        assert index.policy_for('10') is None
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+import urllib3
+
+import homework
+import telegram_client
+from exceptions import TelegramAPIError, TelegramError
+
+
+class FakeResponse:
+    def __init__(self, data, status=200):
+        self.data = json.dumps(data).encode()
+        self.status = status
+
+
+class TestBotAPIClient:
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        client = telegram_client.BotAPIClient('1234:abcdefg', pool_size=2)
+        self.calls = []
+
+        def request(method, url, body=None, headers=None):
+            payload = json.loads(body)
+            self.calls.append((url, payload))
+            if payload['chat_id'] == 'blocked':
+                return FakeResponse({
+                    'ok': False, 'error_code': 403,
+                    'description': 'Forbidden: bot was blocked by the user',
+                }, 403)
+            if payload['chat_id'] == 'flood':
+                return FakeResponse({
+                    'ok': False, 'error_code': 429,
+                    'description': 'Too Many Requests',
+                    'parameters': {'retry_after': 7},
+                }, 429)
+            if payload['chat_id'] == 'down':
+                raise urllib3.exceptions.NewConnectionError(None, 'refused')
+            return FakeResponse({'ok': True, 'result': {'text': payload['text']}})
+
+        monkeypatch.setattr(client.pool, 'request', request)
+        yield client
+        client.close()
+
+    def test_send_message_posts_to_bot_api(self, client):
+        assert client.send_message(chat_id=1, text='hi') == {'text': 'hi'}
+        assert self.calls == [
+            ('https://api.telegram.org/bot1234:abcdefg/sendMessage',
+             {'chat_id': 1, 'text': 'hi'})
+        ]
+
+    @pytest.mark.parametrize('chat_id, code, retry_after', [
+        ('blocked', 403, None),
+        ('flood', 429, 7),
+        ('down', None, None),
+    ])
+    def test_errors_keep_telegram_error_semantics(self, client, chat_id,
+                                                  code, retry_after):
+        with pytest.raises(TelegramError) as error:
+            homework.send_to_chat(client, chat_id, 'hi')
+        assert isinstance(error.value, TelegramAPIError)
+        assert error.value.error_code == code
+        assert error.value.retry_after == retry_after
+
+    def test_send_batch_keeps_order_within_chat(self, client):
+        messages = [(1, 'a'), (2, 'b'), ('blocked', 'c'), (1, 'd')]
+        results = client.send_batch(messages)
+        assert results[0] == {'text': 'a'}
+        assert isinstance(results[2], TelegramAPIError)
+        chat_1 = [payload['text'] for _, payload in self.calls
+                  if payload['chat_id'] == 1]
+        assert chat_1 == ['a', 'd']
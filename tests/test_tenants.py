@@ -0,0 +1,88 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+import tenants
+import utils
+import worker
+
+
+def write_json(path, rows):
+    path.write_text(json.dumps(rows), encoding='utf-8')
+    stat = os.stat(path)
+    # гарантируем смену mtime даже на файловых системах с грубым временем
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class TestTenants:
+    ROWS = [
+        {'name': 'alice', 'practicum_token': 't1', 'chat_id': '1'},
+        {'name': 'bob', 'practicum_token': 't2', 'chat_id': '-100'},
+    ]
+
+    def test_bulk_validation_skips_bad_rows(self):
+        rows = self.ROWS + [
+            {'name': 'alice', 'practicum_token': 't3', 'chat_id': '3'},
+            {'name': 'eve', 'practicum_token': '', 'chat_id': '4'},
+            {'name': 'mallory', 'practicum_token': 't5', 'chat_id': 'x'},
+        ]
+        valid, errors = tenants.validate_rows(rows)
+        assert sorted(valid) == ['alice', 'bob']
+        assert len(errors) == 3
+
+    @pytest.mark.parametrize('suffix', ['.csv', '.json', '.sqlite'])
+    def test_sources(self, tmp_path, suffix):
+        path = tmp_path / f'tenants{suffix}'
+        if suffix == '.csv':
+            lines = ['name,practicum_token,chat_id'] + [
+                ','.join(row.values()) for row in self.ROWS
+            ]
+            path.write_text('\n'.join(lines), encoding='utf-8')
+        elif suffix == '.json':
+            write_json(path, self.ROWS)
+        else:
+            connection = sqlite3.connect(path)
+            connection.execute(
+                'CREATE TABLE tenants (name, practicum_token, chat_id)'
+            )
+            connection.executemany(
+                'INSERT INTO tenants VALUES (:name, :practicum_token, '
+                ':chat_id)', self.ROWS
+            )
+            connection.commit()
+            connection.close()
+        assert sorted(tenants.load_tenants(str(path))) == ['alice', 'bob']
+
+    def test_hot_reload_is_incremental(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        write_json(path, self.ROWS)
+        bot = utils.MockTelegramBot()
+        bot_worker = worker.Worker(
+            tenants.TenantRegistry(str(path)), bot,
+            fetch=lambda tenant, from_date: {
+                'homeworks': [], 'current_date': from_date + 1
+            },
+        )
+        bot_worker.run_once()
+        bob_state = bot_worker.states['bob']
+        assert bob_state.from_date > 0
+
+        write_json(path, [
+            self.ROWS[1],
+            {'name': 'carol', 'practicum_token': 't3', 'chat_id': '3'},
+        ])
+        bot_worker.run_once()
+        assert sorted(bot_worker.states) == ['bob', 'carol']
+        assert bot_worker.states['bob'] is bob_state
+
+    def test_broken_source_keeps_previous_list(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        write_json(path, self.ROWS)
+        registry = tenants.TenantRegistry(str(path))
+        registry.reload_if_changed()
+        path.write_text('{broken', encoding='utf-8')
+        os.utime(path, ns=(0, 10 ** 18))
+        assert registry.reload_if_changed() is None
+        assert sorted(registry.tenants) == ['alice', 'bob']
@@ -0,0 +1,72 @@
+import time
+
+import tracing
+import utils
+import worker
+from clock import VirtualClock
+from tenants import Tenant, TenantChanges
+
+
+class TestTracing:
+
+    def test_worker_records_lag_per_tenant(self, tmp_path):
+        path = tmp_path / 'traces.jsonl'
+        tracer = tracing.Tracer(export_path=str(path), sample_rate=0, slo=60)
+        now = int(time.time())
+        happened = {'slow': now - 3600, 'fast': now - 5}
+
+        def fetch(tenant, from_date):
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': happened[tenant.name],
+            }
+
+        registry = utils.StaticRegistry([
+            Tenant('slow', 't1', '1'), Tenant('fast', 't2', '2')
+        ])
+        worker.Worker(
+            registry, utils.MockTelegramBot(), fetch=fetch, tracer=tracer
+        ).run_once()
+
+        report = tracer.worst_tenants()
+        assert [row['tenant'] for row in report] == ['slow', 'fast']
+        assert report[0]['violations'] == 1
+
+        exported = tracing.report_from_file(str(path), slo=60)
+        assert [row['tenant'] for row in exported] == ['slow']
+
+    def test_lags_are_bounded_and_forgotten_with_tenant(self):
+        clock = VirtualClock(1000)
+        tracer = tracing.Tracer(clock=clock, max_tenants=2)
+        for name in ('a', 'b', 'c'):
+            tracer.finish(tracer.start(name), 990)
+        assert sorted(tracer.lags) == ['b', 'c']
+
+        def fetch(tenant, from_date):
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 990,
+            }
+
+        class FailingBot(utils.MockTelegramBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                raise RuntimeError('Telegram недоступен')
+
+        registry = utils.StaticRegistry([Tenant('b', 'token', '1')])
+        poller = worker.Worker(
+            registry, FailingBot(), fetch=fetch, tracer=tracer, clock=clock,
+        )
+        poller.run_once()
+        assert len(poller.traces) == 1
+        poller.apply_changes(
+            TenantChanges([], [Tenant('b', 'token', '1')], [])
+        )
+        assert poller.traces == {}
+        assert sorted(tracer.lags) == ['c']
+
+    def test_event_time_prefers_date_updated(self):
+        response = {
+            'homeworks': [{'date_updated': '2020-02-13T14:40:57Z'}],
+            'current_date': 1,
+        }
+        assert tracing.event_time(response) == 1581604857
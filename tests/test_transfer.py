@@ -0,0 +1,78 @@
+import io
+import zlib
+
+import pytest
+import requests
+import urllib3
+
+import homework
+import transfer
+import utils
+import worker
+from exceptions import APIResponseError
+from metrics import Metrics
+from tenants import Tenant, TenantChanges
+from transfer import DECODED_METRIC, WIRE_METRIC, TransferMeter, read_json
+
+
+def stream(body):
+    return urllib3.HTTPResponse(
+        body=io.BytesIO(body), preload_content=False, decode_content=False
+    )
+
+
+class TestTransfer:
+
+    def test_deflate_stream(self):
+        body = zlib.compress(b'{"homeworks": []}')
+        data, sizes = read_json(stream(body), 'deflate')
+        assert data == {'homeworks': []}
+        assert sizes == (len(body), len(b'{"homeworks": []}'))
+
+    def test_unknown_encoding(self):
+        with pytest.raises(APIResponseError):
+            read_json(stream(b'{}'), 'compress')
+
+    def test_totals_per_tenant_and_metrics(self):
+        meter = TransferMeter(Metrics())
+        meter.record('alice', 100, 1000)
+        meter.record('alice', 50, 500)
+        meter.record('bob', 300, 600)
+        assert meter.totals('alice') == (2, 150, 1500)
+        assert meter.totals('carol') == (0, 0, 0)
+        assert [row['tenant'] for row in meter.top()] == ['bob', 'alice']
+        assert meter.metrics.get(WIRE_METRIC) == 450
+        assert meter.metrics.get(DECODED_METRIC) == 2100
+
+    def test_removed_tenant_counters_are_forgotten(self):
+        tenant = Tenant('gone', 'token', '1')
+        poller = worker.Worker(
+            utils.StaticRegistry([tenant]), utils.MockTelegramBot(),
+        )
+        poller.refresh()
+        transfer.METER.record('gone', 10, 100)
+        poller.apply_changes(TenantChanges([], [tenant], []))
+        assert transfer.METER.totals('gone') == (0, 0, 0)
+
+    def test_requests_response_uses_urllib3_counter(self):
+        response = requests.Response()
+        response.raw = stream(b'{"homeworks": []}')
+        meter = TransferMeter(Metrics())
+        meter.record_response('alice', response)
+        assert meter.totals('alice') == (1, 17, 17)
+        meter.record_response('bob', utils.MockResponseGET())
+        assert meter.totals('bob') == (0, 0, 0)
+
+    def test_get_api_answer_is_metered(self, monkeypatch):
+        meter = TransferMeter(Metrics())
+        monkeypatch.setattr(homework, 'METER', meter)
+
+        def get(url, headers=None, params=None):
+            response = requests.Response()
+            response.status_code = 200
+            response.raw = stream(b'{"homeworks": [], "current_date": 1}')
+            return response
+
+        monkeypatch.setattr(homework.requests, 'get', get)
+        assert homework.get_api_answer(0)['current_date'] == 1
+        assert meter.totals(homework.DEFAULT_TENANT)[0] == 1
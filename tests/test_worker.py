@@ -0,0 +1,77 @@
+import threading
+import time
+
+import utils
+import worker
+from tenants import Tenant
+
+
+class TestThreadedWorker:
+
+    def test_polls_every_tenant_once_with_bounded_concurrency(self):
+        lock = threading.Lock()
+        calls = []
+        in_flight = [0, 0]
+
+        def fetch(tenant, from_date):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.005)
+            with lock:
+                in_flight[0] -= 1
+                calls.append(tenant.name)
+            return {'homeworks': [], 'current_date': from_date}
+
+        registry = utils.StaticRegistry(
+            Tenant(f't{index}', 'token', str(index)) for index in range(50)
+        )
+        poller = worker.build_worker(
+            registry, utils.MockTelegramBot(), threads=4, fetch=fetch
+        )
+        poller.run_once()
+        poller.close()
+        assert sorted(calls) == sorted(f't{index}' for index in range(50))
+        assert in_flight[1] <= 4
+
+    def test_build_worker_without_threads_is_sequential(self):
+        poller = worker.build_worker(
+            utils.StaticRegistry([]), utils.MockTelegramBot(), threads=0
+        )
+        assert type(poller) is worker.Worker
+
+
+class TestBackfillOnAdd:
+
+    def test_history_is_loaded_in_first_poll_not_in_refresh(
+        self, monkeypatch
+    ):
+        loaded = []
+        requested = []
+
+        def backfill(tenant, handle_batch):
+            loaded.append(tenant.name)
+            handle_batch([{'homework_name': 'hw', 'status': 'approved'}])
+            return 1500
+
+        def fetch(tenant, from_date):
+            requested.append(from_date)
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': from_date,
+            }
+
+        monkeypatch.setattr(worker, 'backfill', backfill)
+        bot = utils.MockTelegramBot()
+        poller = worker.build_worker(
+            utils.StaticRegistry([Tenant('t', 'token', '1')]), bot,
+            fetch=fetch, backfill_on_add=True,
+        )
+        poller.refresh()
+        assert loaded == []
+        assert poller.states['t'].needs_history
+        poller.run_once()
+        poller.run_once()
+        assert loaded == ['t']
+        assert requested == [1500, 1500]
+        assert not poller.states['t'].needs_history
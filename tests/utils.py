@@ -114,6 +114,18 @@ class MockTelegramBot:
         self.text = text
 
 
+class StaticRegistry:
+    """Tenant registry that hands out a fixed set of tenants once."""
+
+    def __init__(self, tenants):
+        from tenants import TenantChanges
+        self.changes = TenantChanges(list(tenants), [], [])
+
+    def reload_if_changed(self):
+        changes, self.changes = self.changes, None
+        return changes
+
+
 class BreakInfiniteLoop(Exception):
     pass
 
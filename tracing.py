@@ -0,0 +1,199 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+from bounded import BoundedDict
+from clock import Clock
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE_ENV = 'TRACE_FILE'
+TRACE_SAMPLE_RATE_ENV = 'TRACE_SAMPLE_RATE'
+DEFAULT_SAMPLE_RATE = 0.01
+# Уведомление считается опоздавшим, если пришло позже двух периодов опроса.
+LAG_SLO = 1200
+LAG_WINDOW = 1000
+# Для скольких тенантов хранить задержки; давно не получавшие уведомлений
+# тенанты вытесняются первыми.
+LAG_TENANTS = 10000
+
+
+def event_time(api_response):
+    """Возвращает время события: date_updated работы или current_date."""
+    homeworks = api_response.get('homeworks') or [{}]
+    date_updated = homeworks[0].get('date_updated')
+    if date_updated:
+        try:
+            return datetime.strptime(
+                date_updated, '%Y-%m-%dT%H:%M:%S%z'
+            ).timestamp()
+        except ValueError:
+            pass
+    return api_response.get('current_date')
+
+
+def percentile(values, fraction):
+    """Возвращает перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    index = min(int(fraction * len(ordered)), len(ordered) - 1)
+    return ordered[index]
+
+
+class Trace:
+    """Отметки времени прохождения одного события по конвейеру."""
+
+    __slots__ = ('tenant', 'started', 'marks')
+
+    def __init__(self, tenant):
+        self.tenant = tenant
+        self.started = time.perf_counter()
+        self.marks = []
+
+    def mark(self, stage):
+        """Отмечает завершение этапа обработки."""
+        self.marks.append((stage, time.perf_counter() - self.started))
+
+
+class Tracer:
+    """Считает задержку уведомлений по тенантам и выгружает трассы.
+
+    Задержка — время от события в API до подтверждения отправки Telegram.
+    Трассы, нарушившие LAG_SLO, выгружаются всегда, остальные — с
+    вероятностью sample_rate. Задержки хранятся не больше чем для
+    max_tenants тенантов, по LAG_WINDOW последних на каждого.
+    """
+
+    def __init__(self, export_path=None, sample_rate=DEFAULT_SAMPLE_RATE,
+                 slo=LAG_SLO, clock=None, max_tenants=LAG_TENANTS):
+        self.export_path = export_path
+        self.clock = clock or Clock()
+        self.sample_rate = sample_rate
+        self.slo = slo
+        self.lags = BoundedDict(
+            max_size=max_tenants, clock=self.clock, pinned=()
+        )
+        self.violations = BoundedDict(
+            max_size=max_tenants, clock=self.clock, pinned=()
+        )
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Создаёт трассировщик по TRACE_FILE и TRACE_SAMPLE_RATE."""
+        return cls(
+            export_path=os.getenv(TRACE_FILE_ENV),
+            sample_rate=float(
+                os.getenv(TRACE_SAMPLE_RATE_ENV, DEFAULT_SAMPLE_RATE)
+            ),
+        )
+
+    def start(self, tenant):
+        """Начинает трассу события для тенанта."""
+        return Trace(tenant)
+
+    def finish(self, trace, happened_at):
+        """Завершает трассу после подтверждения отправки."""
+        lag = None
+        if happened_at is not None:
+            lag = max(self.clock.time() - happened_at, 0.0)
+        with self._lock:
+            if lag is not None:
+                lags = self.lags.get(trace.tenant)
+                if lags is None:
+                    lags = self.lags[trace.tenant] = deque(maxlen=LAG_WINDOW)
+                lags.append(lag)
+                if lag > self.slo:
+                    self.violations[trace.tenant] = (
+                        self.violations.get(trace.tenant, 0) + 1
+                    )
+        slow = lag is not None and lag > self.slo
+        if self.export_path and (slow or random.random() < self.sample_rate):
+            self._export(trace, lag)
+        return lag
+
+    def forget(self, tenant):
+        """Забывает задержки удалённого тенанта."""
+        with self._lock:
+            self.lags.pop(tenant, None)
+            self.violations.pop(tenant, None)
+
+    def _export(self, trace, lag):
+        record = {
+            'tenant': trace.tenant,
+            'lag': lag,
+            'stages': dict(trace.marks),
+        }
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        try:
+            with self._lock:
+                with open(self.export_path, 'a', encoding='utf-8') as file:
+                    file.write(line)
+        except OSError as error:
+            logger.error(f'Не удалось выгрузить трассу: {error}')
+
+    def worst_tenants(self, limit=10):
+        """Возвращает тенантов с наибольшим p95 задержки уведомлений."""
+        with self._lock:
+            lags = {tenant: list(values) for tenant, values in
+                    self.lags.items() if values}
+            violations = dict(self.violations)
+        return worst_tenants(lags, violations, limit)
+
+
+def worst_tenants(lags, violations, limit=10):
+    """Строит отчёт по тенантам, отсортированный по p95 задержки."""
+    report = [
+        {
+            'tenant': tenant,
+            'count': len(values),
+            'p50': percentile(values, 0.5),
+            'p95': percentile(values, 0.95),
+            'max': max(values),
+            'violations': violations.get(tenant, 0),
+        }
+        for tenant, values in lags.items()
+    ]
+    report.sort(key=lambda row: row['p95'], reverse=True)
+    return report[:limit]
+
+
+def report_from_file(path, slo=LAG_SLO, limit=10):
+    """Строит отчёт о худших тенантах по выгруженным трассам."""
+    lags = defaultdict(list)
+    violations = defaultdict(int)
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            record = json.loads(line)
+            if record['lag'] is None:
+                continue
+            lags[record['tenant']].append(record['lag'])
+            if record['lag'] > slo:
+                violations[record['tenant']] += 1
+    return worst_tenants(lags, violations, limit)
+
+
+def main(argv=None):
+    """Печатает отчёт о тенантах с наибольшей задержкой уведомлений."""
+    parser = argparse.ArgumentParser(
+        description='Отчёт о задержке уведомлений по тенантам.'
+    )
+    parser.add_argument('path', help='файл трасс из TRACE_FILE')
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args(argv)
+    for row in report_from_file(args.path, limit=args.limit):
+        print(
+            f'{row["tenant"]}: p50={row["p50"]:.1f}s p95={row["p95"]:.1f}s '
+            f'max={row["max"]:.1f}s n={row["count"]} '
+            f'SLO нарушен {row["violations"]} раз'
+        )
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,119 @@
+import heapq
+import json
+import threading
+import zlib
+
+from exceptions import APIResponseError
+from metrics import REGISTRY
+
+ACCEPT_ENCODING = 'gzip, deflate'
+CHUNK_SIZE = 16 * 1024
+# Ответ API больше этого размера после распаковки считается ошибкой.
+MAX_DECODED = 32 * 1024 * 1024
+WIRE_METRIC = 'api_bytes_wire'
+DECODED_METRIC = 'api_bytes_decoded'
+# wbits для zlib: 32 + 15 — сжатие gzip или zlib по заголовку потока.
+AUTO_WBITS = 32 + zlib.MAX_WBITS
+ENCODINGS = ('gzip', 'deflate', 'x-gzip')
+
+
+class TransferMeter:
+    """Счётчик байтов ответов API по тенантам.
+
+    Для каждого тенанта копятся число ответов, байты по сети (сжатые) и
+    байты после распаковки. Суммы по всем тенантам публикуются в метриках
+    api_bytes_wire и api_bytes_decoded.
+    """
+
+    def __init__(self, metrics=REGISTRY):
+        self.metrics = metrics
+        self._tenants = {}
+        self._lock = threading.Lock()
+
+    def record(self, tenant, wire, decoded):
+        """Учитывает один ответ API тенанта."""
+        with self._lock:
+            totals = self._tenants.setdefault(tenant, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += wire
+            totals[2] += decoded
+        self.metrics.increment(WIRE_METRIC, wire)
+        self.metrics.increment(DECODED_METRIC, decoded)
+
+    def record_response(self, tenant, response):
+        """Учитывает ответ requests, прочитанный целиком.
+
+        Байты по сети берутся из счётчика urllib3; у ответов без него
+        сетевой размер считается равным распакованному.
+        """
+        content = getattr(response, 'content', None)
+        if not isinstance(content, bytes):
+            return
+        tell = getattr(getattr(response, 'raw', None), 'tell', None)
+        wire = tell() if callable(tell) else len(content)
+        self.record(tenant, wire, len(content))
+
+    def forget(self, tenant):
+        """Забывает счётчики тенанта, удалённого из реестра."""
+        with self._lock:
+            self._tenants.pop(tenant, None)
+
+    def totals(self, tenant):
+        """Возвращает (ответы, байты по сети, байты после распаковки)."""
+        with self._lock:
+            return tuple(self._tenants.get(tenant, (0, 0, 0)))
+
+    def top(self, limit=10):
+        """Возвращает тенантов с наибольшим трафиком по сети."""
+        with self._lock:
+            tenants = heapq.nlargest(
+                limit, self._tenants.items(), key=lambda item: item[1][1]
+            )
+        return [
+            {'tenant': tenant, 'responses': responses, 'wire': wire,
+             'decoded': decoded}
+            for tenant, (responses, wire, decoded) in tenants
+        ]
+
+
+METER = TransferMeter()
+
+
+def decoder(content_encoding):
+    """Возвращает распаковщик для Content-Encoding или None без сжатия."""
+    encoding = (content_encoding or '').strip().lower()
+    if encoding in ENCODINGS:
+        return zlib.decompressobj(AUTO_WBITS)
+    if encoding in ('', 'identity'):
+        return None
+    raise APIResponseError(f'Неизвестное сжатие ответа: {encoding}')
+
+
+def read_json(raw, content_encoding, limit=MAX_DECODED):
+    """Читает JSON из потока ответа, распаковывая его по мере чтения.
+
+    raw — urllib3.HTTPResponse, открытый с stream=True. Возвращает пару
+    (данные, (байты по сети, байты после распаковки)). Распакованный
+    ответ больше limit байт прерывается с APIResponseError.
+    """
+    unpack = decoder(content_encoding)
+    wire = 0
+    body = bytearray()
+    try:
+        for chunk in raw.stream(CHUNK_SIZE, decode_content=False):
+            wire += len(chunk)
+            if unpack is not None:
+                chunk = unpack.decompress(chunk, limit + 1 - len(body))
+            body += chunk
+            if len(body) > limit:
+                raise APIResponseError(
+                    f'Ответ API больше {limit} байт после распаковки'
+                )
+        if unpack is not None:
+            body += unpack.flush()
+    except zlib.error as error:
+        raise APIResponseError(f'Ошибка распаковки ответа API: {error}')
+    try:
+        return json.loads(body), (wire, len(body))
+    except ValueError as error:
+        raise APIResponseError(f'Ошибка при разборе JSON: {error}')
@@ -0,0 +1,652 @@
+import logging
+import os
+import sys
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+
+import telegram
+from dotenv import load_dotenv
+
+from aimd import AIMDLimiter
+from backfill import backfill
+from bounded import BoundedDict
+from clock import Clock
+from constants import RETRY_PERIOD
+from deadletter import protect_from_env
+from digest import DIGEST_TENANT, DigestBuffer, holds
+from eventlog import EventLog
+from health import HealthServer
+from history import StatusHistory
+from homework import (
+    detect_status_change,
+    parse_status,
+    request_homeworks,
+    send_to_chat,
+)
+from leases import LeasedRegistry, LeaseStore
+from memwatch import MemoryWatchdog
+from metrics import REGISTRY
+from outbox import Outbox
+from pipeline import Event, Pipeline
+from prepared import PreparedRequests
+from profiling import Profiler
+from retry import RETRIES_METRIC, SUSPENDED_METRIC, RetryPolicy
+from scheduler import HeapScheduler, TimingWheelScheduler
+from snapshot import SnapshotStore
+from subscriptions import SubscriptionIndex
+from telegram_client import BotAPIClient
+from tenants import TENANTS_FILE_ENV, TenantRegistry
+from tracing import Tracer, event_time
+from transfer import METER
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
+TENANTS_FILE = os.getenv(TENANTS_FILE_ENV)
+WORKER_THREADS = int(os.getenv('WORKER_THREADS', 0))
+BACKFILL_ON_ADD = bool(os.getenv('BACKFILL_ON_ADD'))
+TELEGRAM_CLIENT = os.getenv('TELEGRAM_CLIENT', 'python-telegram-bot')
+SCHEDULER = os.getenv('SCHEDULER', 'heap')
+# Сколько задач может ждать в очереди пула на каждый поток.
+QUEUE_PER_THREAD = 2
+# Как часто проверять изменения списка тенантов, если опросов не ожидается.
+REFRESH_INTERVAL = 60
+# Сколько трасс неотправленных сообщений держать; сверх этого сообщения
+# ставятся в журнал без трассы.
+MAX_TRACES = 10000
+
+
+def fetch_tenant(tenant, from_date):
+    """Запрашивает статусы домашних работ тенанта с его токеном."""
+    return request_homeworks(
+        {'Authorization': f'OAuth {tenant.practicum_token}'},
+        {'from_date': from_date},
+        tenant.name,
+    )
+
+
+def create_scheduler(kind, clock):
+    """Создаёт планировщик опросов: двоичную кучу или колесо таймеров."""
+    if kind == 'wheel':
+        return TimingWheelScheduler(clock.time())
+    return HeapScheduler()
+
+
+class TenantState:
+    """Состояние опроса одного тенанта.
+
+    restore — функция, возвращающая отправленные сообщения из снимка;
+    она вызывается при первом обращении к sent_messages. delay — пауза
+    до следующего опроса, выбранная по итогу последнего; suspended —
+    токен, с которым опрос тенанта приостановлен; needs_history —
+    загрузить историю тенанта перед первым опросом. По clock отсчитывается
+    простой записей sent_messages.
+    """
+
+    def __init__(self, tenant, from_date, restore=None, clock=None):
+        self.tenant = tenant
+        self.clock = clock
+        self.from_date = from_date
+        self.due = None
+        self.delay = RETRY_PERIOD
+        self.failures = 0
+        self.suspended = None
+        self.needs_history = False
+        self._restore = restore
+        self._sent_messages = None
+
+    @property
+    def pending_restore(self):
+        """Функция восстановления из снимка, если она ещё не вызывалась."""
+        return self._restore
+
+    @property
+    def sent_messages(self):
+        """Последние отправленные сообщения по работам и последняя ошибка."""
+        if self._sent_messages is None:
+            self._sent_messages = BoundedDict(clock=self.clock)
+            if self._restore is not None:
+                self._sent_messages.update(self._restore())
+                self._restore = None
+        return self._sent_messages
+
+
+class Worker:
+    """Опрашивает API для всех тенантов из реестра.
+
+    Каждый тенант опрашивается раз в RETRY_PERIOD по собственному сроку из
+    планировщика; первые сроки новых тенантов разнесены по периоду, чтобы
+    не опрашивать всех разом. Реестр перечитывается между тиками, поэтому
+    добавление и удаление тенантов не прерывает цикл опроса и уже начатые
+    запросы. Новые статусы сначала попадают в журнал исходящих сообщений и
+    отправляются в конце тика. После сбоя срок следующего опроса и
+    приостановка тенанта выбираются по RetryPolicy. Всё время берётся из
+    clock, что позволяет симулировать дни работы за секунды.
+    """
+
+    def __init__(self, registry, bot, fetch=fetch_tenant, tracer=None,
+                 outbox=None, backfill_on_add=False, clock=None,
+                 scheduler=SCHEDULER, subscriptions=None, profiler=None,
+                 leases=None, history=None, snapshots=None,
+                 retry_policy=None):
+        self.leases = leases
+        self.snapshots = snapshots
+        self.snapshot = snapshots.load() if snapshots is not None else None
+        self.history = history
+        if leases is not None:
+            registry = LeasedRegistry(registry, leases)
+        self.registry = registry
+        self.subscriptions = subscriptions or SubscriptionIndex()
+        self.backfill_on_add = backfill_on_add
+        self.bot = bot
+        self.fetch = fetch
+        # клиент API, если fetch — его метод (PreparedRequests.fetch): ему
+        # сообщается об удалении тенантов
+        self.api_client = getattr(fetch, '__self__', None)
+        self.clock = clock or Clock()
+        if isinstance(scheduler, str):
+            scheduler = create_scheduler(scheduler, self.clock)
+        self.scheduler = scheduler
+        self.tracer = tracer or Tracer(clock=self.clock)
+        self.outbox = outbox or Outbox(clock=self.clock)
+        self.profiler = profiler or Profiler()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.digests = DigestBuffer()
+        self.pipeline = (
+            Pipeline('worker')
+            .enrich(self.detect_change, name='detect')
+            .sink(self.enqueue_change, name='enqueue')
+            .sink(self.record_change, name='history')
+            .sink(self.remember_change, name='remember')
+        )
+        self.traces = {}
+        self.states = {}
+        self.last_tick = None
+        self.last_success = None
+        # клиент с собственным пулом соединений рассылает чаты параллельно
+        self.delivery_executor = getattr(bot, 'executor', None)
+
+    def apply_changes(self, changes):
+        """Применяет изменения реестра к состояниям опроса."""
+        now = self.clock.time()
+        for tenant in changes.added:
+            state = self.restore_state(tenant, now)
+            if state.due is None:
+                state.due = now + self.initial_offset(tenant)
+            self.states[tenant.name] = state
+            self.scheduler.schedule(tenant.name, state.due)
+        for tenant in changes.changed:
+            state = self.states[tenant.name]
+            state.tenant = tenant
+            if state.suspended not in (None, tenant.practicum_token):
+                self.resume(state, now)
+        for tenant in changes.removed:
+            del self.states[tenant.name]
+            self.scheduler.remove(tenant.name)
+            self.forget_traces(tenant.name)
+            self.forget_request(tenant.name)
+            METER.forget(tenant.name)
+
+    def forget_request(self, name):
+        """Забывает заготовку запроса удалённого тенанта, если она есть."""
+        forget = getattr(self.api_client, 'forget', None)
+        if forget is not None:
+            forget(name)
+
+    def forget_traces(self, name):
+        """Забывает трассы и задержки удалённого тенанта."""
+        self.tracer.forget(name)
+        for entry_id in [
+            entry_id for entry_id, (trace, _) in self.traces.items()
+            if trace.tenant == name
+        ]:
+            del self.traces[entry_id]
+
+    def resume(self, state, now):
+        """Возобновляет опрос приостановленного тенанта с новым токеном."""
+        logger.info(f'{state.tenant.name}: токен сменился, опрос возобновлён')
+        state.suspended = None
+        state.failures = 0
+        state.due = now
+        self.scheduler.schedule(state.tenant.name, now)
+
+    def restore_state(self, tenant, now):
+        """Создаёт состояние тенанта по снимку, аренде или истории.
+
+        Из снимка берутся from_date, срок опроса и отправленные сообщения;
+        курсор аренды новее снимка и заменяет его from_date. Без снимка и
+        курсора при backfill_on_add история тенанта загружается перед его
+        первым опросом, а не здесь: refresh не ждёт чужих историй.
+        """
+        record = None
+        if self.snapshot is not None:
+            record = self.snapshot.get(tenant.name)
+        if record is None:
+            state = TenantState(tenant, int(now), clock=self.clock)
+        else:
+            state = TenantState(
+                tenant, record.from_date, record.restore, self.clock
+            )
+            state.due = record.due
+        cursor = self.saved_cursor(tenant)
+        if cursor is not None:
+            state.from_date = cursor
+        elif record is None and self.backfill_on_add:
+            state.needs_history = True
+        return state
+
+    def saved_cursor(self, tenant):
+        """Возвращает from_date, сохранённый прежним владельцем аренды.
+
+        Опрос тенанта, перешедшего от другого обработчика, продолжается с
+        этого места без загрузки истории.
+        """
+        if self.leases is None:
+            return None
+        return self.leases.cursor(tenant.name)
+
+    def initial_offset(self, tenant):
+        """Возвращает устойчивый сдвиг первого опроса внутри периода."""
+        return zlib.crc32(tenant.name.encode()) % RETRY_PERIOD
+
+    def seed_history(self, state):
+        """Загружает всю историю тенанта, чтобы не слать старые статусы.
+
+        Для каждой работы запоминается последний известный статус, а опрос
+        продолжается с current_date ответа. Сбой загрузки не повторяется:
+        опрос продолжается с прежнего from_date.
+        """
+        state.needs_history = False
+        latest = {}
+
+        def handle_batch(batch):
+            for item in batch:
+                try:
+                    message = parse_status(item)
+                except Exception as error:
+                    logger.debug(f'{state.tenant.name}: {error}')
+                    continue
+                updated = item.get('date_updated') or ''
+                known = latest.get(item['homework_name'])
+                if known is None or known[0] <= updated:
+                    latest[item['homework_name']] = (updated, message)
+
+        try:
+            current_date = backfill(state.tenant, handle_batch)
+        except Exception as error:
+            logger.error(f'{state.tenant.name}: история не загружена: {error}')
+            return
+        for homework_name, (_, message) in latest.items():
+            state.sent_messages[homework_name] = message
+        if current_date is not None:
+            state.from_date = current_date
+
+    def refresh(self):
+        """Подхватывает изменения списка тенантов и подписок."""
+        self.subscriptions.reload_if_changed()
+        changes = self.registry.reload_if_changed()
+        if changes is not None:
+            self.apply_changes(changes)
+
+    def poll_tenant(self, state):
+        """Опрашивает API для одного тенанта и отправляет новый статус.
+
+        История нового тенанта загружается здесь, в его собственном
+        опросе: в ThreadedWorker — в пуле, не задерживая остальных.
+        """
+        if state.needs_history:
+            self.seed_history(state)
+        tenant = state.tenant
+        trace = self.tracer.start(tenant.name)
+        try:
+            api_response = self.fetch_with_retries(state)
+            trace.mark('fetch')
+            self.pipeline.run(Event(
+                tenant=tenant, state=state, response=api_response,
+                trace=trace,
+            ))
+            state.from_date = api_response.get(
+                'current_date', state.from_date
+            )
+            state.failures = 0
+            state.delay = RETRY_PERIOD
+            self.last_success = self.clock.time()
+        except Exception as error:
+            self.handle_error(state, error)
+
+    def fetch_with_retries(self, state):
+        """Запрашивает API, сразу повторяя запрос при временных сбоях.
+
+        Число повторов задаёт правило RetryPolicy для возникшей ошибки.
+        """
+        attempt = 0
+        while True:
+            try:
+                return self.fetch(state.tenant, state.from_date)
+            except Exception as error:
+                if attempt >= self.retry_policy.rule_for(error).retries:
+                    raise
+                attempt += 1
+                REGISTRY.increment(RETRIES_METRIC)
+                logger.warning(
+                    f'{state.tenant.name}: повтор запроса после сбоя: {error}'
+                )
+
+    def handle_error(self, state, error):
+        """Сообщает тенанту о сбое и выбирает паузу до следующего опроса.
+
+        Пауза и приостановка опроса берутся из RetryPolicy; тенант с
+        отозванным токеном не опрашивается, пока токен не сменится.
+        """
+        tenant = state.tenant
+        rule = self.retry_policy.rule_for(error)
+        state.failures += 1
+        state.delay = self.retry_policy.delay(rule, state.failures)
+        if rule.suspend:
+            state.suspended = tenant.practicum_token
+            REGISTRY.increment(SUSPENDED_METRIC)
+            logger.warning(
+                f'{tenant.name}: опрос приостановлен до смены токена'
+            )
+        message = f'Сбой в работе программы: {error}'
+        if state.sent_messages['error'] != message:
+            logger.error(f'{tenant.name}: {message}')
+            self.notify_error(tenant, message)
+        state.sent_messages['error'] = message
+
+    def detect_change(self, event):
+        """Этап конвейера: ищет новый статус в ответе API."""
+        change = detect_status_change(
+            event.response, event.state.sent_messages, event.trace
+        )
+        if change is None:
+            return None
+        event.homework_name, event.message = change
+        event.happened_at = event_time(event.response)
+        return event
+
+    def enqueue_change(self, event):
+        """Этап конвейера: ставит сообщение о новом статусе в очередь."""
+        self.enqueue(
+            event.tenant, event.homework_name, event.message, event.trace,
+            event.happened_at,
+        )
+
+    def record_change(self, event):
+        """Этап конвейера: записывает новый статус в историю."""
+        self.record_status(
+            event.tenant, event.response['homeworks'][0], event.happened_at
+        )
+
+    def remember_change(self, event):
+        """Этап конвейера: запоминает статус, чтобы не отправить его снова."""
+        event.state.sent_messages[event.homework_name] = event.message
+
+    def enqueue(self, tenant, homework_name, message, trace, happened_at):
+        """Ставит одно сообщение в очередь для тенанта и его подписчиков.
+
+        Чатам в режиме сводки сообщение добавляется в сводку. Задержка
+        уведомления считается по первой немедленной доставке, обычно в чат
+        самого тенанта.
+        """
+        now = self.clock.time()
+        for chat_id in self.subscriptions.chats_for(tenant):
+            if holds(self.subscriptions.policy_for(chat_id), now):
+                self.digests.add(
+                    chat_id, tenant.name, homework_name, message, now
+                )
+                continue
+            entry = self.outbox.put(tenant.name, chat_id, message)
+            if trace is not None and len(self.traces) < MAX_TRACES:
+                self.traces[entry.id] = (trace, happened_at)
+                trace = None
+
+    def record_status(self, tenant, homework, happened_at):
+        """Добавляет смену статуса в историю, если она ведётся."""
+        if self.history is None:
+            return
+        self.history.record(
+            tenant.name, homework['homework_name'], homework['status'],
+            happened_at or self.clock.time(),
+        )
+
+    def notify_error(self, tenant, message):
+        """Сообщает тенанту о сбое, не прерывая опрос остальных."""
+        try:
+            send_to_chat(self.bot, tenant.chat_id, message)
+        except Exception as error:
+            logger.error(f'{tenant.name}: {error}')
+
+    def send_entry(self, entry):
+        """Отправляет сообщение из журнала и завершает его трассу."""
+        send_to_chat(self.bot, entry.chat_id, entry.text)
+        traced = self.traces.pop(entry.id, None)
+        if traced is not None:
+            trace, happened_at = traced
+            trace.mark('send_message')
+            self.tracer.finish(trace, happened_at)
+
+    def flush_digests(self):
+        """Ставит в журнал сводки, интервал которых истёк."""
+        for chat_id, text in self.digests.pop_due(
+            self.clock.time(), self.subscriptions.policy_for
+        ):
+            self.outbox.put(DIGEST_TENANT, chat_id, text)
+
+    def deliver(self):
+        """Отправляет неподтверждённые сообщения, срок которых наступил.
+
+        Трассы выброшенных журналом сообщений забываются.
+        """
+        self.outbox.deliver(
+            partial(self.profiler.call, self.send_entry),
+            self.delivery_executor,
+        )
+        for entry_id in [
+            entry_id for entry_id in self.traces
+            if entry_id not in self.outbox.pending
+        ]:
+            del self.traces[entry_id]
+
+    def poll_many(self, states):
+        """Опрашивает переданных тенантов."""
+        for state in states:
+            self.profiler.call(self.poll_tenant, state)
+
+    def poll_and_reschedule(self, states):
+        """Опрашивает тенантов, доставляет сообщения и назначает сроки.
+
+        Перед проходом применяется запрошенное переключение профилирования:
+        в этот момент ни один опрос и ни одна отправка не выполняются.
+        """
+        self.profiler.checkpoint()
+        self.poll_many(states)
+        self.flush_digests()
+        self.deliver()
+        now = self.clock.time()
+        for state in states:
+            if state.tenant.name not in self.states:
+                continue
+            if state.suspended is not None:
+                self.scheduler.remove(state.tenant.name)
+                continue
+            state.due = now + state.delay
+            self.scheduler.schedule(state.tenant.name, state.due)
+        if self.leases is not None and states:
+            self.leases.save_cursors({
+                state.tenant.name: state.from_date for state in states
+            })
+        if self.snapshots is not None:
+            self.snapshots.maybe_save(self.states.values(), self.clock.time())
+        self.last_tick = self.clock.time()
+
+    def run_once(self):
+        """Выполняет внеочередной проход опроса по всем тенантам."""
+        self.refresh()
+        self.poll_and_reschedule([
+            state for state in self.states.values() if state.suspended is None
+        ])
+
+    def tick(self):
+        """Опрашивает тенантов, срок которых наступил."""
+        self.refresh()
+        names = self.scheduler.pop_due(self.clock.time())
+        self.poll_and_reschedule([
+            self.states[name] for name in names if name in self.states
+        ])
+
+    def seconds_to_next_poll(self):
+        """Возвращает паузу до ближайшего опроса или проверки реестра."""
+        next_due = self.scheduler.next_due()
+        if next_due is None:
+            return REFRESH_INTERVAL
+        return min(max(next_due - self.clock.time(), 0), REFRESH_INTERVAL)
+
+    def status(self):
+        """Возвращает состояние для проверки живости.
+
+        Вызывается из потока HealthServer и только читает атрибуты, не
+        захватывая блокировок цикла опроса.
+        """
+        return {
+            'last_tick': self.last_tick,
+            'last_successful_poll': self.last_success,
+            'tenants': len(self.states),
+            'scheduled': len(self.scheduler),
+            'outbox_pending': len(self.outbox.pending),
+            'digest_pending': len(self.digests),
+            'metrics': REGISTRY.snapshot(),
+            'lag': self.tracer.worst_tenants(),
+            'transfer': METER.top(),
+        }
+
+    def run_until(self, deadline=None):
+        """Опрашивает тенантов по расписанию до наступления deadline."""
+        while deadline is None or self.clock.time() < deadline:
+            self.tick()
+            self.clock.sleep(self.seconds_to_next_poll())
+
+    def run_forever(self):
+        """Опрашивает каждого тенанта раз в RETRY_PERIOD секунд."""
+        self.run_until()
+
+
+class ThreadedWorker(Worker):
+    """Опрашивает тенантов параллельно в ограниченном пуле потоков.
+
+    Число задач в пуле ограничено семафором: при заполненной очереди
+    постановка новых задач ждёт, а не копит их в памяти. Каждый тенант
+    опрашивается не более чем одним потоком за проход. Число одновременных
+    запросов к API подстраивается под задержки и ошибки через AIMDLimiter.
+    """
+
+    def __init__(self, registry, bot, threads, limiter=None, **kwargs):
+        super().__init__(registry, bot, **kwargs)
+        self.limiter = limiter or AIMDLimiter(
+            initial=min(4, threads), max_limit=threads
+        )
+        self.fetch = self.limiter.wrap(self.fetch)
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='poll'
+        )
+        self.slots = threading.BoundedSemaphore(threads * QUEUE_PER_THREAD)
+        if self.delivery_executor is None:
+            self.delivery_executor = self.executor
+
+    def submit(self, state):
+        """Ставит опрос тенанта в пул, дожидаясь свободного места."""
+        self.slots.acquire()
+        future = self.executor.submit(
+            self.profiler.call, self.poll_tenant, state
+        )
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def poll_many(self, states):
+        """Опрашивает тенантов в пуле и дожидается всех начатых запросов."""
+        wait([self.submit(state) for state in states])
+
+    def close(self):
+        """Останавливает пул потоков."""
+        self.executor.shutdown(wait=True)
+
+
+def build_worker(registry, bot, threads=WORKER_THREADS, **kwargs):
+    """Создаёт однопоточный или многопоточный обработчик."""
+    if threads > 0:
+        return ThreadedWorker(registry, bot, threads, **kwargs)
+    return Worker(registry, bot, **kwargs)
+
+
+def create_bot(client=TELEGRAM_CLIENT):
+    """Создаёт клиент Telegram, выбранный переменной TELEGRAM_CLIENT."""
+    if client == 'direct':
+        return BotAPIClient(TELEGRAM_TOKEN)
+    return telegram.Bot(token=TELEGRAM_TOKEN)
+
+
+def setup_logging():
+    """Настраивает вывод логов в stdout."""
+    logging.basicConfig(
+        level=logging.DEBUG,
+        stream=sys.stdout,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+    )
+
+
+def main():
+    """Запускает многотенантный опрос по списку из TENANTS_FILE."""
+    setup_logging()
+    if not TELEGRAM_TOKEN or not TENANTS_FILE:
+        logger.critical(
+            f'Отсутствуют переменные окружения TELEGRAM_TOKEN '
+            f'или {TENANTS_FILE_ENV}'
+        )
+        raise EnvironmentError('Отсутствуют необходимые переменные окружения')
+    bot = protect_from_env(create_bot())
+    profiler = Profiler.from_env()
+    profiler.install()
+    watchdog = MemoryWatchdog.from_env()
+    watchdog.start()
+    leases = LeaseStore.from_env()
+    history = StatusHistory.from_env()
+    snapshots = SnapshotStore.from_env()
+    poller = build_worker(
+        TenantRegistry(TENANTS_FILE),
+        bot,
+        fetch=PreparedRequests(pool_size=max(WORKER_THREADS, 1)).fetch,
+        tracer=Tracer.from_env(),
+        outbox=Outbox.from_env(),
+        backfill_on_add=BACKFILL_ON_ADD,
+        subscriptions=SubscriptionIndex.from_env(),
+        profiler=profiler,
+        leases=leases,
+        history=history,
+        snapshots=snapshots,
+    )
+    events = EventLog.from_env()
+    if events is not None:
+        poller.pipeline.sink(events.sink, name='event_log')
+    health = HealthServer.from_env(poller.status, profiler=profiler)
+    if health is not None:
+        health.start()
+    try:
+        poller.run_forever()
+    finally:
+        if leases is not None:
+            leases.release_all()
+        if history is not None:
+            history.close()
+        if events is not None:
+            events.close()
+        if snapshots is not None:
+            snapshots.save(poller.states.values(), poller.clock.time())
+        watchdog.close()
+
+
+if __name__ == '__main__':
+    main()